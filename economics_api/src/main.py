@@ -10,6 +10,8 @@ from src.models.discussion import Discussion
 from src.routes.hypothesis import hypothesis_bp
 from src.routes.discussion import discussion_bp
 from src.routes.ai_comment import ai_comment_bp
+from src.routes.jobs import jobs_bp
+from src.services.job_queue import job_queue
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -24,6 +26,7 @@ CORS(app,
 app.register_blueprint(hypothesis_bp, url_prefix='/api')
 app.register_blueprint(discussion_bp, url_prefix='/api')
 app.register_blueprint(ai_comment_bp, url_prefix='/api')
+app.register_blueprint(jobs_bp, url_prefix='/api')
 
 # データベース設定
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
@@ -32,6 +35,13 @@ db.init_app(app)
 with app.app_context():
     db.create_all()
 
+# Gemini を呼び出す API のバックグラウンドジョブ（JOB_WORKERS でワーカー数を変更）
+# python main.py の debug 実行ではリローダーの親プロセスもこのモジュールを読み込むため、
+# ワーカーはリクエストを処理する子プロセス（WERKZEUG_RUN_MAIN=true）でのみ起動する
+job_queue.init_app(app, path=os.path.join(os.path.dirname(__file__), 'database', 'jobs.db'),
+                   workers=int(os.getenv('JOB_WORKERS', '2')),
+                   start=__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
+
 # プリフライトリクエスト用のOPTIONSハンドラー
 @app.before_request
 def handle_preflight():
@@ -1,6 +1,13 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, current_app, stream_with_context
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from src.models.discussion import Discussion, db
 from src.services.ai_comment_service import AICommentService
+from src.services.hypothesis_stream import format_sse
+from src.services.job_queue import job_queue, FINISHED_STATUSES, SUCCEEDED
+from src.routes.jobs import job_accepted
+import os
+import json
+import time
 import logging
 
 ai_comment_bp = Blueprint('ai_comment', __name__)
@@ -12,9 +19,123 @@ logger = logging.getLogger(__name__)
 # AIコメントサービスのインスタンス
 ai_service = AICommentService()
 
+# バッチ処理で同時に処理する仮説の数。Gemini の呼び出しは共有クライアントのレート制限を待つが、
+# レート制限は GEMINI_RPM / GEMINI_TPM を設定した場合のみ有効なため、未設定時は UNLIMITED_BATCH_CONCURRENCY に抑える
+BATCH_CONCURRENCY = int(os.getenv('AI_COMMENT_BATCH_CONCURRENCY', '4'))
+UNLIMITED_BATCH_CONCURRENCY = 2
+
+# 再開時に処理し直さないバッチ結果のステータス
+BATCH_DONE_STATUSES = ('success', 'skipped')
+
+# バッチ結果のストリーミングで進捗を確認する間隔（秒）
+BATCH_STREAM_POLL_SECONDS = 0.5
+
+def run_generate_comment(payload, context):
+    """AIコメント生成ジョブ（バックグラウンドなのでレート制限は待つ）"""
+    discussion = ai_service.auto_comment_on_hypothesis(payload['hypothesis_id'], payload['hypothesis_data'], wait=True)
+    if not discussion:
+        raise RuntimeError('Failed to generate AI comment')
+    return {
+        'message': 'AI comment generated successfully',
+        'discussion': discussion.to_dict()
+    }
+
+def run_generate_reply(payload, context):
+    """AI返信生成ジョブ（バックグラウンドなのでレート制限は待つ）"""
+    discussion = ai_service.auto_reply_to_comment(payload['comment_id'], payload['hypothesis_data'], wait=True)
+    if not discussion:
+        raise RuntimeError('Failed to generate AI reply')
+    return {
+        'message': 'AI reply generated successfully',
+        'discussion': discussion.to_dict()
+    }
+
+def process_batch_item(hypothesis):
+    """バッチ処理の1件分: 必要ならAIコメントを生成し、結果を返す"""
+    hypothesis_id = hypothesis.get('id')
+    try:
+        # 自動コメントすべきかチェック
+        if not ai_service.should_auto_comment(hypothesis_id):
+            return {
+                'hypothesis_id': hypothesis_id,
+                'status': 'skipped',
+                'reason': 'AI comment not needed'
+            }
+        
+        discussion = ai_service.auto_comment_on_hypothesis(hypothesis_id, hypothesis, wait=True)
+        if discussion:
+            return {
+                'hypothesis_id': hypothesis_id,
+                'status': 'success',
+                'discussion_id': discussion.id
+            }
+        return {
+            'hypothesis_id': hypothesis_id,
+            'status': 'failed',
+            'error': 'Failed to generate comment'
+        }
+        
+    except Exception as e:
+        logger.error(f"Error processing hypothesis {hypothesis_id}: {str(e)}")
+        return {
+            'hypothesis_id': hypothesis_id,
+            'status': 'error',
+            'error': str(e)
+        }
+
+def run_batch_process(payload, context):
+    """
+    バッチ処理ジョブ: 最大 BATCH_CONCURRENCY 件を並行して処理し、1件終わるごとに結果を進捗に追記する
+    
+    進捗の results は完了順の追記のみのログで、ストリーミングはその続きを送信する。中断後の再実行や
+    再開（resume）では、保存済みの結果が成功・スキップの仮説を処理し直さない。
+    """
+    hypotheses = [hypothesis for hypothesis in payload['hypotheses'] if hypothesis.get('id')]
+    log = list((context.saved_progress() or {}).get('results', []))
+    latest = {result['hypothesis_id']: result for result in log}
+    pending = [hypothesis for hypothesis in hypotheses
+               if latest.get(hypothesis['id'], {}).get('status') not in BATCH_DONE_STATUSES]
+    processed = len(hypotheses) - len(pending)
+    if processed:
+        logger.info(f"Resuming batch {context.job_id}: {processed} of {len(hypotheses)} hypotheses already done")
+    context.progress({'processed': processed, 'total': len(hypotheses), 'results': log})
+    
+    # ワーカースレッドごとにアプリケーションコンテキスト（とDBセッション）を用意する
+    app = current_app._get_current_object()
+    
+    def process(hypothesis):
+        with app.app_context():
+            return process_batch_item(hypothesis)
+    
+    concurrency = max(1, BATCH_CONCURRENCY)
+    if ai_service.commentator.client.limiter is None and concurrency > UNLIMITED_BATCH_CONCURRENCY:
+        logger.warning(f"Gemini rate limit is not configured (GEMINI_RPM/GEMINI_TPM); "
+                       f"limiting batch concurrency to {UNLIMITED_BATCH_CONCURRENCY}")
+        concurrency = UNLIMITED_BATCH_CONCURRENCY
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(process, hypothesis) for hypothesis in pending]
+        for future in as_completed(futures):
+            result = future.result()
+            log.append(result)
+            latest[result['hypothesis_id']] = result
+            processed += 1
+            context.progress({'processed': processed, 'total': len(hypotheses), 'results': log})
+    
+    results = [latest[hypothesis['id']] for hypothesis in hypotheses]
+    return {
+        'message': 'Batch processing completed',
+        'results': results,
+        'total_processed': len(results)
+    }
+
+job_queue.register('ai_comment.generate', run_generate_comment)
+job_queue.register('ai_comment.reply', run_generate_reply)
+job_queue.register('ai_comment.batch', run_batch_process)
+
 @ai_comment_bp.route('/ai-comment/generate/<int:hypothesis_id>', methods=['POST'])
 def generate_ai_comment(hypothesis_id):
-    """指定された仮説に対してAIコメントを生成"""
+    """指定された仮説に対するAIコメント生成ジョブを登録（結果は /api/jobs/<job_id> で取得）"""
     try:
         data = request.get_json()
         hypothesis_data = data.get('hypothesis_data', {})
@@ -22,24 +143,19 @@ def generate_ai_comment(hypothesis_id):
         if not hypothesis_data:
             return jsonify({'error': 'Hypothesis data is required'}), 400
         
-        # AIコメントを生成
-        discussion = ai_service.auto_comment_on_hypothesis(hypothesis_id, hypothesis_data)
-        
-        if discussion:
-            return jsonify({
-                'message': 'AI comment generated successfully',
-                'discussion': discussion.to_dict()
-            }), 201
-        else:
-            return jsonify({'error': 'Failed to generate AI comment'}), 500
+        job = job_queue.enqueue('ai_comment.generate', {
+            'hypothesis_id': hypothesis_id,
+            'hypothesis_data': hypothesis_data
+        })
+        return job_accepted(job, 'AI comment job queued')
             
     except Exception as e:
-        logger.error(f"Error generating AI comment for hypothesis {hypothesis_id}: {str(e)}")
+        logger.error(f"Error queueing AI comment for hypothesis {hypothesis_id}: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @ai_comment_bp.route('/ai-comment/reply/<int:comment_id>', methods=['POST'])
 def generate_ai_reply(comment_id):
-    """指定されたコメントに対してAI返信を生成"""
+    """指定されたコメントに対するAI返信生成ジョブを登録（結果は /api/jobs/<job_id> で取得）"""
     try:
         data = request.get_json()
         hypothesis_data = data.get('hypothesis_data', {})
@@ -47,19 +163,14 @@ def generate_ai_reply(comment_id):
         if not hypothesis_data:
             return jsonify({'error': 'Hypothesis data is required'}), 400
         
-        # AI返信を生成
-        discussion = ai_service.auto_reply_to_comment(comment_id, hypothesis_data)
-        
-        if discussion:
-            return jsonify({
-                'message': 'AI reply generated successfully',
-                'discussion': discussion.to_dict()
-            }), 201
-        else:
-            return jsonify({'error': 'Failed to generate AI reply'}), 500
+        job = job_queue.enqueue('ai_comment.reply', {
+            'comment_id': comment_id,
+            'hypothesis_data': hypothesis_data
+        })
+        return job_accepted(job, 'AI reply job queued')
             
     except Exception as e:
-        logger.error(f"Error generating AI reply for comment {comment_id}: {str(e)}")
+        logger.error(f"Error queueing AI reply for comment {comment_id}: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @ai_comment_bp.route('/ai-comment/auto-trigger/<int:hypothesis_id>', methods=['POST'])
@@ -99,9 +210,78 @@ def auto_trigger_ai_comment(hypothesis_id):
         logger.error(f"Error auto-triggering AI comment for hypothesis {hypothesis_id}: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@ai_comment_bp.route('/ai-comment/hedging-stats', methods=['GET'])
+def get_hedging_stats():
+    """Gemini APIのヘッジリクエストの統計（送信回数・ヘッジ側の採用回数）"""
+    return jsonify(ai_service.commentator.hedger.stats()), 200
+
+@ai_comment_bp.route('/ai-comment/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """AIコメントの応答キャッシュの統計（メモリ・SQLiteのヒット数、ミス数、削除件数）"""
+    cache = ai_service.commentator.cache
+    return jsonify(cache.stats() if cache is not None else {'enabled': False}), 200
+
+def _iter_batch_events(batch_id, since):
+    """バッチの結果を since 件目以降から完了順に (番号, イベント名, データ) で返し、ジョブの完了で終了する"""
+    sent = since
+    while True:
+        job = job_queue.get(batch_id)
+        if job is None:
+            yield sent, 'error', {'success': False, 'batch_id': batch_id, 'error': 'Batch not found'}
+            return
+        results = (job['progress'] or {}).get('results', [])
+        for result in results[sent:]:
+            sent += 1
+            yield sent, 'result', result
+        if job['status'] in FINISHED_STATUSES:
+            if job['status'] == SUCCEEDED:
+                yield sent, 'done', {'success': True, 'batch_id': batch_id, **job['result']}
+            else:
+                yield sent, 'error', {'success': False, 'batch_id': batch_id, 'error': job['error'],
+                                      'resume_url': f"/api/ai-comment/batch-process/{batch_id}/resume"}
+            return
+        time.sleep(BATCH_STREAM_POLL_SECONDS)
+
+def _batch_stream_response(batch_id):
+    """
+    バッチの結果を1件終わるごとに送信するレスポンス
+    
+    Accept に text/event-stream を含むか ?format=sse なら Server-Sent Events（id は結果の番号）、それ以外は NDJSON。
+    再接続時は Last-Event-ID または ?since=N で受信済みの件数を渡すと、その続きから送信する。
+    """
+    sse = request.args.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+    since = request.headers.get('Last-Event-ID', type=int) or request.args.get('since', 0, type=int)
+    
+    def events():
+        for index, event, data in _iter_batch_events(batch_id, max(0, since)):
+            if sse:
+                yield f"id: {index}\n" + format_sse(event, data)
+            else:
+                yield json.dumps({'event': event, 'index': index, 'data': data}, ensure_ascii=False) + "\n"
+    
+    response = Response(stream_with_context(events()),
+                        mimetype='text/event-stream' if sse else 'application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    # リバースプロキシによるバッファリングを無効化
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['X-Batch-Id'] = batch_id
+    return response
+
+def _batch_urls(batch_id):
+    return {
+        'batch_id': batch_id,
+        'stream_url': f"/api/ai-comment/batch-process/{batch_id}/stream",
+        'resume_url': f"/api/ai-comment/batch-process/{batch_id}/resume"
+    }
+
 @ai_comment_bp.route('/ai-comment/batch-process', methods=['POST'])
 def batch_process_ai_comments():
-    """複数の仮説に対してバッチでAIコメントを処理"""
+    """
+    複数の仮説に対するAIコメントのバッチ処理ジョブを登録
+    
+    バッチIDはジョブIDと同じ。"stream": true を指定するとそのまま結果をストリーミングし、指定しなければ 202 を返す
+    （結果は stream_url、進捗は /api/jobs/<job_id> で取得）。
+    """
     try:
         data = request.get_json()
         hypotheses = data.get('hypotheses', [])
@@ -109,52 +289,36 @@ def batch_process_ai_comments():
         if not hypotheses:
             return jsonify({'error': 'Hypotheses data is required'}), 400
         
-        results = []
-        
-        for hypothesis in hypotheses:
-            hypothesis_id = hypothesis.get('id')
-            if not hypothesis_id:
-                continue
-            
-            try:
-                # 自動コメントすべきかチェック
-                if ai_service.should_auto_comment(hypothesis_id):
-                    discussion = ai_service.auto_comment_on_hypothesis(hypothesis_id, hypothesis)
-                    
-                    if discussion:
-                        results.append({
-                            'hypothesis_id': hypothesis_id,
-                            'status': 'success',
-                            'discussion_id': discussion.id
-                        })
-                    else:
-                        results.append({
-                            'hypothesis_id': hypothesis_id,
-                            'status': 'failed',
-                            'error': 'Failed to generate comment'
-                        })
-                else:
-                    results.append({
-                        'hypothesis_id': hypothesis_id,
-                        'status': 'skipped',
-                        'reason': 'AI comment not needed'
-                    })
-                    
-            except Exception as e:
-                logger.error(f"Error processing hypothesis {hypothesis_id}: {str(e)}")
-                results.append({
-                    'hypothesis_id': hypothesis_id,
-                    'status': 'error',
-                    'error': str(e)
-                })
-        
-        return jsonify({
-            'message': 'Batch processing completed',
-            'results': results,
-            'total_processed': len(results)
-        }), 200
+        job = job_queue.enqueue('ai_comment.batch', {'hypotheses': hypotheses})
+        if data.get('stream'):
+            return _batch_stream_response(job['id'])
+        return job_accepted(job, 'Batch processing job queued', **_batch_urls(job['id']))
         
     except Exception as e:
         logger.error(f"Error in batch processing AI comments: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@ai_comment_bp.route('/ai-comment/batch-process/<batch_id>/stream', methods=['GET'])
+def stream_batch_results(batch_id):
+    """バッチの結果を完了した順にストリーミング（NDJSON または SSE）"""
+    job = job_queue.get(batch_id)
+    if job is None or job['kind'] != 'ai_comment.batch':
+        return jsonify({'error': 'Batch not found'}), 404
+    return _batch_stream_response(batch_id)
+
+@ai_comment_bp.route('/ai-comment/batch-process/<batch_id>/resume', methods=['POST'])
+def resume_batch_process(batch_id):
+    """中断・失敗したバッチを再開（成功・スキップ済みの仮説は処理し直さない）"""
+    try:
+        job = job_queue.get(batch_id)
+        if job is None or job['kind'] != 'ai_comment.batch':
+            return jsonify({'error': 'Batch not found'}), 404
+        
+        job = job_queue.requeue(batch_id)
+        if request.args.get('stream') == '1':
+            return _batch_stream_response(batch_id)
+        return job_accepted(job, 'Batch processing job resumed', **_batch_urls(batch_id))
+        
+    except Exception as e:
+        logger.error(f"Error resuming batch {batch_id}: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
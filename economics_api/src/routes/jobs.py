@@ -0,0 +1,46 @@
+from flask import Blueprint, request, jsonify
+from src.services.job_queue import job_queue, FINISHED_STATUSES
+import logging
+
+jobs_bp = Blueprint('jobs', __name__)
+
+# ログ設定
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ロングポーリングで待つ最大秒数
+MAX_WAIT_SECONDS = 60
+
+def job_accepted(job, message, **extra):
+    """ジョブ登録時のレスポンス（202 と状態確認用の URL。extra はレスポンスに追加する項目）"""
+    status_url = f"/api/jobs/{job['id']}"
+    response = jsonify({
+        'success': True,
+        'message': message,
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': status_url,
+        **extra
+    })
+    response.headers['Location'] = status_url
+    return response, 202
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    ジョブの状態を取得
+
+    ?wait=秒数 を指定すると、ジョブが完了するかその秒数が経過するまで応答を保留する（完了通知のロングポーリング）。
+    """
+    try:
+        wait = min(request.args.get('wait', 0, type=float), MAX_WAIT_SECONDS)
+        job = job_queue.wait(job_id, wait) if wait > 0 else job_queue.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        response = jsonify(job)
+        if job['status'] not in FINISHED_STATUSES:
+            response.headers['Retry-After'] = '2'
+        return response, 200
+    except Exception as e:
+        logger.error(f"Error getting job {job_id}: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
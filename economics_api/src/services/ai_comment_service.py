@@ -1,10 +1,13 @@
 import os
-import requests
 import json
 import logging
 from datetime import datetime
 from typing import Dict, List, Optional
 from src.models.discussion import Discussion, db
+from src.services.hedging import HedgedCaller
+from src.services.gemini_client import GeminiError, get_client
+from src.services.llm_cache import ResponseCache
+from src.services.rate_limiter import RateLimitExceeded, limiter_from_env
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
@@ -13,20 +16,39 @@ logger = logging.getLogger(__name__)
 class GeminiAICommentator:
     """Gemini API を使用した自動コメント生成クラス"""
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, hedge_requests: bool = None):
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+        # プロセス内で共有するクライアント（Flask ワーカーの呼び出しごとに TLS 接続を張り直さない）
+        self.client = get_client(self.api_key, model="gemini-2.5-flash", limiter=limiter_from_env())
+        
+        # 同じプロンプト（仮説と直近の議論が変わっていない再実行）には保存済みの応答を返す（LLM_CACHE=0 で無効）
+        self.cache = None
+        if os.getenv('LLM_CACHE', '1') == '1':
+            self.cache = ResponseCache(
+                os.getenv('LLM_CACHE_PATH', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'llm_cache.db')),
+                ttl=float(os.getenv('LLM_CACHE_TTL', str(24 * 3600)))
+            )
+        
+        # 応答が遅い場合に同じリクエストをもう1本送る（GEMINI_HEDGE=1 で有効、閾値は直近のレイテンシ分布から決定）
+        if hedge_requests is None:
+            hedge_requests = os.getenv('GEMINI_HEDGE', '0') == '1'
+        self.hedger = HedgedCaller(
+            percentile=float(os.getenv('GEMINI_HEDGE_PERCENTILE', '95')),
+            enabled=hedge_requests
+        )
         
         if not self.api_key:
             logger.warning("Gemini API key not found. AI comments will be disabled.")
     
-    def generate_comment(self, hypothesis: Dict, existing_discussions: List[Dict] = None) -> Optional[str]:
+    def generate_comment(self, hypothesis: Dict, existing_discussions: List[Dict] = None,
+                         wait: Optional[bool] = None) -> Optional[str]:
         """
         仮説に対するAIコメントを生成
         
         Args:
             hypothesis: 仮説データ
             existing_discussions: 既存のディスカッション（オプション）
+            wait: レート制限の残量がないときに待つか（None はクライアントの既定、バックグラウンド処理では True）
         
         Returns:
             生成されたコメント文字列、またはNone
@@ -39,7 +61,7 @@ class GeminiAICommentator:
             prompt = self._build_comment_prompt(hypothesis, existing_discussions)
             
             # Gemini APIにリクエスト
-            response = self._call_gemini_api(prompt)
+            response = self._call_gemini_api(prompt, wait=wait)
             
             if response:
                 logger.info(f"Generated AI comment for hypothesis {hypothesis.get('id', 'unknown')}")
@@ -50,13 +72,14 @@ class GeminiAICommentator:
         
         return None
     
-    def generate_reply(self, original_comment: Dict, hypothesis: Dict) -> Optional[str]:
+    def generate_reply(self, original_comment: Dict, hypothesis: Dict, wait: Optional[bool] = None) -> Optional[str]:
         """
         既存のコメントに対するAI返信を生成
         
         Args:
             original_comment: 元のコメントデータ
             hypothesis: 関連する仮説データ
+            wait: レート制限の残量がないときに待つか（None はクライアントの既定）
         
         Returns:
             生成された返信文字列、またはNone
@@ -69,7 +92,7 @@ class GeminiAICommentator:
             prompt = self._build_reply_prompt(original_comment, hypothesis)
             
             # Gemini APIにリクエスト
-            response = self._call_gemini_api(prompt)
+            response = self._call_gemini_api(prompt, wait=wait)
             
             if response:
                 logger.info(f"Generated AI reply for comment {original_comment.get('id', 'unknown')}")
@@ -139,43 +162,24 @@ class GeminiAICommentator:
         
         return prompt
     
-    def _call_gemini_api(self, prompt: str) -> Optional[str]:
+    def _call_gemini_api(self, prompt: str, wait: Optional[bool] = None) -> Optional[str]:
         """Gemini APIを呼び出してテキストを生成"""
         
-        headers = {
-            'Content-Type': 'application/json',
-        }
-        
-        data = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }],
-            "generationConfig": {
-                "temperature": 0.7,
-                "topK": 40,
-                "topP": 0.95,
-                "maxOutputTokens": 1024,
-            }
+        generation_config = {
+            "temperature": 0.7,
+            "topK": 40,
+            "topP": 0.95,
+            "maxOutputTokens": 1024,
         }
         
         try:
-            url = f"{self.base_url}?key={self.api_key}"
-            response = requests.post(url, headers=headers, json=data, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                if 'candidates' in result and len(result['candidates']) > 0:
-                    content = result['candidates'][0].get('content', {})
-                    parts = content.get('parts', [])
-                    if parts and 'text' in parts[0]:
-                        return parts[0]['text'].strip()
-            else:
-                logger.error(f"Gemini API error: {response.status_code} - {response.text}")
+            return self.client.generate_text(prompt, generation_config, hedger=self.hedger, cache=self.cache,
+                                             wait=wait).strip()
                 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request error calling Gemini API: {str(e)}")
+        except RateLimitExceeded as e:
+            logger.warning(f"Gemini rate limit reached, skipping AI comment: {str(e)}")
+        except GeminiError as e:
+            logger.error(f"Gemini API error: {str(e)}")
         except Exception as e:
             logger.error(f"Unexpected error calling Gemini API: {str(e)}")
         
@@ -187,13 +191,15 @@ class AICommentService:
     def __init__(self):
         self.commentator = GeminiAICommentator()
     
-    def auto_comment_on_hypothesis(self, hypothesis_id: int, hypothesis_data: Dict) -> Optional[Discussion]:
+    def auto_comment_on_hypothesis(self, hypothesis_id: int, hypothesis_data: Dict,
+                                   wait: Optional[bool] = None) -> Optional[Discussion]:
         """
         仮説に対してAIが自動コメントを投稿
         
         Args:
             hypothesis_id: 仮説ID
             hypothesis_data: 仮説データ
+            wait: レート制限の残量がないときに待つか（None はクライアントの既定）
         
         Returns:
             作成されたDiscussionオブジェクト、またはNone
@@ -209,7 +215,8 @@ class AICommentService:
             # AIコメントを生成
             ai_comment = self.commentator.generate_comment(
                 hypothesis_data, 
-                existing_discussions_data
+                existing_discussions_data,
+                wait=wait
             )
             
             if ai_comment:
@@ -235,13 +242,15 @@ class AICommentService:
         
         return None
     
-    def auto_reply_to_comment(self, comment_id: int, hypothesis_data: Dict) -> Optional[Discussion]:
+    def auto_reply_to_comment(self, comment_id: int, hypothesis_data: Dict,
+                              wait: Optional[bool] = None) -> Optional[Discussion]:
         """
         コメントに対してAIが自動返信
         
         Args:
             comment_id: 元のコメントID
             hypothesis_data: 関連する仮説データ
+            wait: レート制限の残量がないときに待つか（None はクライアントの既定）
         
         Returns:
             作成されたDiscussionオブジェクト、またはNone
@@ -255,7 +264,8 @@ class AICommentService:
             # AI返信を生成
             ai_reply = self.commentator.generate_reply(
                 original_comment.to_dict(),
-                hypothesis_data
+                hypothesis_data,
+                wait=wait
             )
             
             if ai_reply:
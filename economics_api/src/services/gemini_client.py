@@ -0,0 +1,271 @@
+"""
+共有 Gemini クライアント
+
+Flask の仮説生成ルート・AI コメントサービス、scripts/ の仮説生成スクリプト、ルートの generate_hypotheses.py の
+すべての Gemini 呼び出しをこのモジュール経由にする。プロセス内でモデルと API キーごとに1つのセッションを共有し、
+keep-alive のコネクションプールを再利用するため、繰り返しの呼び出しで TLS ハンドシェイクをやり直さない。
+タイムアウト・再試行・エラー処理を統一し、計測用のフックを1か所で登録できる。src.* には依存しない。
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+API_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# (接続, 読み取り) タイムアウト（秒）。ストリーミングでは読み取りタイムアウトが断片間の待ち時間に適用される
+DEFAULT_TIMEOUT: Tuple[float, float] = (10.0, 45.0)
+
+# 再試行対象の HTTP ステータス
+RETRIABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+Timeout = Union[float, Tuple[float, float]]
+Hook = Callable[[Dict[str, Any]], None]
+
+class GeminiError(requests.exceptions.RequestException):
+    """Gemini API の呼び出しに失敗した（status_code は HTTP エラーの場合のみ）"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, response: Optional[requests.Response] = None):
+        super().__init__(message, response=response)
+        self.status_code = status_code
+
+    @property
+    def retriable(self) -> bool:
+        return self.status_code is None or self.status_code in RETRIABLE_STATUS_CODES
+
+def build_payload(prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """generateContent のリクエストボディ"""
+    payload: Dict[str, Any] = {"contents": [{"parts": [{"text": prompt}]}]}
+    if generation_config:
+        payload["generationConfig"] = generation_config
+    return payload
+
+def response_text(result: Dict[str, Any]) -> str:
+    """generateContent の応答から最初の候補のテキストを取り出す（テキストがなければ GeminiError）"""
+    for candidate in result.get("candidates", [])[:1]:
+        parts = candidate.get("content", {}).get("parts", [])
+        text = "".join(part.get("text", "") for part in parts)
+        if text:
+            return text
+        raise GeminiError(f"Gemini response has no text (finishReason={candidate.get('finishReason')})")
+    raise GeminiError(f"Gemini response has no candidates ({result.get('promptFeedback', {})})")
+
+def estimate_tokens(body: bytes, generation_config: Optional[Dict[str, Any]] = None) -> int:
+    """
+    レート制限用の推定トークン数: リクエスト本文 4 バイトあたり 1 トークン + 出力上限
+
+    日本語（UTF-8 で 1 文字 3 バイト）ではおおむね 1 文字 0.75 トークンになる。出力は実際の長さが
+    わからないため maxOutputTokens を予約する。
+    """
+    return len(body) // 4 + int((generation_config or {}).get("maxOutputTokens", 0))
+
+class GeminiClient:
+    """
+    Gemini REST API のクライアント
+
+    接続エラー・タイムアウト・429/5xx はジッター付き指数バックオフで max_retries 回まで再試行し、最終的な失敗は
+    GeminiError（requests.exceptions.RequestException のサブクラス）として送出する。
+    add_hook で登録した関数は HTTP リクエストごとに計測イベント（model, method, status, latency, attempt,
+    request_bytes, response_bytes, error, rate_limit_wait）を受け取る。応答キャッシュのヒットは cached=True のイベントになる。
+
+    limiter（rate_limiter.TokenBucketLimiter）を設定すると、各試行（再試行を含む）の送信前に 1リクエスト分と
+    推定トークン数を確保する。残量がない場合に待つか即座に失敗するかは rate_limit_wait（呼び出しごとに wait で
+    上書き可能）で決まり、失敗は RateLimitExceeded として再試行せずに送出される。確保はヘッジの計測区間の外で行い、
+    待ち時間がレイテンシ履歴に入らないようにする。ヘッジ側のリクエストは待たずに確保できた場合だけ送る。
+    """
+
+    def __init__(self, api_key: str, model: str = DEFAULT_MODEL, timeout: Timeout = DEFAULT_TIMEOUT,
+                 max_retries: int = 2, backoff: float = 1.0, pool_size: int = 16,
+                 limiter: Any = None, rate_limit_wait: bool = True):
+        self.api_key = api_key
+        self.limiter = limiter
+        self.rate_limit_wait = rate_limit_wait
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json", "x-goog-api-key": api_key or ""})
+        # 再試行はこのクラスで行うため、アダプタ側の再試行は無効にする
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0))
+        self._hooks: List[Hook] = []
+
+    def url(self, method: str = "generateContent") -> str:
+        return f"{API_BASE_URL}/{self.model}:{method}"
+
+    def add_hook(self, hook: Hook) -> None:
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+
+    def generate(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                 timeout: Optional[Timeout] = None, hedger: Any = None, cache: Any = None,
+                 wait: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        generateContent を呼び出して応答 JSON を返す
+
+        hedger（HedgedCaller など call(fn) を持つオブジェクト）を渡すと、各試行をヘッジ付きで送信する。
+        cache（llm_cache.ResponseCache）を渡すと、同じ (モデル, 生成設定, プロンプト) の応答を API を呼ばずに返し、
+        テキストを含む応答だけを保存する。
+        """
+        key = cache.key(self.model, generation_config, prompt) if cache is not None else None
+        if key is not None:
+            started = time.monotonic()
+            cached = cache.get(key)
+            if cached is not None:
+                self._emit({"model": self.model, "method": "generateContent", "cached": True,
+                            "latency": time.monotonic() - started})
+                return cached
+
+        payload = build_payload(prompt, generation_config)
+
+        def attempt_once(attempt: int) -> Dict[str, Any]:
+            # 最初の送信は先に確保した枠を使い、2本目以降（ヘッジ）は残量がある場合だけ送る
+            slots = iter([self._acquire(payload, wait)])
+
+            def send() -> requests.Response:
+                rate_limit_wait = next(slots, None)
+                if rate_limit_wait is None:
+                    rate_limit_wait = self._acquire(payload, wait=False)
+                return self._post("generateContent", payload, timeout, attempt, rate_limit_wait=rate_limit_wait)
+
+            response = hedger.call(send) if hedger is not None else send()
+            try:
+                return response.json()
+            except ValueError as e:
+                raise GeminiError(f"Gemini response is not JSON: {e}", response.status_code, response) from e
+
+        result = self._with_retries(attempt_once)
+        if key is not None:
+            try:
+                response_text(result)
+            except GeminiError:
+                return result  # 安全性フィルタ等でテキストのない応答はキャッシュしない
+            cache.put(key, result)
+        return result
+
+    def generate_text(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[Timeout] = None, hedger: Any = None, cache: Any = None,
+                      wait: Optional[bool] = None) -> str:
+        """generateContent を呼び出して最初の候補のテキストを返す"""
+        return response_text(self.generate(prompt, generation_config, timeout=timeout, hedger=hedger,
+                                           cache=cache, wait=wait))
+
+    @contextmanager
+    def stream(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+               timeout: Optional[Timeout] = None, wait: Optional[bool] = None) -> Iterator[requests.Response]:
+        """
+        streamGenerateContent（SSE）のレスポンスを返すコンテキストマネージャ
+
+        再試行は受信開始前（接続・ステータス）のみ。本文は hypothesis_stream.iter_sse_text で読む。
+        """
+        payload = build_payload(prompt, generation_config)
+        response = self._with_retries(
+            lambda attempt: self._post("streamGenerateContent", payload, timeout, attempt, stream=True,
+                                       rate_limit_wait=self._acquire(payload, wait))
+        )
+        # SSE は仕様上常に UTF-8。charset のない text/event-stream には requests が ISO-8859-1 を設定するため上書きする
+        response.encoding = "utf-8"
+        try:
+            yield response
+        finally:
+            response.close()
+
+    def _with_retries(self, call: Callable[[int], Any]) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return call(attempt)
+            except GeminiError as e:
+                if not e.retriable or attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt, e.response)
+                logger.warning(f"Retrying Gemini request in {delay:.2f}s ({attempt + 1}/{self.max_retries}): {e}")
+                time.sleep(delay)
+                attempt += 1
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), 60.0)
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def _acquire(self, payload: Dict[str, Any], wait: Optional[bool] = None) -> Optional[float]:
+        """レート制限の枠を確保して待った秒数を返す（limiter がなければ None）"""
+        if self.limiter is None:
+            return None
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        return self.limiter.acquire(
+            tokens=estimate_tokens(body, payload.get("generationConfig")),
+            wait=self.rate_limit_wait if wait is None else wait
+        )
+
+    def _post(self, method: str, payload: Dict[str, Any], timeout: Optional[Timeout], attempt: int,
+              stream: bool = False, rate_limit_wait: Optional[float] = None) -> requests.Response:
+        """1回の HTTP リクエスト（2xx 以外は GeminiError）。レート制限の枠は呼び出し側で確保済み"""
+        params = {"alt": "sse"} if stream else None
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        event: Dict[str, Any] = {"model": self.model, "method": method, "attempt": attempt, "request_bytes": len(body)}
+        if rate_limit_wait is not None:
+            event["rate_limit_wait"] = rate_limit_wait
+        started = time.monotonic()
+        try:
+            response = self.session.post(self.url(method), params=params, data=body,
+                                         timeout=timeout or self.timeout, stream=stream)
+        except requests.exceptions.RequestException as e:
+            self._emit({**event, "status": None, "latency": time.monotonic() - started, "error": str(e)})
+            raise GeminiError(f"Gemini request failed: {e}") from e
+
+        event.update(status=response.status_code, latency=time.monotonic() - started,
+                     response_bytes=None if stream else len(response.content))
+        if not response.ok:
+            message = f"Gemini API error: {response.status_code} - {response.text[:500]}"
+            response.close()
+            self._emit({**event, "error": message})
+            raise GeminiError(message, response.status_code, response)
+        self._emit(event)
+        return response
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        for hook in list(self._hooks):
+            try:
+                hook(event)
+            except Exception as e:
+                logger.warning(f"Gemini client hook failed: {e}")
+
+_clients: Dict[Tuple[str, str], GeminiClient] = {}
+_clients_lock = threading.Lock()
+
+def get_client(api_key: str, model: str = DEFAULT_MODEL, limiter: Any = None) -> GeminiClient:
+    """
+    プロセス内で共有するクライアント（API キーとモデルごとに1つ、コネクションプールを再利用）
+
+    limiter はクライアントにまだ設定されていない場合のみ設定する。
+    """
+    key = (api_key or "", model)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            # 残量がないときの既定動作（GEMINI_RATE_LIMIT_MODE=fail で待たずに RateLimitExceeded）
+            client = _clients[key] = GeminiClient(
+                api_key, model=model, rate_limit_wait=os.getenv("GEMINI_RATE_LIMIT_MODE", "wait") != "fail"
+            )
+        if client.limiter is None and limiter is not None:
+            client.limiter = limiter
+        return client
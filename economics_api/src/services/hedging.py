@@ -0,0 +1,162 @@
+"""
+ヘッジリクエスト
+
+最初のリクエストが直近のレイテンシ分布の指定パーセンタイルを過ぎても応答しない場合に、同一のリクエストを
+もう1本送り、先に成功した方の結果を使う。Gemini のレイテンシのロングテールを短縮するためのもので、
+Flask の AI コメントサービスと scripts/ の仮説生成スクリプトで共有するため、src.* には依存しない。
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class LatencyHistory:
+    """
+    直近のレイテンシ（秒）の履歴。path を指定するとプロセスをまたいで保持する
+
+    ファイルへの書き込みは save_interval 件の記録ごとにまとめて行い、実行の終わりに save() で残りを保存する。
+    """
+
+    def __init__(self, path: Optional[str] = None, maxlen: int = 200, save_interval: int = 50):
+        self.path = path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self._samples: Deque[float] = deque(maxlen=maxlen)
+        if path:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._samples.extend(float(value) for value in json.load(f))
+            except (OSError, ValueError, TypeError):
+                pass
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+            self._unsaved += 1
+            due = bool(self.path) and self._unsaved >= self.save_interval
+        if due:
+            self.save()
+
+    def save(self) -> None:
+        """未保存の記録があればファイルに書き込む"""
+        with self._lock:
+            if not self.path or not self._unsaved:
+                return
+            samples = list(self._samples)
+            self._unsaved = 0
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump([round(sample, 3) for sample in samples], f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"レイテンシ履歴の保存エラー: {e}")
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """履歴の指定パーセンタイル（線形補間、履歴がなければ None）"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        position = (len(samples) - 1) * percentile / 100.0
+        lower = int(position)
+        upper = min(lower + 1, len(samples) - 1)
+        return samples[lower] + (samples[upper] - samples[lower]) * (position - lower)
+
+class HedgedCaller:
+    """
+    ヘッジ付きで関数を呼び出す
+
+    履歴が min_samples 件に満たない間はヘッジせず、通常の呼び出しとしてレイテンシだけを記録する。
+    送信済みの HTTP リクエストは中断できないため、負けた側の結果は破棄し（未開始なら取り消し）、
+    履歴にも記録しない。fired はヘッジを送った回数、won はヘッジ側の応答が採用された回数。
+    """
+
+    def __init__(self, history: Optional[LatencyHistory] = None, percentile: float = 95.0,
+                 min_samples: int = 20, min_delay: float = 0.5, enabled: bool = True, max_workers: int = 8):
+        self.history = history or LatencyHistory()
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.enabled = enabled
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "fired": 0, "won": 0}
+
+    def hedge_delay(self) -> Optional[float]:
+        """ヘッジを送るまでの待ち時間（無効または履歴不足なら None）"""
+        if not self.enabled or len(self.history) < self.min_samples:
+            return None
+        threshold = self.history.percentile(self.percentile)
+        return None if threshold is None else max(threshold, self.min_delay)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counters = dict(self._counters)
+        counters["fired_rate"] = round(counters["fired"] / counters["calls"], 3) if counters["calls"] else 0.0
+        counters["win_rate"] = round(counters["won"] / counters["fired"], 3) if counters["fired"] else 0.0
+        counters["hedge_delay"] = self.hedge_delay()
+        return counters
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """fn を呼び出し、閾値を過ぎたら同じ fn をもう一度送り、先に成功した結果を返す"""
+        self._count("calls")
+        delay = self.hedge_delay()
+        if delay is None:
+            started = time.monotonic()
+            result = fn()
+            self.history.record(time.monotonic() - started)
+            return result
+
+        primary = self._submit(fn)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return self._finish(primary)
+
+        self._count("fired")
+        hedge = self._submit(fn)
+        logger.info(f"{delay:.2f} 秒以内に応答がないためヘッジリクエストを送信")
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    continue
+                for loser in pending:
+                    loser.cancel()
+                if future is hedge:
+                    self._count("won")
+                return self._finish(future)
+        # 両方失敗した場合は主リクエストのエラーを返す（ヘッジ側だけの失敗理由で再試行の判断を変えない）
+        raise primary.exception()
+
+    def _submit(self, fn: Callable[[], T]) -> Future:
+        def timed():
+            started = time.monotonic()
+            result = fn()
+            return result, time.monotonic() - started
+        return self._executor.submit(timed)
+
+    def _finish(self, future: Future) -> T:
+        result, latency = future.result()
+        self.history.record(latency)
+        return result
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
@@ -0,0 +1,197 @@
+"""
+仮説の JSON スキーマと検証
+
+Gemini の構造化出力（responseSchema）に渡すスキーマと、起動時に一度だけ組み立てる検証関数を提供する。
+Flask の生成ルート、scripts/ の仮説生成スクリプト、ルートの generate_hypotheses.py の3か所で共有するため、
+src.* には依存しない。スキーマに適合しなかった仮説だけを修正依頼のプロンプトで再生成できる。
+"""
+
+import json
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 1件の仮説のスキーマ（minimum / maximum は検証のみに使い、Gemini には送らない）
+HYPOTHESIS_ITEM_SCHEMA: Dict[str, Any] = {
+    "type": "OBJECT",
+    "properties": {
+        "title": {"type": "STRING"},
+        "description": {"type": "STRING"},
+        "category": {"type": "STRING"},
+        "confidence": {"type": "INTEGER", "minimum": 0, "maximum": 100},
+        "research_methods": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "key_factors": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "data_sources_used": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "policy_implications": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "novelty_score": {"type": "INTEGER", "minimum": 0, "maximum": 100},
+        "feasibility_score": {"type": "INTEGER", "minimum": 0, "maximum": 100},
+        "expected_impact": {"type": "STRING"}
+    },
+    "required": [
+        "title", "description", "category", "confidence",
+        "research_methods", "key_factors", "novelty_score", "feasibility_score"
+    ]
+}
+
+HYPOTHESES_SCHEMA: Dict[str, Any] = {
+    "type": "OBJECT",
+    "properties": {
+        "hypotheses": {"type": "ARRAY", "items": HYPOTHESIS_ITEM_SCHEMA}
+    },
+    "required": ["hypotheses"]
+}
+
+# Gemini の responseSchema が受け付けるキーワード
+_RESPONSE_SCHEMA_KEYS = ("type", "properties", "required", "items", "enum", "description", "nullable")
+
+Validator = Callable[[Any, str], List[str]]
+
+def response_schema(schema: Dict[str, Any] = HYPOTHESES_SCHEMA) -> Dict[str, Any]:
+    """検証専用のキーワードを除いた、generationConfig.responseSchema 用のスキーマ"""
+    result = {key: value for key, value in schema.items() if key in _RESPONSE_SCHEMA_KEYS}
+    if "properties" in result:
+        result["properties"] = {name: response_schema(sub) for name, sub in result["properties"].items()}
+    if "items" in result:
+        result["items"] = response_schema(result["items"])
+    return result
+
+def structured_generation_config(base: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """REST API の generationConfig に JSON 出力とスキーマを追加"""
+    return {**(base or {}), "responseMimeType": "application/json", "responseSchema": response_schema()}
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """
+    スキーマから検証関数を組み立てる
+
+    スキーマの解釈は一度だけ行い、返される関数は値を走査してエラーメッセージのリストを返すだけにする。
+    """
+    schema_type = schema.get("type")
+    checks: List[Validator] = []
+
+    if schema_type == "OBJECT":
+        properties = {name: compile_schema(sub) for name, sub in schema.get("properties", {}).items()}
+        required = tuple(schema.get("required", ()))
+
+        def check_object(value: Any, path: str) -> List[str]:
+            if not isinstance(value, dict):
+                return [f"{path}: オブジェクトが必要です"]
+            errors = [f"{path}.{name}: 必須項目です" for name in required if name not in value]
+            for name, validator in properties.items():
+                if name in value:
+                    errors.extend(validator(value[name], f"{path}.{name}"))
+            return errors
+        return check_object
+
+    if schema_type == "ARRAY":
+        item_validator = compile_schema(schema.get("items", {}))
+
+        def check_array(value: Any, path: str) -> List[str]:
+            if not isinstance(value, list):
+                return [f"{path}: 配列が必要です"]
+            errors: List[str] = []
+            for i, item in enumerate(value):
+                errors.extend(item_validator(item, f"{path}[{i}]"))
+            return errors
+        return check_array
+
+    if schema_type == "STRING":
+        checks.append(lambda value, path: [] if isinstance(value, str) and value.strip() else [f"{path}: 空でない文字列が必要です"])
+    elif schema_type in ("INTEGER", "NUMBER"):
+        integer = schema_type == "INTEGER"
+
+        def check_number(value: Any, path: str) -> List[str]:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return [f"{path}: 数値が必要です"]
+            if integer and isinstance(value, float) and not value.is_integer():
+                return [f"{path}: 整数が必要です"]
+            return []
+        checks.append(check_number)
+        if "minimum" in schema or "maximum" in schema:
+            minimum = schema.get("minimum", float("-inf"))
+            maximum = schema.get("maximum", float("inf"))
+            checks.append(lambda value, path: [] if isinstance(value, bool) or not isinstance(value, (int, float))
+                          or minimum <= value <= maximum else [f"{path}: 範囲外です [{minimum}, {maximum}]"])
+
+    def check_scalar(value: Any, path: str) -> List[str]:
+        for check in checks:
+            errors = check(value, path)
+            if errors:
+                return errors
+        return []
+    return check_scalar
+
+_validate_item = compile_schema(HYPOTHESIS_ITEM_SCHEMA)
+
+def validate_hypothesis(item: Any) -> List[str]:
+    """1件の仮説を検証し、エラーメッセージのリストを返す（空なら有効）"""
+    return _validate_item(item, "hypothesis")
+
+_FENCE_PATTERN = re.compile(r"```(?:json)?\s*([\s\S]*?)\s*```")
+
+def extract_json_text(text: str) -> str:
+    """応答テキストから JSON 部分を取り出す（コードフェンス、前後の文章に対応）"""
+    match = _FENCE_PATTERN.search(text)
+    if match:
+        return match.group(1).strip()
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text.strip()
+    start = min(starts)
+    end = max(text.rfind("}"), text.rfind("]"))
+    return text[start:end + 1].strip() if end > start else text[start:].strip()
+
+def parse_hypotheses(text: str) -> Tuple[List[Dict[str, Any]], List[Tuple[Any, List[str]]]]:
+    """
+    応答テキストを解析し、(スキーマに適合した仮説, [(不適合の要素, エラー)]) を返す
+
+    {"hypotheses": [...]} 形式とトップレベルが配列の形式に対応する。JSON として読めない場合は ValueError。
+    """
+    data = json.loads(extract_json_text(text))
+    items = data.get("hypotheses") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise ValueError("応答に hypotheses 配列が見つかりません")
+    valid, invalid = [], []
+    for item in items:
+        errors = validate_hypothesis(item)
+        if errors:
+            invalid.append((item, errors))
+        else:
+            valid.append(item)
+    return valid, invalid
+
+def build_repair_prompt(invalid: List[Tuple[Any, List[str]]]) -> str:
+    """スキーマに適合しなかった仮説だけを修正・再生成させるプロンプト"""
+    items = "\n".join(
+        f"- 仮説: {json.dumps(item, ensure_ascii=False)[:1500]}\n  エラー: {'; '.join(errors[:10])}"
+        for item, errors in invalid
+    )
+    return f"""以下の研究仮説は必要な形式を満たしていません。内容を保ったまま、エラーを修正した仮説を{len(invalid)}件出力してください。
+
+{items}
+
+各仮説は title, description, category（文字列）, confidence, novelty_score, feasibility_score（0-100の整数）,
+research_methods, key_factors（文字列の配列）を必ず含めてください。
+{{"hypotheses": [...]}} 形式のJSONのみを出力してください。"""
+
+def generate_with_repair(generate: Callable[[str], str], prompt: str,
+                         max_repairs: int = 1) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    generate(prompt) の応答を検証し、不適合の仮説だけを修正依頼で再生成する
+
+    Returns:
+        (有効な仮説, 修正後も不適合のまま残った件数)
+    """
+    valid, invalid = parse_hypotheses(generate(prompt))
+    for attempt in range(max_repairs):
+        if not invalid:
+            break
+        logger.warning(f"形式が不正な仮説 {len(invalid)} 件を再生成 (試行 {attempt + 1})")
+        try:
+            repaired, invalid = parse_hypotheses(generate(build_repair_prompt(invalid)))
+        except ValueError as e:
+            logger.warning(f"再生成した仮説の応答を解析できません: {e}")
+            break
+        valid.extend(repaired)
+    return valid, len(invalid)
@@ -0,0 +1,118 @@
+"""
+ストリーミング生成用の仮説パーサー
+
+Gemini の streamGenerateContent が返すテキスト断片を逐次受け取り、仮説オブジェクトが閉じた時点で
+1件ずつ取り出す。Flask アプリと scripts/ の仮説生成スクリプトの双方から利用するため、src.* には依存しない。
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+class IncrementalHypothesisParser:
+    """
+    JSON テキストを断片ごとに読み進め、完成した仮説オブジェクトを返すパーサー
+
+    {"hypotheses": [{...}, ...]} 形式と、トップレベルが配列 [{...}, ...] の形式の両方に対応する。
+    ```json のようなコードフェンスや前置きの文章は最初の { / [ まで読み飛ばす。
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._position = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._object_start: Optional[int] = None
+        self.emitted = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """テキスト断片を追加し、この断片で完成した仮説のリストを返す"""
+        self._buffer.append(chunk)
+        text = ''.join(self._buffer)
+        self._buffer = [text]
+        completed = []
+        for index in range(self._position, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if not self._stack and char not in '{[':
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                # トップレベル配列の要素、またはトップレベルオブジェクト内の配列の要素が仮説
+                if char == '{' and self._is_hypothesis_container():
+                    self._object_start = index
+                self._stack.append(char)
+            elif char in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if char == '}' and self._object_start is not None and self._is_hypothesis_container():
+                    hypothesis = self._decode(text[self._object_start:index + 1])
+                    self._object_start = None
+                    if hypothesis is not None:
+                        completed.append(hypothesis)
+        self._position = len(text)
+        self.emitted += len(completed)
+        return completed
+
+    @property
+    def text(self) -> str:
+        """これまでに受け取った全テキスト"""
+        return ''.join(self._buffer)
+
+    def _is_hypothesis_container(self) -> bool:
+        return self._stack == ['['] or self._stack == ['{', '[']
+
+    @staticmethod
+    def _decode(fragment: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = json.loads(fragment)
+        except json.JSONDecodeError as e:
+            logger.warning(f"ストリーム中の形式が不正な仮説オブジェクトをスキップ: {e}")
+            return None
+        return value if isinstance(value, dict) else None
+
+def iter_sse_text(response: requests.Response) -> Iterator[str]:
+    """
+    streamGenerateContent?alt=sse のレスポンスからテキスト断片を順に取り出す
+
+    各イベントの data 行は generateContent と同じ形式の JSON（candidates[0].content.parts[].text）。
+    """
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith('data:'):
+            continue
+        try:
+            event = json.loads(line[5:].strip())
+        except json.JSONDecodeError:
+            logger.warning("ストリームの解析できないイベントをスキップ")
+            continue
+        for candidate in event.get('candidates', [])[:1]:
+            for part in candidate.get('content', {}).get('parts', []):
+                if part.get('text'):
+                    yield part['text']
+
+def iter_hypotheses(chunks: Iterable[str], parser: Optional[IncrementalHypothesisParser] = None) -> Iterator[Dict[str, Any]]:
+    """テキスト断片の列から仮説を完成した順に返す"""
+    parser = parser or IncrementalHypothesisParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+
+def stream_url(generate_url: str) -> str:
+    """generateContent の URL から SSE 形式の streamGenerateContent の URL を作る"""
+    return generate_url.replace(':generateContent', ':streamGenerateContent') + '?alt=sse'
+
+def format_sse(event: str, data: Any) -> str:
+    """Server-Sent Events の1イベント分の文字列"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
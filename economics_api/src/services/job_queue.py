@@ -0,0 +1,272 @@
+"""
+SQLite ベースのバックグラウンドジョブキュー
+
+Gemini を呼び出す API（仮説生成、AI コメント・返信、バッチ処理）をリクエスト内で同期実行せず、ジョブとして
+登録してすぐにジョブ ID を返す。ジョブはワーカースレッドが順に取り出して Flask のアプリケーションコンテキスト内で
+実行し、結果を SQLite に保存するため、再起動しても失われない。複数の Flask プロセスが同じデータベースを使う場合も、
+取り出しは BEGIN IMMEDIATE で直列化されるため同じジョブが二重に実行されることはない。
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    progress TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created_at ON jobs (status, created_at);
+"""
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.utcfromtimestamp(timestamp).isoformat() + "Z" if timestamp else None
+
+class JobContext:
+    """実行中のジョブからキューへ進捗を報告するためのハンドル"""
+
+    def __init__(self, queue: "JobQueue", job_id: str):
+        self.queue = queue
+        self.job_id = job_id
+
+    def progress(self, progress: Dict[str, Any]) -> None:
+        """進捗を保存（ステータス確認で参照できる）"""
+        self.queue._update(self.job_id, progress=json.dumps(progress, ensure_ascii=False))
+
+    def saved_progress(self) -> Optional[Dict[str, Any]]:
+        """前回までに保存された進捗（中断後に再実行されたジョブが続きから処理するために使う）"""
+        job = self.queue.get(self.job_id)
+        return job["progress"] if job else None
+
+class JobQueue:
+    """
+    永続化されたジョブキューとワーカープール
+
+    register(kind, handler) で登録した handler(payload, context) の戻り値（JSON に変換できる値）が結果になり、
+    例外を送出したジョブは failed になる。実行中のジョブはリースを定期的に延長し、プロセスが停止してリースが
+    切れたジョブは別のワーカーが max_attempts 回まで再実行する。
+    """
+
+    def __init__(self, path: Optional[str] = None, workers: int = 2, lease: float = 120.0,
+                 max_attempts: int = 3, poll_interval: float = 1.0):
+        self.path = path
+        self.workers = workers
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.app = None
+        self._handlers: Dict[str, Callable[[Dict[str, Any], JobContext], Any]] = {}
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._finished = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    def init_app(self, app, path: Optional[str] = None, workers: Optional[int] = None,
+                 retention: float = 7 * 24 * 3600, start: bool = True) -> None:
+        """
+        データベースを準備し、古い完了済みジョブを削除する
+
+        start=False の場合はワーカースレッドを起動しない（ジョブの登録と参照のみ）。リクエストを処理する
+        プロセスで start() を呼ぶ。
+        """
+        self.app = app
+        self.path = path or self.path
+        self.workers = self.workers if workers is None else workers
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+        self.purge(retention)
+        if start:
+            self.start()
+
+    def start(self) -> None:
+        """ワーカースレッドを起動する（起動済みなら何もしない）"""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Job queue started with {self.workers} workers ({self.path})")
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any], JobContext], Any]) -> None:
+        self._handlers[kind] = handler
+
+    def enqueue(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """ジョブを登録し、ジョブの状態を返す"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload, ensure_ascii=False), QUEUED, time.time())
+            )
+        self._wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT id, kind, status, result, error, progress, attempts, created_at, started_at, finished_at "
+            "FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "result": json.loads(row[3]) if row[3] else None,
+            "error": row[4],
+            "progress": json.loads(row[5]) if row[5] else None,
+            "attempts": row[6],
+            "created_at": _isoformat(row[7]),
+            "started_at": _isoformat(row[8]),
+            "finished_at": _isoformat(row[9])
+        }
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """ジョブが完了するか timeout 秒経過するまで待ち、その時点の状態を返す（ロングポーリング用）"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in FINISHED_STATUSES or remaining <= 0:
+                return job
+            # 同じプロセスのワーカーが完了すれば即座に、他のプロセスの場合はポーリング間隔で検出する
+            with self._finished:
+                self._finished.wait(min(remaining, self.poll_interval))
+
+    def requeue(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        完了したジョブを進捗を残したまま待機中に戻し、ジョブの状態を返す（存在しなければ None）
+
+        待機中・実行中のジョブはそのまま返す。試行回数はリセットする。
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = NULL, error = NULL, attempts = 0, started_at = NULL, "
+                "finished_at = NULL, lease_until = NULL WHERE id = ? AND status IN (?, ?)",
+                (QUEUED, job_id, *FINISHED_STATUSES)
+            )
+        self._wakeup.set()
+        return self.get(job_id)
+
+    def purge(self, older_than: float) -> int:
+        """完了から older_than 秒以上経過したジョブを削除"""
+        with self._transaction() as conn:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (*FINISHED_STATUSES, time.time() - older_than)
+            ).rowcount
+
+    def _work(self) -> None:
+        while True:
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to claim job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(*job)
+
+    def _claim(self) -> Optional[tuple]:
+        """
+        待機中のジョブ、またはリースが切れた実行中のジョブを1件取り出す
+
+        リースが切れたジョブのうち試行回数が上限に達したものは failed にする。
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, "Job was interrupted too many times", now, RUNNING, now, self.max_attempts)
+            )
+            row = conn.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, lease_until = ? WHERE id = ?",
+                (RUNNING, now, now + self.lease, row[0])
+            )
+        return row[0], row[1], json.loads(row[2])
+
+    def _run(self, job_id: str, kind: str, payload: Dict[str, Any]) -> None:
+        logger.info(f"Running job {job_id} ({kind})")
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, stop_heartbeat), daemon=True)
+        heartbeat.start()
+        try:
+            handler = self._handlers.get(kind)
+            if handler is None:
+                raise ValueError(f"Unknown job kind: {kind}")
+            with self.app.app_context():
+                result = handler(payload, JobContext(self, job_id))
+            self._update(job_id, status=SUCCEEDED, result=json.dumps(result, ensure_ascii=False, default=str),
+                         finished_at=time.time(), lease_until=None)
+            logger.info(f"Job {job_id} ({kind}) succeeded")
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind}) failed: {e}")
+            self._update(job_id, status=FAILED, error=str(e), finished_at=time.time(), lease_until=None)
+        finally:
+            stop_heartbeat.set()
+            with self._finished:
+                self._finished.notify_all()
+
+    def _heartbeat(self, job_id: str, stop: threading.Event) -> None:
+        """実行中はリースを延長し、長いジョブが他のワーカーに取り直されないようにする"""
+        while not stop.wait(self.lease / 3):
+            try:
+                self._update(job_id, lease_until=time.time() + self.lease)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to extend lease for job {job_id}: {e}")
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._transaction() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _transaction(self) -> sqlite3.Connection:
+        """書き込み用の接続（with ブロックの間 BEGIN IMMEDIATE でロックを取る）"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+# アプリ全体で共有するキュー（main.py の init_app で起動し、各ルートがハンドラを登録する）
+job_queue = JobQueue()
@@ -0,0 +1,171 @@
+"""
+LLM 応答キャッシュ
+
+(モデル, 生成設定, プロンプト) のハッシュをキーに Gemini の応答 JSON を保存する内容アドレス型のキャッシュ。
+プロセス内の LRU と、プロセス・再起動をまたいで共有する SQLite の2層で構成し、SQLite 側は TTL と合計サイズの
+上限で古いものから削除する。AI コメントサービスと scripts/ の仮説生成スクリプトで共有するため、src.* には依存しない。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+def cache_key(model: str, generation_config: Optional[Dict[str, Any]], prompt: str) -> str:
+    """(モデル, 生成設定, プロンプト) の内容ハッシュ"""
+    encoded = json.dumps([model, generation_config or {}, prompt], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    2層の応答キャッシュ
+
+    get はメモリ層、SQLite 層の順に引き、SQLite でヒットした値はメモリ層に載せる。put は両方に書き込み、
+    evict_interval 回ごとに SQLite 層の期限切れを削除して、合計サイズが max_bytes を超えていれば
+    最終アクセスの古い順に削除する。path を省略するとメモリ層のみで動作する。
+    """
+
+    key = staticmethod(cache_key)
+
+    def __init__(self, path: Optional[str] = None, memory_size: int = 256, ttl: float = 7 * 24 * 3600,
+                 max_bytes: int = 64 * 1024 * 1024, evict_interval: int = 50):
+        self.path = path
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.evict_interval = evict_interval
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._puts = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evicted": 0}
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.executescript(_SCHEMA)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+        value = self._get_disk(key, now)
+        with self._lock:
+            self._stats["disk_hits" if value is not None else "misses"] += 1
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        expires_at = time.time() + self.ttl
+        self._put_memory(key, value, expires_at)
+        if not self.path:
+            return
+        encoded = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        try:
+            with self._connect() as conn:
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, encoded, len(encoded.encode("utf-8")), now, now, expires_at)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to store LLM response in cache: {e}")
+            return
+        with self._lock:
+            self._puts += 1
+            due = self._puts % self.evict_interval == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """SQLite 層の期限切れと、サイズ上限を超えた分（最終アクセスの古い順）を削除し、削除件数を返す"""
+        if not self.path:
+            return 0
+        removed = 0
+        try:
+            with self._connect() as conn:
+                removed += conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),)).rowcount
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total > self.max_bytes:
+                    excess = total - self.max_bytes
+                    cursor = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at")
+                    victims = []
+                    for key, size in cursor:
+                        victims.append((key,))
+                        excess -= size
+                        if excess <= 0:
+                            break
+                    conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+                    removed += len(victims)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to evict LLM response cache: {e}")
+        with self._lock:
+            self._stats["evicted"] += removed
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        return stats
+
+    def _put_memory(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _get_disk(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        if not self.path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read LLM response cache: {e}")
+            return None
+        value = json.loads(row[0])
+        self._put_memory(key, value, row[1])
+        return value
+
+    def _connect(self) -> sqlite3.Connection:
+        """スレッドごとの接続（with ブロックでトランザクションを確定する）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,140 @@
+"""
+プロセス間で共有するレート制限
+
+リクエスト数/分とトークン数/分の2つのトークンバケットを SQLite に保存し、同じホスト上の Flask ワーカー・
+バッチ処理・定期実行の仮説生成スクリプトが同じ残量を参照する。残量が足りない場合は補充を待つか、
+RateLimitExceeded を送出して即座に失敗するかを呼び出し側で選べる。src.* には依存しない。
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from typing import Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    requests REAL NOT NULL,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "gemini_rate_limit.db")
+
+class RateLimitExceeded(requests.exceptions.RequestException):
+    """残量が足りず、待たない（または max_wait 以内に補充されない）。再試行せずに呼び出し元へ返す"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucketLimiter:
+    """
+    リクエスト数とトークン数のトークンバケット
+
+    各バケットは1分あたりの上限を容量とし、経過時間に比例して補充される。acquire は両方のバケットに
+    必要量がある場合にだけまとめて消費する。状態の読み書きは SQLite の BEGIN IMMEDIATE で直列化するため、
+    プロセスをまたいでも二重に消費しない。上限に 0 以下を指定したバケットは制限しない。
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float = 0, path: str = DEFAULT_PATH,
+                 name: str = "gemini", max_wait: float = 120.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.path = path
+        self.name = name
+        self.max_wait = max_wait
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect().execute(_SCHEMA)
+
+    def acquire(self, tokens: float = 0, wait: bool = True, max_wait: Optional[float] = None) -> float:
+        """
+        1リクエスト分と tokens 分を消費し、待った秒数を返す
+
+        wait=False では残量が足りなければ即座に、wait=True では max_wait 秒待っても足りなければ
+        RateLimitExceeded を送出する。1分あたりの上限を超える tokens は上限まで切り詰める。
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        if self.tokens_per_minute > 0:
+            tokens = min(tokens, self.tokens_per_minute)
+        started = time.monotonic()
+        while True:
+            shortfall = self._try_acquire(tokens)
+            if shortfall <= 0:
+                return time.monotonic() - started
+            waited = time.monotonic() - started
+            if not wait or waited + shortfall > max_wait:
+                raise RateLimitExceeded(
+                    f"Gemini rate limit reached ({self.requests_per_minute:g} req/min, "
+                    f"{self.tokens_per_minute:g} tokens/min); retry after {shortfall:.1f}s",
+                    retry_after=shortfall
+                )
+            time.sleep(shortfall)
+
+    def _try_acquire(self, tokens: float) -> float:
+        """補充後の残量から消費を試み、成功なら 0、不足なら補充までの秒数を返す"""
+        conn = self._connect()
+        now = time.time()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT requests, tokens, updated_at FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            if row is None:
+                level_requests, level_tokens = self.requests_per_minute, self.tokens_per_minute
+            else:
+                elapsed = max(0.0, now - row[2])
+                level_requests = min(self.requests_per_minute, row[0] + elapsed * self.requests_per_minute / 60.0)
+                level_tokens = min(self.tokens_per_minute, row[1] + elapsed * self.tokens_per_minute / 60.0)
+
+            shortfall = 0.0
+            if self.requests_per_minute > 0 and level_requests < 1:
+                shortfall = max(shortfall, (1 - level_requests) * 60.0 / self.requests_per_minute)
+            if self.tokens_per_minute > 0 and level_tokens < tokens:
+                shortfall = max(shortfall, (tokens - level_tokens) * 60.0 / self.tokens_per_minute)
+            if shortfall <= 0:
+                level_requests -= 1
+                level_tokens -= tokens
+
+            conn.execute("INSERT OR REPLACE INTO buckets (name, requests, tokens, updated_at) VALUES (?, ?, ?, ?)",
+                         (self.name, level_requests, level_tokens, now))
+            conn.execute("COMMIT")
+            return shortfall
+        except sqlite3.Error as e:
+            # 状態ファイルが使えない場合は制限せずに続行する（レート制限で本処理を止めない）
+            logger.warning(f"Rate limiter state unavailable, not limiting: {e}")
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            return 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # トランザクションは BEGIN IMMEDIATE で明示的に管理する
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+def limiter_from_env() -> Optional[TokenBucketLimiter]:
+    """
+    GEMINI_RPM / GEMINI_TPM が設定されていればホスト共有のリミッター
+
+    保存先は GEMINI_RATE_LIMIT_PATH（既定は一時ディレクトリ）で、同じホストの全プロセスで同じパスを使う。
+    """
+    requests_per_minute = float(os.getenv("GEMINI_RPM", "0"))
+    tokens_per_minute = float(os.getenv("GEMINI_TPM", "0"))
+    if requests_per_minute <= 0 and tokens_per_minute <= 0:
+        return None
+    return TokenBucketLimiter(requests_per_minute, tokens_per_minute,
+                              path=os.getenv("GEMINI_RATE_LIMIT_PATH", DEFAULT_PATH),
+                              max_wait=float(os.getenv("GEMINI_RATE_LIMIT_MAX_WAIT", "120")))
@@ -4,33 +4,47 @@
 GitHub Actionsとフロントエンドの「更新」ボタンから呼び出される
 """
 
-import google.generativeai as genai
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-def generate_hypotheses(api_key):
-    """Gemini APIを使用して新しい仮説を生成"""
-    try:
-        # Gemini APIキーを設定
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from near_duplicate import NearDuplicateIndex, filter_duplicates, hypothesis_key
+from hypothesis_archive import HypothesisArchive
+from static_publisher import StaticPublisher
 
-        # 新しい仮説を生成
-        prompt = '''
-        経済学に関する新しい研究仮説を8つ生成してください。
+# Flask API と共有する仮説スキーマ・検証
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'economics_api', 'src', 'services'))
+from hypothesis_schema import generate_with_repair, structured_generation_config
+from gemini_client import get_client
+from rate_limiter import limiter_from_env
+
+# ファンアウトモードで1カテゴリずつ並列に生成する研究分野
+CATEGORIES = ['金融政策', 'マクロ経済学', '国際経済学', '労働経済学', '環境経済学', 'デジタル経済学', '金融市場', 'エネルギー経済学']
+
+def build_prompt(count=8, category=None):
+    """仮説生成プロンプトを構築（category を指定するとその分野だけの仮説を依頼）"""
+    if category:
+        request = f'経済学の「{category}」分野に関する新しい研究仮説を{count}つ生成してください。'
+        category_spec = f'{category}（固定）'
+    else:
+        request = f'経済学に関する新しい研究仮説を{count}つ生成してください。'
+        category_spec = 'カテゴリ（' + '、'.join(CATEGORIES[:-1]) + f'、{CATEGORIES[-1]}のいずれか）'
+    return f'''
+        {request}
         各仮説は以下のJSON形式で出力してください：
 
-        {
-          "total_hypotheses": 8,
+        {{
+          "total_hypotheses": {count},
           "generated_at": "現在のISO形式の日時",
           "hypotheses": [
-            {
+            {{
               "id": 1,
               "title": "仮説のタイトル",
               "description": "詳細な説明（200-300文字）",
-              "category": "カテゴリ（金融政策、マクロ経済学、国際経済学、労働経済学、環境経済学、デジタル経済学、金融市場、エネルギー経済学のいずれか）",
+              "category": "{category_spec}",
               "confidence": 70-95の整数,
               "research_methods": ["研究手法1", "研究手法2", "研究手法3", "研究手法4"],
               "key_factors": ["重要要因1", "重要要因2", "重要要因3", "重要要因4"],
@@ -40,47 +54,134 @@ def generate_hypotheses(api_key):
               "feasibility_score": 65-95の整数,
               "expected_impact": "期待される影響の説明",
               "generated_at": "現在のISO形式の日時"
-            }
+            }}
           ]
-        }
+        }}
 
         最新の経済動向、技術革新、社会変化を反映した革新的で実現可能な仮説を生成してください。
         '''
 
-        response = model.generate_content(prompt)
-        generated_text = response.text
-        
-        # JSON形式を抽出
-        import re
-        json_match = re.search(r'```json\s*([\s\S]*?)\s*```', generated_text) or re.search(r'```\s*([\s\S]*?)\s*```', generated_text)
-        if json_match:
-            json_text = json_match.group(1).strip()
-        else:
-            # コードブロックがない場合は、最初の { から最後の } までを抽出してみる
-            start_idx = generated_text.find('{')
-            end_idx = generated_text.rfind('}')
-            if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                json_text = generated_text[start_idx:end_idx + 1].strip()
-            else:
-                json_text = generated_text.strip()
-        
-        # JSONをパース
-        hypotheses_data = json.loads(json_text)
-        
-        # 生成日時を更新
-        current_time = datetime.utcnow().isoformat() + 'Z'
-        hypotheses_data['generated_at'] = current_time
-        
-        for i, hyp in enumerate(hypotheses_data['hypotheses']):
-            hyp['id'] = i + 1
-            hyp['generated_at'] = current_time
+def create_client(api_key):
+    """共有 Gemini クライアントを取得（ファンアウトの並列呼び出しもコネクションプールを再利用）"""
+    return get_client(api_key, model='gemini-2.5-flash', limiter=limiter_from_env())
+
+def generation_config():
+    """生成設定（GEMINI_STRUCTURED_OUTPUT=1 では仮説スキーマに沿ったJSONのみを出力させる）"""
+    if os.getenv('GEMINI_STRUCTURED_OUTPUT', '0') == '1':
+        return structured_generation_config()
+    return None
+
+def generate_validated(client, prompt):
+    """生成結果をスキーマで検証し、不適合の仮説だけを再生成"""
+    config = generation_config()
+    hypotheses, rejected = generate_with_repair(lambda text: client.generate_text(text, config), prompt)
+    if rejected:
+        print(f'形式が不正な仮説 {rejected} 件を除外しました', file=sys.stderr)
+    return hypotheses
+
+def finalize(hypotheses):
+    """生成日時を更新し、内容ハッシュのIDを付けて出力データを組み立てる"""
+    current_time = datetime.utcnow().isoformat() + 'Z'
+    for hyp in hypotheses:
+        hyp['id'] = hypothesis_key(hyp)
+        hyp['generated_at'] = current_time
+    
+    return {
+        'total_hypotheses': len(hypotheses),
+        'generated_at': current_time,
+        'hypotheses': hypotheses
+    }
+
+def generate_hypotheses(api_key):
+    """Gemini APIを使用して新しい仮説を生成"""
+    try:
+        client = create_client(api_key)
+
+        # 新しい仮説を生成し、スキーマで検証
+        hypotheses = generate_validated(client, build_prompt(8))
+        if not hypotheses:
+            print('有効な仮説が生成されませんでした', file=sys.stderr)
+            return None
         
-        return hypotheses_data
+        return finalize(hypotheses)
         
     except Exception as e:
         print(f'仮説生成エラー: {e}', file=sys.stderr)
         return None
 
+def generate_category(client, category, count=1):
+    """1カテゴリ分の仮説を生成（ファンアウトの1単位）"""
+    hypotheses = generate_validated(client, build_prompt(count, category))
+    for hyp in hypotheses:
+        hyp['category'] = category
+    return hypotheses
+
+def generate_hypotheses_fanout(api_key, categories=CATEGORIES, per_category=1):
+    """
+    カテゴリごとの短いプロンプトを並列に送信して仮説を生成
+
+    全体の待ち時間は短い応答1回分程度になる。一部のカテゴリが失敗しても残りの結果で続行し、
+    すべて失敗した場合のみ None を返す。
+    """
+    client = create_client(api_key)
+    
+    hypotheses = []
+    failed = []
+    with ThreadPoolExecutor(max_workers=len(categories)) as executor:
+        futures = {executor.submit(generate_category, client, category, per_category): category for category in categories}
+        results = {}
+        for future in as_completed(futures):
+            category = futures[future]
+            try:
+                results[category] = future.result()
+            except Exception as e:
+                print(f'仮説生成エラー（{category}）: {e}', file=sys.stderr)
+                failed.append(category)
+    
+    # カテゴリの指定順に統合し、同じタイトルの重複を除く
+    seen_titles = set()
+    for category in categories:
+        for hyp in results.get(category, []):
+            if hyp.get('title') and hyp['title'] not in seen_titles:
+                seen_titles.add(hyp['title'])
+                hypotheses.append(hyp)
+    
+    if failed:
+        print(f'{len(failed)} カテゴリの生成に失敗しました: {", ".join(failed)}', file=sys.stderr)
+    if not hypotheses:
+        return None
+    
+    return finalize(hypotheses)
+
+def check_duplicates(hypotheses_data, index_path='data/near_duplicate_index.json',
+                     previous_path='public/data/hypotheses.json', mode='flag'):
+    """
+    過去に生成した仮説との近似重複を検出（mode='flag' で印を付け、'reject' で除外）
+
+    インデックスは実行間で保持し、初回は既存の出力ファイルの仮説から作成する。
+    """
+    index = NearDuplicateIndex.load(index_path)
+    if os.path.exists(previous_path):
+        try:
+            with open(previous_path, 'r', encoding='utf-8') as f:
+                for hyp in json.load(f).get('hypotheses', []):
+                    index.add_hypothesis(hyp)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f'既存の仮説の読み込みエラー: {e}', file=sys.stderr)
+    
+    hypotheses = filter_duplicates(hypotheses_data['hypotheses'], index, mode=mode)
+    duplicates = len(hypotheses_data['hypotheses']) - len(hypotheses) if mode == 'reject' else \
+        sum(1 for hyp in hypotheses if 'duplicate_of' in hyp)
+    if duplicates:
+        print(f'{duplicates} 件の近似重複を検出しました')
+    
+    try:
+        index.save(index_path)
+    except OSError as e:
+        print(f'重複検出インデックスの保存エラー: {e}', file=sys.stderr)
+    
+    return finalize(hypotheses) if mode == 'reject' else hypotheses_data
+
 def save_hypotheses(hypotheses_data, output_path='public/data/hypotheses.json'):
     """生成された仮説をJSONファイルに保存"""
     try:
@@ -97,6 +198,20 @@ def save_hypotheses(hypotheses_data, output_path='public/data/hypotheses.json'):
         print(f'ファイル保存エラー: {e}', file=sys.stderr)
         return False
 
+def publish_shards(hypotheses_data, output_dir='public/data'):
+    """フロントエンド初回表示用の index.json と仮説・実行ごとのシャードを書き出す"""
+    try:
+        run_id = hypotheses_data.get('run_id')
+        if not run_id:
+            # アーカイブに保存できなかった場合は生成日時から実行IDを作る（ファイル名に使えない ':' を含めない）
+            generated_at = datetime.fromisoformat(hypotheses_data['generated_at'].rstrip('Z'))
+            run_id = generated_at.strftime('%Y%m%dT%H%M%S')
+        StaticPublisher(output_dir).publish(run_id, hypotheses_data['generated_at'], hypotheses_data['hypotheses'])
+        return True
+    except OSError as e:
+        print(f'分割データ出力エラー: {e}', file=sys.stderr)
+        return False
+
 def main():
     """メイン関数"""
     # 環境変数からAPIキーを取得
@@ -106,16 +221,34 @@ def main():
         print('エラー: GEMINI_API_KEYまたはVITE_GEMINI_API_KEYが設定されていません', file=sys.stderr)
         sys.exit(1)
     
-    # 仮説を生成
+    # 仮説を生成（HYPOTHESIS_FANOUT=1 でカテゴリごとに並列生成）
     print('新しい研究仮説を生成中...')
-    hypotheses_data = generate_hypotheses(api_key)
+    if os.getenv('HYPOTHESIS_FANOUT', '0') == '1':
+        hypotheses_data = generate_hypotheses_fanout(api_key)
+    else:
+        hypotheses_data = generate_hypotheses(api_key)
     
     if hypotheses_data is None:
         print('仮説生成に失敗しました', file=sys.stderr)
         sys.exit(1)
     
+    # 過去の仮説との近似重複を検出（DUPLICATE_MODE=reject で除外）
+    hypotheses_data = check_duplicates(hypotheses_data, mode=os.getenv('DUPLICATE_MODE', 'flag'))
+    if not hypotheses_data['hypotheses']:
+        print('新しい仮説がすべて既存の仮説と重複していたため、保存しません', file=sys.stderr)
+        sys.exit(1)
+    
+    # 全実行の仮説を追記専用アーカイブに保存（出力ファイルは最新の実行分のみ）
+    try:
+        archive = HypothesisArchive(os.getenv('HYPOTHESIS_ARCHIVE_DIR', 'data/archive'))
+        hypotheses_data['run_id'] = archive.append_run(hypotheses_data['hypotheses'],
+                                                       generated_at=hypotheses_data['generated_at'])
+    except OSError as e:
+        print(f'仮説アーカイブ保存エラー: {e}', file=sys.stderr)
+    
     # ファイルに保存
     if save_hypotheses(hypotheses_data):
+        publish_shards(hypotheses_data, os.getenv('HYPOTHESIS_PUBLISH_DIR', 'public/data'))
         print(f'{hypotheses_data["total_hypotheses"]} 件の新しい仮説を生成しました')
         print(f'生成日時: {hypotheses_data["generated_at"]}')
     else:
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+経済カレンダー
+ローカルの ICS / CSV フィードから経済指標の発表・政策イベントを読み込み、開始時刻でソートした区間インデックスに格納する。
+「今後N日間の重要イベント」「特定系列に関係する発表」といった問い合わせを二分探索で処理する。
+"""
+
+import csv
+import datetime
+import logging
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+IMPORTANCE_LEVELS = ('High', 'Medium', 'Low')
+
+@dataclass
+class CalendarEvent:
+    """経済カレンダーのイベント"""
+    event: str
+    start: datetime.datetime
+    end: datetime.datetime
+    importance: str = 'Medium'
+    country: str = ''
+    impact: str = ''
+    series: List[str] = field(default_factory=list)  # 関係する系列（FREDシリーズIDや指標名）
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'event': self.event,
+            'date': self.start.strftime('%Y-%m-%d'),
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'importance': self.importance,
+            'country': self.country,
+            'impact': self.impact,
+            'series': list(self.series)
+        }
+
+class _SortedEvents:
+    """開始時刻でソートしたイベント列（区間の重なり検索用に最大継続時間を保持）"""
+
+    def __init__(self, events: Iterable[CalendarEvent]):
+        self.events = sorted(events, key=lambda event: event.start)
+        self.starts = [event.start for event in self.events]
+        self.max_duration = max((event.end - event.start for event in self.events), default=datetime.timedelta(0))
+
+    def overlapping(self, start: datetime.datetime, end: datetime.datetime) -> List[CalendarEvent]:
+        """[start, end] と重なるイベント。開始時刻が start - 最大継続時間 以降の範囲だけを走査する"""
+        lo = bisect_left(self.starts, start - self.max_duration)
+        hi = bisect_right(self.starts, end)
+        return [event for event in self.events[lo:hi] if event.end >= start]
+
+class EventIntervalIndex:
+    """重要度別・系列別に分割した経済イベントの区間インデックス"""
+
+    def __init__(self, events: Iterable[CalendarEvent]):
+        events = list(events)
+        self.size = len(events)
+        self._all = _SortedEvents(events)
+        self._by_importance = {
+            level: _SortedEvents(event for event in events if event.importance == level)
+            for level in IMPORTANCE_LEVELS
+        }
+        series_events: Dict[str, List[CalendarEvent]] = {}
+        for event in events:
+            for series in event.series:
+                series_events.setdefault(series.lower(), []).append(event)
+        self._by_series = {series: _SortedEvents(items) for series, items in series_events.items()}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def between(self, start: datetime.datetime, end: datetime.datetime,
+                importance: Optional[str] = None) -> List[CalendarEvent]:
+        """期間と重なるイベント（重要度指定可）"""
+        events = self._by_importance.get(importance) if importance else self._all
+        return events.overlapping(start, end) if events else []
+
+    def upcoming(self, days: int, importance: Optional[str] = None,
+                 now: Optional[datetime.datetime] = None) -> List[CalendarEvent]:
+        """今後 days 日間のイベント"""
+        now = now or datetime.datetime.now()
+        return self.between(now, now + datetime.timedelta(days=days), importance)
+
+    def for_series(self, series: str, start: Optional[datetime.datetime] = None,
+                   end: Optional[datetime.datetime] = None) -> List[CalendarEvent]:
+        """系列に関係するイベント（期間指定可）"""
+        events = self._by_series.get(series.lower())
+        if not events:
+            return []
+        if start is None and end is None:
+            return list(events.events)
+        return events.overlapping(start or datetime.datetime.min, end or datetime.datetime.max)
+
+    def next_release(self, series: str, now: Optional[datetime.datetime] = None) -> Optional[CalendarEvent]:
+        """系列に関係する次回イベント"""
+        events = self._by_series.get(series.lower())
+        if not events:
+            return None
+        position = bisect_left(events.starts, now or datetime.datetime.now())
+        return events.events[position] if position < len(events.events) else None
+
+def _parse_datetime(value: str) -> datetime.datetime:
+    """CSV/ICSの日時文字列を naive datetime に変換（UTC指定はローカル時刻に変換）"""
+    value = value.strip()
+    if len(value) == 8 and value.isdigit():
+        return datetime.datetime.strptime(value, '%Y%m%d')
+    if 'T' in value and '-' not in value:
+        utc = value.endswith('Z')
+        parsed = datetime.datetime.strptime(value.rstrip('Z')[:15], '%Y%m%dT%H%M%S')
+        if utc:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc).astimezone().replace(tzinfo=None)
+        return parsed
+    parsed = datetime.datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def _normalize_importance(value: str) -> str:
+    value = (value or '').strip()
+    if value.isdigit():
+        # RFC 5545 PRIORITY: 1-4 高, 5 中, 6-9 低
+        priority = int(value)
+        return 'High' if 1 <= priority <= 4 else 'Medium' if priority == 5 else 'Low'
+    for level in IMPORTANCE_LEVELS:
+        if value.lower() == level.lower():
+            return level
+    return 'Medium'
+
+def _split_series(value: str) -> List[str]:
+    return [item.strip() for item in (value or '').replace(',', ';').split(';') if item.strip()]
+
+def load_csv(path: str) -> List[CalendarEvent]:
+    """
+    CSVフィードの読み込み
+
+    列: event, date（または start）, end（省略可）, importance, country, impact, series（; 区切り）
+    """
+    events = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                start = _parse_datetime(row.get('start') or row['date'])
+                end = _parse_datetime(row['end']) if row.get('end') else start
+                events.append(CalendarEvent(
+                    event=row['event'].strip(),
+                    start=start,
+                    end=max(start, end),
+                    importance=_normalize_importance(row.get('importance', '')),
+                    country=(row.get('country') or '').strip(),
+                    impact=(row.get('impact') or '').strip(),
+                    series=_split_series(row.get('series', ''))
+                ))
+            except (KeyError, ValueError, AttributeError) as e:
+                logger.warning(f"経済カレンダーCSV {line_number} 行目の解析エラー: {e}")
+    return events
+
+def load_ics(path: str) -> List[CalendarEvent]:
+    """
+    ICSフィードの読み込み
+
+    SUMMARY, DTSTART, DTEND, PRIORITY（または X-IMPORTANCE）, LOCATION（国）, CATEGORIES（影響分野）,
+    X-SERIES（関係系列、; 区切り）を使用する。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        raw_lines = f.read().splitlines()
+
+    # 折り返し行（先頭が空白）を前の行に連結
+    lines: List[str] = []
+    for line in raw_lines:
+        if line[:1] in (' ', '\t') and lines:
+            lines[-1] += line[1:]
+        else:
+            lines.append(line)
+
+    events = []
+    properties: Optional[Dict[str, str]] = None
+    for line in lines:
+        if line == 'BEGIN:VEVENT':
+            properties = {}
+        elif line == 'END:VEVENT' and properties is not None:
+            try:
+                start = _parse_datetime(properties['DTSTART'])
+                end = _parse_datetime(properties['DTEND']) if 'DTEND' in properties else start
+                events.append(CalendarEvent(
+                    event=properties.get('SUMMARY', '').replace('\\,', ',').strip(),
+                    start=start,
+                    end=max(start, end),
+                    importance=_normalize_importance(properties.get('X-IMPORTANCE') or properties.get('PRIORITY', '')),
+                    country=properties.get('LOCATION', '').strip(),
+                    impact=properties.get('CATEGORIES', '').replace('\\,', ',').strip(),
+                    series=_split_series(properties.get('X-SERIES', ''))
+                ))
+            except (KeyError, ValueError) as e:
+                logger.warning(f"経済カレンダーICSイベントの解析エラー: {e}")
+            properties = None
+        elif properties is not None and ':' in line:
+            name, value = line.split(':', 1)
+            # DTSTART;TZID=...:20241105T083000 のようなパラメータ付きプロパティ名はパラメータを除去
+            properties[name.split(';', 1)[0].upper()] = value
+    return events
+
+def load_calendar(path: str) -> EventIntervalIndex:
+    """拡張子に応じて ICS / CSV フィードを読み込み、区間インデックスを構築"""
+    loader = load_ics if path.lower().endswith('.ics') else load_csv
+    return EventIntervalIndex(loader(path))
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+派生特徴量エンジン
+列指向ストアの全シリーズを月次グリッド（シリーズ × 月）の行列に揃え、前年比・前月比・ローリングボラティリティ・
+ドローダウン・ヒストリカルZスコアを行列演算で一括計算する。
+"""
+
+import datetime
+import warnings
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from timeseries_store import ColumnarSeriesStore
+
+# 単位が「%」のシリーズは変化率ではなく差（パーセントポイント）で変化を表す
+PERCENT_UNITS = ('%', '% of GDP')
+
+class SeriesFeatures:
+    """シリーズごとの派生特徴量（各属性はシリーズ数と同じ長さの配列）"""
+
+    FEATURES = ('latest', 'mom', 'yoy', 'volatility', 'drawdown', 'zscore')
+
+    def __init__(self, keys: List[str], names: List[str], sources: List[str], units: List[str],
+                 observations: np.ndarray, **features: np.ndarray):
+        self.keys = keys
+        self.names = names
+        self.sources = sources
+        self.units = units
+        self.observations = observations
+        for feature in self.FEATURES:
+            setattr(self, feature, features[feature])
+        self._positions: Dict[str, int] = {}
+        for i, name in enumerate(names):
+            self._positions.setdefault(name, i)
+        self._key_positions = {key: i for i, key in enumerate(keys)}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        """指標名から特徴量を取得（同名シリーズが複数ある場合は最初のもの）"""
+        position = self._positions.get(name)
+        return None if position is None else self._row(position)
+
+    def column(self, feature: str, keys: List[str]) -> np.ndarray:
+        """指定したシリーズキーの順に並べた特徴量配列（該当シリーズがなければNaN）"""
+        positions = np.array([self._key_positions.get(key, -1) for key in keys], dtype=np.int64)
+        # 末尾にNaNを追加し、位置 -1 がNaNを指すようにする
+        return np.append(getattr(self, feature), np.nan)[positions]
+
+    def records(self) -> List[Dict[str, Any]]:
+        """JSON出力用のレコード一覧（欠損値はNone）"""
+        return [self._row(i) for i in range(len(self.keys))]
+
+    def _row(self, i: int) -> Dict[str, Any]:
+        row = {
+            'name': self.names[i],
+            'source': self.sources[i],
+            'unit': self.units[i],
+            'observations': int(self.observations[i])
+        }
+        for feature in self.FEATURES:
+            value = float(getattr(self, feature)[i])
+            row[feature] = None if np.isnan(value) else round(value, 4)
+        return row
+
+def _forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """行方向に直前の有効値で欠損を埋める"""
+    valid = ~np.isnan(matrix)
+    index = np.where(valid, np.arange(matrix.shape[1]), 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    filled = matrix[np.arange(matrix.shape[0])[:, None], index]
+    # 最初の観測より前は欠損のまま
+    filled[~np.maximum.accumulate(valid, axis=1)] = np.nan
+    return filled
+
+def compute_features(store: ColumnarSeriesStore, window_months: int = 120,
+                     as_of: Optional[datetime.date] = None) -> SeriesFeatures:
+    """
+    ストア内の全シリーズの派生特徴量を一括計算
+
+    Args:
+        store: 列指向時系列ストア
+        window_months: 計算対象とする直近の月数（Zスコア・ドローダウンの基準期間）
+        as_of: 基準日（省略時は今日）
+    """
+    keys = store.keys()
+    infos = [store.info(key) for key in keys]
+    end_month = np.datetime64(as_of or datetime.date.today(), 'M')
+    start_month = end_month - (window_months - 1)
+
+    # 全シリーズの観測値を連結し、(シリーズ, 月) の位置へ一度に配置
+    row_ids, positions, values = [], [], []
+    for row, key in enumerate(keys):
+        dates, series_values = store.read(key)
+        if len(dates) == 0:
+            continue
+        month_positions = (dates.astype('datetime64[M]') - start_month).astype(np.int64)
+        in_window = (month_positions >= 0) & (month_positions < window_months)
+        row_ids.append(np.full(int(in_window.sum()), row, dtype=np.int64))
+        positions.append(month_positions[in_window])
+        values.append(np.asarray(series_values)[in_window])
+
+    matrix = np.full((len(keys), window_months), np.nan)
+    observations = np.zeros(len(keys), dtype=np.int64)
+    if row_ids:
+        flat = np.concatenate(row_ids) * window_months + np.concatenate(positions)
+        flat_values = np.concatenate(values)
+        # 同じ月に複数の観測値がある場合は最後（最新日付）の値を採用
+        reversed_flat = flat[::-1]
+        unique_flat, first_in_reversed = np.unique(reversed_flat, return_index=True)
+        matrix.flat[unique_flat] = flat_values[::-1][first_in_reversed]
+        observations = np.bincount(unique_flat // window_months, minlength=len(keys))
+
+    filled = _forward_fill(matrix)
+    units = [info['unit'] if info else '' for info in infos]
+    is_percent = np.array([unit in PERCENT_UNITS for unit in units], dtype=bool)
+
+    with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        latest = filled[:, -1]
+
+        def change(lag: int) -> np.ndarray:
+            if window_months <= lag:
+                return np.full(len(keys), np.nan)
+            previous = filled[:, -1 - lag]
+            ratio_change = (latest / previous - 1.0) * 100.0
+            ratio_change[previous == 0] = np.nan
+            return np.where(is_percent, latest - previous, ratio_change)
+
+        mom = change(1)
+        yoy = change(12)
+
+        # 直近12ヶ月の月次変化の標準偏差
+        recent = filled[:, -13:]
+        monthly_changes = np.where(
+            is_percent[:, None],
+            np.diff(recent, axis=1),
+            (recent[:, 1:] / recent[:, :-1] - 1.0) * 100.0
+        )
+        volatility = np.nanstd(monthly_changes, axis=1)
+
+        drawdown = (latest / np.nanmax(filled, axis=1) - 1.0) * 100.0
+        mean = np.nanmean(filled, axis=1)
+        std = np.nanstd(filled, axis=1)
+        zscore = (latest - mean) / std
+        zscore[(std == 0) | (observations < 3)] = np.nan
+
+    return SeriesFeatures(
+        keys=keys,
+        names=[info['name'] if info else key for key, info in zip(keys, infos)],
+        sources=[info['source'] if info else '' for info in infos],
+        units=units,
+        observations=observations,
+        latest=latest,
+        mom=mom,
+        yoy=yoy,
+        volatility=volatility,
+        drawdown=drawdown,
+        zscore=zscore
+    )
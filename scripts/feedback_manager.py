@@ -34,7 +34,7 @@ class GitHubFeedbackManager:
             'User-Agent': 'Economics-Hypothesis-Generator-Feedback/1.0'
         })
     
-    def create_feedback_issue(self, hypothesis_id: int, hypothesis_title: str, feedback_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def create_feedback_issue(self, hypothesis_id: str, hypothesis_title: str, feedback_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """フィードバックをGitHub Issueとして作成"""
         logger.info(f"仮説 {hypothesis_id} のフィードバックIssueを作成中")
         
@@ -68,7 +68,7 @@ class GitHubFeedbackManager:
             logger.error(f"フィードバックIssue作成エラー: {e}")
             return None
     
-    def get_feedback_issues(self, hypothesis_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    def get_feedback_issues(self, hypothesis_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """フィードバックIssueを取得"""
         logger.info("フィードバックIssueを取得中")
         
@@ -115,7 +115,8 @@ class GitHubFeedbackManager:
                 # Issue本文からフィードバックデータを抽出
                 feedback = self._extract_feedback_from_issue(issue)
                 if feedback:
-                    hypothesis_id = feedback['hypothesis_id']
+                    # 仮説IDは内容ハッシュ（16桁の16進数）。以前の整数IDも文字列として扱う
+                    hypothesis_id = str(feedback['hypothesis_id'])
                     
                     if hypothesis_id not in feedback_data:
                         feedback_data[hypothesis_id] = []
@@ -182,7 +183,7 @@ class GitHubFeedbackManager:
         except Exception as e:
             logger.error(f"フィードバック集計データ保存エラー: {e}")
     
-    def _format_feedback_issue_body(self, hypothesis_id: int, hypothesis_title: str, feedback_data: Dict[str, Any]) -> str:
+    def _format_feedback_issue_body(self, hypothesis_id: str, hypothesis_title: str, feedback_data: Dict[str, Any]) -> str:
         """フィードバックIssue本文のフォーマット"""
         return f"""## 仮説へのフィードバック
 
@@ -215,7 +216,7 @@ class GitHubFeedbackManager:
 ### 構造化データ
 ```json
 {{
-  "hypothesis_id": {hypothesis_id},
+  "hypothesis_id": {json.dumps(str(hypothesis_id))},
   "feedback": {json.dumps(feedback_data, ensure_ascii=False, indent=2)}
 }}
 ```
@@ -255,10 +256,10 @@ class GitHubFeedbackManager:
                     ratings[key] = int(match.group(1))
             
             # 仮説IDを抽出
-            hypothesis_id_match = re.search(r'\*\*仮説ID\*\*:\s*(\d+)', body)
+            hypothesis_id_match = re.search(r'\*\*仮説ID\*\*:\s*([0-9a-f]+)', body)
             if hypothesis_id_match and ratings:
                 return {
-                    'hypothesis_id': int(hypothesis_id_match.group(1)),
+                    'hypothesis_id': hypothesis_id_match.group(1),
                     'feedback': ratings
                 }
             
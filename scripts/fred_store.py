@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+FRED観測値ストア
+シリーズごとに観測値（日付, 値）をCSVへ追記保存し、実行のたびに最終保存日以降の差分だけを取得できるようにする。
+"""
+
+import os
+import threading
+import logging
+from typing import List, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class FredObservationStore:
+    """FREDシリーズ単位の追記型観測値ストア"""
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, series_id: str) -> str:
+        return os.path.join(self.store_dir, f"{series_id}.csv")
+
+    def _lock(self, series_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(series_id, threading.Lock())
+
+    def latest(self, series_id: str) -> Optional[Tuple[str, float]]:
+        """保存済みの最新観測値（日付, 値）。ファイル末尾のみを読む"""
+        path = self._path(series_id)
+        try:
+            with open(path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                f.seek(max(0, size - 256))
+                tail = f.read().decode('utf-8')
+        except OSError:
+            return None
+        lines = [line for line in tail.splitlines() if line.strip()]
+        if not lines:
+            return None
+        date, value = lines[-1].split(',', 1)
+        return date, float(value)
+
+    def last_date(self, series_id: str) -> Optional[str]:
+        """保存済みの最終観測日（未保存の場合はNone）"""
+        latest = self.latest(series_id)
+        return latest[0] if latest else None
+
+    def append(self, series_id: str, observations: List[Dict[str, str]]) -> int:
+        """最終観測日より新しい観測値を日付順に追記し、追記件数を返す（欠損値 '.' は除外）"""
+        with self._lock(series_id):
+            last = self.last_date(series_id)
+            rows = sorted(
+                (obs['date'], obs['value']) for obs in observations
+                if obs.get('value') not in (None, '.') and (last is None or obs['date'] > last)
+            )
+            if not rows:
+                return 0
+            with open(self._path(series_id), 'a', encoding='utf-8') as f:
+                for date, value in rows:
+                    f.write(f"{date},{float(value)}\n")
+            return len(rows)
+
+    def load(self, series_id: str) -> List[Tuple[str, float]]:
+        """シリーズの全観測値を日付順に読み込む"""
+        try:
+            with open(self._path(series_id), 'r', encoding='utf-8') as f:
+                return [
+                    (date, float(value))
+                    for date, value in (line.strip().split(',', 1) for line in f if line.strip())
+                ]
+        except OSError:
+            return []
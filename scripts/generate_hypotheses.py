@@ -5,15 +5,45 @@
 """
 
 import os
+import sys
 import json
+import hashlib
+import inspect
 import requests
 import datetime
 import time
 import logging
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import List, Dict, Any, Optional, Callable, Sequence, Tuple
+from dataclasses import dataclass, asdict
+from urllib.parse import urlparse
 import xml.etree.ElementTree as ET
 
+import numpy as np
+
+from http_cache import CachedSession
+from fred_store import FredObservationStore
+from timeseries_store import ColumnarSeriesStore
+from indicator_frame import IndicatorFrame
+from feature_engine import SeriesFeatures, compute_features
+from resilience import CircuitBreakerRegistry, CircuitOpenError, RetryPolicy
+from wb_panel import WorldBankPanel
+from economic_calendar import CalendarEvent, EventIntervalIndex, IMPORTANCE_LEVELS, load_calendar
+from near_duplicate import NearDuplicateIndex, filter_duplicates, hypothesis_key
+from hypothesis_archive import HypothesisArchive
+from static_publisher import StaticPublisher
+from run_report import RunReport
+
+# Flask API と共有する Gemini 関連モジュール（src.* に依存しないもの）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'economics_api', 'src', 'services'))
+from hypothesis_stream import IncrementalHypothesisParser, iter_sse_text
+from hypothesis_schema import build_repair_prompt, parse_hypotheses, structured_generation_config
+from hedging import HedgedCaller, LatencyHistory
+from gemini_client import get_client
+from llm_cache import ResponseCache
+from rate_limiter import limiter_from_env
+
 # ログ設定
 logging.basicConfig(
     level=logging.INFO,
@@ -25,6 +55,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 実行間で保持するキャッシュ・ローカルストアの保存先
+CACHE_DIR = os.getenv('HYPOTHESIS_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+
+# 全生成実行の仮説を蓄積する追記専用アーカイブ（ローカル保存で git 管理外。ルートの generate_hypotheses.py は data/archive を管理対象にする）
+ARCHIVE_DIR = os.getenv('HYPOTHESIS_ARCHIVE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive'))
+
+# ファンアウト生成で1カテゴリずつ並列に生成する研究分野
+HYPOTHESIS_CATEGORIES = ['金融政策', 'マクロ経済学', '国際経済学', '労働経済学', '環境経済学', 'デジタル経済学', '金融市場', 'エネルギー経済学']
+
 @dataclass
 class EconomicIndicator:
     """経済指標データクラス"""
@@ -34,132 +73,537 @@ class EconomicIndicator:
     date: str
     source: str
     description: str = ""
+    stale: bool = False  # 前回スナップショットからの補完値かどうか
+
+class HostRateLimiter:
+    """ホスト単位のレート制限（同一ホストへのリクエスト開始間隔を保証）"""
+
+    def __init__(self, min_intervals: Optional[Dict[str, float]] = None, default_interval: float = 0.1):
+        self.min_intervals = min_intervals or {}
+        self.default_interval = default_interval
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str) -> None:
+        """次の送信枠を予約し、その時刻まで待機する"""
+        host = urlparse(url).netloc
+        interval = self.min_intervals.get(host, self.default_interval)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
 
 class EconomicDataCollector:
     """経済データ収集クラス"""
+
+    # ホストごとの最小リクエスト間隔（秒）
+    HOST_MIN_INTERVALS = {
+        'api.stlouisfed.org': 0.5,   # FRED: 120リクエスト/分
+        'api.worldbank.org': 0.1,
+        'query1.finance.yahoo.com': 0.2,
+        'api.coingecko.com': 2.0,    # CoinGecko 無料版: 約30リクエスト/分
+    }
+
+    # 主要な経済指標のFREDシリーズID
+    FRED_SERIES = {
+        'GDP': 'GDP',
+        'CPI': 'CPIAUCSL',
+        'Unemployment Rate': 'UNRATE',
+        'Federal Funds Rate': 'FEDFUNDS',
+        'Industrial Production': 'INDPRO',
+        'Consumer Sentiment': 'UMCSENT',
+        'Housing Starts': 'HOUST',
+        'Retail Sales': 'RSXFS',
+        'Personal Income': 'PI',
+        'Trade Balance': 'BOPGSTB'
+    }
+
+    # 世界銀行の主要指標
+    WB_INDICATORS = {
+        'GDP Growth': 'NY.GDP.MKTP.KD.ZG',
+        'Inflation': 'FP.CPI.TOTL.ZG',
+        'Trade % of GDP': 'NE.TRD.GNFS.ZS',
+        'FDI Inflows': 'BX.KLT.DINV.WD.GD.ZS',
+        'Government Debt': 'GC.DOD.TOTL.GD.ZS',
+        'Current Account Balance': 'BN.CAB.XOKA.GD.ZS'
+    }
+
+    # 経済カレンダーから抽出する期間（日）
+    CALENDAR_HORIZON_DAYS = 30
+
+    # 観測日ではなく収集日で日付を打刻するソース（フィンガープリントでは日付を含めない）
+    RUN_STAMPED_SOURCES = ('Yahoo Finance', 'CoinGecko')
+
+    # ホストごとのレスポンスキャッシュTTL（秒）: 更新頻度の低いソースほど長く保持
+    HOST_CACHE_TTLS = {
+        'api.stlouisfed.org': 12 * 3600,        # FRED: 月次・四半期系列
+        'api.worldbank.org': 7 * 24 * 3600,     # 世界銀行: 年次データ
+        'query1.finance.yahoo.com': 15 * 60,    # 市場価格
+        'api.coingecko.com': 5 * 60,            # 暗号通貨価格
+    }
+
+    # バッチ取得時の1リクエストあたりの上限
+    WORLD_BANK_BATCH_SIZE = 60  # 世界銀行APIの複数指標クエリ上限
+    YAHOO_BATCH_SIZE = 50
+    WORLD_BANK_SOURCE_ID = 2  # 複数指標クエリには source 指定が必須 (2 = World Development Indicators)
     
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, max_workers: int = 8, batch_requests: bool = True, use_cache: bool = True):
+        self.max_workers = max(1, max_workers)
+        self.batch_requests = batch_requests
+        if use_cache:
+            self.session = CachedSession(os.path.join(CACHE_DIR, 'http'), ttls=self.HOST_CACHE_TTLS)
+        else:
+            self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Economics-Hypothesis-Generator/1.0 (Research Tool)'
         })
+        # 並列実行時にホストごとのコネクションが不足しないようプールを拡張
+        adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=self.max_workers)
+        self.session.mount('https://', adapter)
+        self.rate_limiter = HostRateLimiter(self.HOST_MIN_INTERVALS)
+        self.fred_store = FredObservationStore(os.path.join(CACHE_DIR, 'fred'))
+        self.history_store = ColumnarSeriesStore(os.path.join(CACHE_DIR, 'series'))
+        self.snapshot_path = os.path.join(CACHE_DIR, 'last_good_snapshot.json')
+        self.calendar_index: Optional[EventIntervalIndex] = None
+        self.calendar_source: Optional[str] = None  # 'feed'（ECONOMIC_CALENDAR_PATH）または 'sample'
+        self.deadline: Optional[float] = None  # 逐次収集時のリクエスト期限（time.monotonic() 基準、None で無制限）
+        self.breakers = CircuitBreakerRegistry(os.path.join(CACHE_DIR, 'circuit_breakers.json'))
+        self.retry_policy = RetryPolicy()
+        self._snapshot_lock = threading.Lock()
+        self._arrivals: Dict[str, EconomicIndicator] = {}
+        self._arrivals_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers) if self.max_workers > 1 else None
+        self.report = RunReport()  # リクエスト数・ダウンロード量・再試行回数の集計先（生成実行ごとに差し替える）
+
+    @property
+    def concurrent(self) -> bool:
+        """並列収集モードかどうか"""
+        return self._executor is not None
+
+    def _get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10) -> requests.Response:
+        """
+        耐障害レイヤーを通したGETリクエスト
+
+        ホスト単位のレート制限とサーキットブレーカーを適用し、接続エラー・タイムアウト・429/5xx は
+        ジッター付き指数バックオフで再試行する。TTL内のキャッシュ応答はいずれの対象にもならない。
+        deadline が設定されている場合は、タイムアウトと再試行の待ち時間を残り時間までに抑え、期限を過ぎたら
+        requests.exceptions.Timeout を送出する。
+        """
+        if isinstance(self.session, CachedSession) and self.session.is_fresh(url, params):
+            self.report.count('http.cache_hits')
+            return self.session.get(url, params=params, timeout=timeout)
+        
+        host = urlparse(url).netloc
+        if not self.breakers.allow(host):
+            self.report.count('http.circuit_open')
+            raise CircuitOpenError(f"{host} のサーキットブレーカーが開いているためスキップ")
+        
+        # half-open の試行中なら、どの経路で終わっても試行枠を解放する（成功・失敗を記録済みなら何もしない）
+        probing = self.breakers.is_open(host)
+        try:
+            attempt = 0
+            while True:
+                self.rate_limiter.acquire(url)
+                request_timeout = timeout
+                if self.deadline is not None:
+                    remaining = self.deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise requests.exceptions.Timeout(f"収集期限を超過したため {host} へのリクエストを中止")
+                    request_timeout = min(timeout, remaining)
+                error: Optional[Exception] = None
+                response: Optional[requests.Response] = None
+                try:
+                    response = self.session.get(url, params=params, timeout=request_timeout)
+                    self.report.count('http.requests')
+                    self.report.count(f'http.requests.{host}')
+                    if not getattr(response, 'from_cache', False):
+                        self.report.count('http.bytes_downloaded', len(response.content))
+                except requests.exceptions.RequestException as e:
+                    self.report.count('http.errors')
+                    error = e
+            
+                if not self.retry_policy.is_retriable(error, response):
+                    if error is not None:
+                        raise error
+                    # 4xx などホスト自体は応答しているエラーはブレーカーの失敗に数えない
+                    self.breakers.record_success(host)
+                    return response
+            
+                # 別スレッドでブレーカーが作動した場合は再試行しない
+                if attempt >= self.retry_policy.max_retries or self.breakers.is_open(host):
+                    self.breakers.record_failure(host)
+                    if error is not None:
+                        raise error
+                    return response
+            
+                delay = self.retry_policy.delay(attempt, response)
+                if self.deadline is not None:
+                    delay = max(0.0, min(delay, self.deadline - time.monotonic()))
+                reason = error if error is not None else f"HTTP {response.status_code}"
+                logger.info(f"{host} へのリクエストを {delay:.2f} 秒後に再試行 ({attempt + 1}/{self.retry_policy.max_retries}): {reason}")
+                self.report.count('http.retries')
+                time.sleep(delay)
+                attempt += 1
+        finally:
+            if probing:
+                self.breakers.release(host)
+
+    def _run_parallel(self, func: Callable[..., Any], args_list: Sequence[Tuple]) -> List[Any]:
+        """引数リストの各要素に func を適用（並列モードではワーカープールで実行、順序は保持）"""
+        def run(args: Tuple) -> Any:
+            result = func(*args)
+            self._record_arrivals(result)
+            return result
+        
+        if not self.concurrent or len(args_list) <= 1:
+            return [run(args) for args in args_list]
+        return list(self._executor.map(run, args_list))
+
+    def begin_collection(self) -> None:
+        """収集開始時に到着済み指標の記録をリセット"""
+        with self._arrivals_lock:
+            self._arrivals = {}
+
+    def _record_arrivals(self, result: Any) -> None:
+        """取得できた指標を到着済みとして記録（収集期限切れ時に部分結果として利用）"""
+        if isinstance(result, EconomicIndicator):
+            result = [result]
+        elif isinstance(result, dict):
+            result = list(result.values())
+        elif not isinstance(result, list):
+            return
+        with self._arrivals_lock:
+            for ind in result:
+                if isinstance(ind, EconomicIndicator):
+                    self._arrivals[ColumnarSeriesStore.series_key(ind.source, ind.name)] = ind
+
+    def arrived_indicators(self, source: str) -> List[EconomicIndicator]:
+        """指定ソースの到着済み指標"""
+        with self._arrivals_lock:
+            return [ind for ind in self._arrivals.values() if ind.source == source]
+
+    def _load_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save_snapshot(self, indicators: List[Any]) -> None:
+        """取得に成功した指標を系列ごとの最終正常値スナップショットに反映"""
+        fresh = [ind for ind in indicators if isinstance(ind, EconomicIndicator) and not ind.stale]
+        if not fresh:
+            return
+        with self._snapshot_lock:
+            snapshot = self._load_snapshot()
+            fetched_at = datetime.datetime.now().isoformat()
+            for ind in fresh:
+                snapshot[ColumnarSeriesStore.series_key(ind.source, ind.name)] = {**asdict(ind), 'fetched_at': fetched_at}
+            try:
+                os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+                tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(snapshot, f, ensure_ascii=False)
+                os.replace(tmp_path, self.snapshot_path)
+            except OSError as e:
+                logger.warning(f"スナップショット保存エラー: {e}")
+
+    def stale_fill(self, indicators: List[EconomicIndicator]) -> List[EconomicIndicator]:
+        """今回取得できなかった系列を前回スナップショットの値（stale）で補完するための指標一覧"""
+        present = {ColumnarSeriesStore.series_key(ind.source, ind.name) for ind in indicators}
+        with self._snapshot_lock:
+            snapshot = self._load_snapshot()
+        stale = []
+        for key, record in snapshot.items():
+            if key in present:
+                continue
+            fetched_at = record.get('fetched_at', '')
+            stale.append(EconomicIndicator(
+                name=record['name'],
+                value=record['value'],
+                unit=record['unit'],
+                date=record['date'],
+                source=record['source'],
+                description=f"{record.get('description', '')} (前回取得値: {fetched_at[:10]})".strip(),
+                stale=True
+            ))
+        return stale
+
+    def record_history(self, indicators: List[EconomicIndicator]) -> int:
+        """収集した指標を列指向ストアに蓄積（FREDは観測値ストアの全履歴を反映）し、追記件数を返す"""
+        appended = 0
+        for ind in indicators:
+            try:
+                series_id = self.FRED_SERIES.get(ind.name) if ind.source == 'FRED' else None
+                observations = self.fred_store.load(series_id) if series_id else [(ind.date, ind.value)]
+                appended += self.history_store.append(ind.source, ind.name, observations, unit=ind.unit)
+            except (OSError, ValueError) as e:
+                logger.warning(f"履歴ストア書き込みエラー ({ind.source} {ind.name}): {e}")
+        return appended
+
+    @staticmethod
+    def _chunk(items: Dict[str, str], size: int) -> List[Dict[str, str]]:
+        """辞書を size 件ずつのバッチに分割"""
+        pairs = list(items.items())
+        return [dict(pairs[i:i + size]) for i in range(0, len(pairs), size)]
         
     def collect_fred_data(self) -> List[EconomicIndicator]:
         """FRED (Federal Reserve Economic Data) からデータ収集"""
         logger.info("FRED データの収集を開始")
-        indicators = []
         
-        # 主要な経済指標のFREDシリーズID
-        fred_series = {
-            'GDP': 'GDP',
-            'CPI': 'CPIAUCSL',
-            'Unemployment Rate': 'UNRATE',
-            'Federal Funds Rate': 'FEDFUNDS',
-            'Industrial Production': 'INDPRO',
-            'Consumer Sentiment': 'UMCSENT',
-            'Housing Starts': 'HOUST',
-            'Retail Sales': 'RSXFS',
-            'Personal Income': 'PI',
-            'Trade Balance': 'BOPGSTB'
-        }
+        fred_series = self.FRED_SERIES
         
         base_url = "https://api.stlouisfed.org/fred/series/observations"
         api_key = os.getenv('FRED_API_KEY', 'demo_key')
         
-        for name, series_id in fred_series.items():
-            try:
-                params = {
-                    'series_id': series_id,
-                    'api_key': api_key,
-                    'file_type': 'json',
-                    'limit': 1,
-                    'sort_order': 'desc'
-                }
-                
-                response = self.session.get(base_url, params=params, timeout=10)
-                response.raise_for_status() # HTTPエラーがあれば例外を発生
-                data = response.json()
-                if 'observations' in data and data['observations']:
-                    obs = data['observations'][0]
-                    if obs['value'] != '.':
-                        indicators.append(EconomicIndicator(
-                            name=name,
-                            value=float(obs['value']),
-                            unit=self._get_unit_for_indicator(name),
-                            date=obs['date'],
-                            source='FRED',
-                            description=f"Latest {name} data from Federal Reserve Economic Data"
-                        ))
-                
-                time.sleep(0.1)  # API制限対策
-                
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"FRED {name} データ取得エラー (HTTP/ネットワーク): {e}")
-            except (json.JSONDecodeError, KeyError) as e:
-                logger.warning(f"FRED {name} データ解析エラー: {e}")
-            except Exception as e:
-                logger.warning(f"FRED {name} 予期せぬエラー: {e}")
+        results = self._run_parallel(
+            self._fetch_fred_series,
+            [(base_url, api_key, name, series_id) for name, series_id in fred_series.items()]
+        )
+        indicators = [ind for ind in results if ind is not None]
                 
         logger.info(f"FRED から {len(indicators)} 件のデータを収集")
         return indicators
     
+    def _fetch_fred_series(self, base_url: str, api_key: str, name: str, series_id: str) -> Optional[EconomicIndicator]:
+        """FRED シリーズ1件を差分取得してストアに追記し、最新値を返す"""
+        try:
+            params = {
+                'series_id': series_id,
+                'api_key': api_key,
+                'file_type': 'json',
+                'sort_order': 'asc'
+            }
+            # 保存済みの最終観測日の翌日以降のみを要求（初回は全履歴）
+            last_date = self.fred_store.last_date(series_id)
+            if last_date:
+                next_date = datetime.date.fromisoformat(last_date) + datetime.timedelta(days=1)
+                params['observation_start'] = next_date.isoformat()
+            
+            response = self._get(base_url, params=params, timeout=10)
+            response.raise_for_status() # HTTPエラーがあれば例外を発生
+            data = response.json()
+            appended = self.fred_store.append(series_id, data.get('observations', []))
+            if appended:
+                logger.info(f"FRED {name}: {appended} 件の新規観測値を追記")
+            
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"FRED {name} データ取得エラー (HTTP/ネットワーク): {e}")
+        except (json.JSONDecodeError, KeyError, ValueError) as e:
+            logger.warning(f"FRED {name} データ解析エラー: {e}")
+        except Exception as e:
+            logger.warning(f"FRED {name} 予期せぬエラー: {e}")
+        
+        # 取得に失敗した場合も保存済みの最新値を利用
+        latest = self.fred_store.latest(series_id)
+        if latest is None:
+            return None
+        date, value = latest
+        return EconomicIndicator(
+            name=name,
+            value=value,
+            unit=self._get_unit_for_indicator(name),
+            date=date,
+            source='FRED',
+            description=f"Latest {name} data from Federal Reserve Economic Data"
+        )
+    
     def collect_world_bank_data(self) -> List[EconomicIndicator]:
         """世界銀行データの収集"""
         logger.info("世界銀行データの収集を開始")
-        indicators = []
         
-        # 世界銀行の主要指標
-        wb_indicators = {
-            'GDP Growth': 'NY.GDP.MKTP.KD.ZG',
-            'Inflation': 'FP.CPI.TOTL.ZG',
-            'Trade % of GDP': 'NE.TRD.GNFS.ZS',
-            'FDI Inflows': 'BX.KLT.DINV.WD.GD.ZS',
-            'Government Debt': 'GC.DOD.TOTL.GD.ZS',
-            'Current Account Balance': 'BN.CAB.XOKA.GD.ZS'
-        }
+        wb_indicators = self.WB_INDICATORS
         
         base_url = "https://api.worldbank.org/v2/country/USA/indicator"
         
-        for name, indicator_code in wb_indicators.items():
-            try:
-                url = f"{base_url}/{indicator_code}"
-                params = {
-                    'format': 'json',
-                    'date': '2020:2024',
-                    'per_page': 1
-                }
-                
-                response = self.session.get(url, params=params, timeout=10)
-                response.raise_for_status() # HTTPエラーがあれば例外を発生
-                data = response.json()
-                if len(data) > 1 and data[1]:
-                    latest = data[1][0]
-                    if latest['value'] is not None:
-                        indicators.append(EconomicIndicator(
-                            name=name,
-                            value=float(latest['value']),
-                            unit=self._get_unit_for_indicator(name),
-                            date=str(latest['date']),
-                            source='World Bank',
-                            description=f"Latest {name} data from World Bank"
-                        ))
-                
-                time.sleep(0.1)
-                
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"世界銀行 {name} データ取得エラー (HTTP/ネットワーク): {e}")
-            except (json.JSONDecodeError, KeyError, IndexError) as e:
-                logger.warning(f"世界銀行 {name} データ解析エラー: {e}")
-            except Exception as e:
-                logger.warning(f"世界銀行 {name} 予期せぬエラー: {e}")
+        if self.batch_requests:
+            # 複数指標を1リクエストで取得し、失敗したバッチのみ指標単位で再取得
+            batches = self._chunk(wb_indicators, self.WORLD_BANK_BATCH_SIZE)
+            batch_results = self._run_parallel(
+                self._fetch_world_bank_batch,
+                [(base_url, batch) for batch in batches]
+            )
+            indicators = []
+            for batch, batch_indicators in zip(batches, batch_results):
+                if batch_indicators is None:
+                    results = self._run_parallel(
+                        self._fetch_world_bank_indicator,
+                        [(base_url, name, indicator_code) for name, indicator_code in batch.items()]
+                    )
+                    batch_indicators = [ind for ind in results if ind is not None]
+                indicators.extend(batch_indicators)
+        else:
+            results = self._run_parallel(
+                self._fetch_world_bank_indicator,
+                [(base_url, name, indicator_code) for name, indicator_code in wb_indicators.items()]
+            )
+            indicators = [ind for ind in results if ind is not None]
                 
         logger.info(f"世界銀行から {len(indicators)} 件のデータを収集")
         return indicators
     
+    def collect_world_bank_panel(self, indicators: Optional[Dict[str, str]] = None, date_range: str = '2000:2024',
+                                 per_page: int = 10000) -> Optional[WorldBankPanel]:
+        """
+        世界銀行の多国間パネルデータ収集
+
+        全対象国を1クエリ（country/all + 複数指標）で要求し、大きなページサイズで取得する。
+        2ページ目以降はワーカープールで並列取得し、国 × 年 × 指標 の配列に配置する。
+        """
+        logger.info("世界銀行パネルデータの収集を開始")
+        indicators = indicators or self.WB_INDICATORS
+        start_year, end_year = (int(year) for year in date_range.split(':'))
+        
+        try:
+            countries = self._fetch_world_bank_countries()
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"世界銀行 国一覧取得エラー (HTTP/ネットワーク): {e}")
+            return None
+        except (json.JSONDecodeError, KeyError, IndexError, TypeError) as e:
+            logger.warning(f"世界銀行 国一覧解析エラー: {e}")
+            return None
+        
+        codes = sorted(countries)
+        panel = WorldBankPanel(
+            countries=codes,
+            country_names=[countries[code] for code in codes],
+            years=list(range(start_year, end_year + 1)),
+            indicator_codes=list(indicators.values()),
+            indicator_names=list(indicators.keys())
+        )
+        params = {
+            'format': 'json',
+            'source': self.WORLD_BANK_SOURCE_ID,
+            'date': date_range,
+            'per_page': per_page
+        }
+        urls = [
+            f"https://api.worldbank.org/v2/country/all/indicator/{';'.join(batch.values())}"
+            for batch in self._chunk(indicators, self.WORLD_BANK_BATCH_SIZE)
+        ]
+        
+        # 各バッチの1ページ目で総ページ数を確認し、残りのページをまとめて並列取得
+        filled = 0
+        remaining_pages = []
+        for url, (meta, records) in zip(urls, self._run_parallel(self._fetch_world_bank_panel_page, [(url, params, 1) for url in urls])):
+            filled += panel.fill(records)
+            remaining_pages.extend((url, params, page) for page in range(2, int(meta.get('pages', 1)) + 1))
+        for _, records in self._run_parallel(self._fetch_world_bank_panel_page, remaining_pages):
+            filled += panel.fill(records)
+        
+        logger.info(f"世界銀行パネル収集完了: {len(codes)} か国 × {len(panel.years)} 年 × {len(indicators)} 指標 ({filled} 件, {len(urls) + len(remaining_pages)} リクエスト)")
+        return panel
+    
+    def _fetch_world_bank_countries(self) -> Dict[str, str]:
+        """集計地域（region = Aggregates）を除いた国一覧（ISO3コード -> 国名）"""
+        response = self._get("https://api.worldbank.org/v2/country", params={'format': 'json', 'per_page': 400}, timeout=10)
+        response.raise_for_status() # HTTPエラーがあれば例外を発生
+        data = response.json()
+        return {
+            country['id']: country['name'] for country in data[1]
+            if country.get('region', {}).get('id') != 'NA'
+        }
+    
+    def _fetch_world_bank_panel_page(self, url: str, params: Dict[str, Any], page: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """パネルクエリの1ページを取得（失敗時は空ページとして扱う）"""
+        try:
+            response = self._get(url, params={**params, 'page': page}, timeout=30)
+            response.raise_for_status() # HTTPエラーがあれば例外を発生
+            data = response.json()
+            return data[0], (data[1] or []) if len(data) > 1 else []
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"世界銀行 パネル {page} ページ目取得エラー (HTTP/ネットワーク): {e}")
+        except (json.JSONDecodeError, KeyError, IndexError, TypeError) as e:
+            logger.warning(f"世界銀行 パネル {page} ページ目解析エラー: {e}")
+        return {}, []
+    
+    def _fetch_world_bank_batch(self, base_url: str, batch: Dict[str, str]) -> Optional[List[EconomicIndicator]]:
+        """複数の世界銀行指標を1リクエストで取得し、指標ごとの最新値に分解（リクエスト失敗時はNone）"""
+        date_range = '2020:2024'
+        start_year, end_year = (int(year) for year in date_range.split(':'))
+        names_by_code = {code: name for name, code in batch.items()}
+        
+        try:
+            url = f"{base_url}/{';'.join(batch.values())}"
+            params = {
+                'format': 'json',
+                'source': self.WORLD_BANK_SOURCE_ID,
+                'date': date_range,
+                'per_page': len(batch) * (end_year - start_year + 1)
+            }
+            
+            response = self._get(url, params=params, timeout=10)
+            response.raise_for_status() # HTTPエラーがあれば例外を発生
+            data = response.json()
+            
+            # 指標ごとに値が存在する最新年のレコードを選択
+            latest_records: Dict[str, Dict[str, Any]] = {}
+            for record in (data[1] or []) if len(data) > 1 else []:
+                code = record['indicator']['id']
+                if code not in names_by_code or record['value'] is None:
+                    continue
+                if code not in latest_records or str(record['date']) > str(latest_records[code]['date']):
+                    latest_records[code] = record
+            
+            indicators = []
+            for code, name in names_by_code.items():
+                if code in latest_records:
+                    record = latest_records[code]
+                    indicators.append(EconomicIndicator(
+                        name=name,
+                        value=float(record['value']),
+                        unit=self._get_unit_for_indicator(name),
+                        date=str(record['date']),
+                        source='World Bank',
+                        description=f"Latest {name} data from World Bank"
+                    ))
+            return indicators
+            
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"世界銀行 バッチ取得エラー (HTTP/ネットワーク) {list(batch)}: {e}")
+        except (json.JSONDecodeError, KeyError, IndexError, TypeError, ValueError) as e:
+            logger.warning(f"世界銀行 バッチ解析エラー {list(batch)}: {e}")
+        return None
+    
+    def _fetch_world_bank_indicator(self, base_url: str, name: str, indicator_code: str) -> Optional[EconomicIndicator]:
+        """世界銀行の指標1件の最新値を取得"""
+        try:
+            url = f"{base_url}/{indicator_code}"
+            params = {
+                'format': 'json',
+                'date': '2020:2024',
+                'per_page': 1
+            }
+            
+            response = self._get(url, params=params, timeout=10)
+            response.raise_for_status() # HTTPエラーがあれば例外を発生
+            data = response.json()
+            if len(data) > 1 and data[1]:
+                latest = data[1][0]
+                if latest['value'] is not None:
+                    return EconomicIndicator(
+                        name=name,
+                        value=float(latest['value']),
+                        unit=self._get_unit_for_indicator(name),
+                        date=str(latest['date']),
+                        source='World Bank',
+                        description=f"Latest {name} data from World Bank"
+                    )
+            
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"世界銀行 {name} データ取得エラー (HTTP/ネットワーク): {e}")
+        except (json.JSONDecodeError, KeyError, IndexError) as e:
+            logger.warning(f"世界銀行 {name} データ解析エラー: {e}")
+        except Exception as e:
+            logger.warning(f"世界銀行 {name} 予期せぬエラー: {e}")
+        return None
+    
     def collect_yahoo_finance_data(self) -> List[EconomicIndicator]:
         """Yahoo Finance からの金融市場データ収集"""
         logger.info("Yahoo Finance データの収集を開始")
-        indicators = []
         
         # 主要な金融指標
         symbols = {
@@ -174,44 +618,98 @@ class EconomicDataCollector:
             'VIX': '^VIX'
         }
         
-        for name, symbol in symbols.items():
-            try:
-                # Yahoo Finance APIの代替として、簡易的な価格データを生成
-                # 実際の実装では、yfinanceライブラリやAPIを使用
-                url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
-                params = {
-                    'range': '1d',
-                    'interval': '1d'
-                }
-                
-                response = self.session.get(url, params=params, timeout=10)
-                response.raise_for_status() # HTTPエラーがあれば例外を発生
-                data = response.json()
-                if 'chart' in data and data['chart']['result']:
-                    result = data['chart']['result'][0]
-                    if 'meta' in result and 'regularMarketPrice' in result['meta']:
-                        price = result['meta']['regularMarketPrice']
-                        indicators.append(EconomicIndicator(
-                            name=name,
-                            value=float(price),
-                            unit=self._get_unit_for_financial_indicator(name),
-                            date=datetime.datetime.now().strftime('%Y-%m-%d'),
-                            source='Yahoo Finance',
-                            description=f"Latest {name} market data"
-                        ))
-                
-                time.sleep(0.1)
-                
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"Yahoo Finance {name} データ取得エラー (HTTP/ネットワーク): {e}")
-            except (json.JSONDecodeError, KeyError, IndexError) as e:
-                logger.warning(f"Yahoo Finance {name} データ解析エラー: {e}")
-            except Exception as e:
-                logger.warning(f"Yahoo Finance {name} 予期せぬエラー: {e}")
+        if self.batch_requests:
+            # 複数シンボルを quote エンドポイントで一括取得し、取得できなかったシンボルのみ chart で個別取得
+            batches = self._chunk(symbols, self.YAHOO_BATCH_SIZE)
+            found: Dict[str, EconomicIndicator] = {}
+            for batch_found in self._run_parallel(self._fetch_yahoo_quote_batch, [(batch,) for batch in batches]):
+                found.update(batch_found)
+            missing = [(name, symbol) for name, symbol in symbols.items() if name not in found]
+            for ind in self._run_parallel(self._fetch_yahoo_symbol, missing):
+                if ind is not None:
+                    found[ind.name] = ind
+            indicators = [found[name] for name in symbols if name in found]
+        else:
+            results = self._run_parallel(
+                self._fetch_yahoo_symbol,
+                list(symbols.items())
+            )
+            indicators = [ind for ind in results if ind is not None]
                 
         logger.info(f"Yahoo Finance から {len(indicators)} 件のデータを収集")
         return indicators
     
+    def _fetch_yahoo_quote_batch(self, batch: Dict[str, str]) -> Dict[str, EconomicIndicator]:
+        """複数シンボルの最新価格を v7 quote エンドポイントで一括取得（指標名 -> 指標）"""
+        names_by_symbol = {symbol: name for name, symbol in batch.items()}
+        found: Dict[str, EconomicIndicator] = {}
+        
+        try:
+            url = "https://query1.finance.yahoo.com/v7/finance/quote"
+            params = {'symbols': ','.join(batch.values())}
+            
+            response = self._get(url, params=params, timeout=10)
+            response.raise_for_status() # HTTPエラーがあれば例外を発生
+            data = response.json()
+            for quote in data['quoteResponse']['result'] or []:
+                name = names_by_symbol.get(quote.get('symbol'))
+                if name is None or quote.get('regularMarketPrice') is None:
+                    continue
+                market_time = quote.get('regularMarketTime')
+                if market_time:
+                    date = datetime.datetime.fromtimestamp(market_time).strftime('%Y-%m-%d')
+                else:
+                    date = datetime.datetime.now().strftime('%Y-%m-%d')
+                found[name] = EconomicIndicator(
+                    name=name,
+                    value=float(quote['regularMarketPrice']),
+                    unit=self._get_unit_for_financial_indicator(name),
+                    date=date,
+                    source='Yahoo Finance',
+                    description=f"Latest {name} market data"
+                )
+                
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Yahoo Finance バッチ取得エラー (HTTP/ネットワーク) {list(batch)}: {e}")
+        except (json.JSONDecodeError, KeyError, IndexError, TypeError, ValueError) as e:
+            logger.warning(f"Yahoo Finance バッチ解析エラー {list(batch)}: {e}")
+        return found
+    
+    def _fetch_yahoo_symbol(self, name: str, symbol: str) -> Optional[EconomicIndicator]:
+        """Yahoo Finance のシンボル1件の最新価格を取得"""
+        try:
+            # Yahoo Finance APIの代替として、簡易的な価格データを生成
+            # 実際の実装では、yfinanceライブラリやAPIを使用
+            url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+            params = {
+                'range': '1d',
+                'interval': '1d'
+            }
+            
+            response = self._get(url, params=params, timeout=10)
+            response.raise_for_status() # HTTPエラーがあれば例外を発生
+            data = response.json()
+            if 'chart' in data and data['chart']['result']:
+                result = data['chart']['result'][0]
+                if 'meta' in result and 'regularMarketPrice' in result['meta']:
+                    price = result['meta']['regularMarketPrice']
+                    return EconomicIndicator(
+                        name=name,
+                        value=float(price),
+                        unit=self._get_unit_for_financial_indicator(name),
+                        date=datetime.datetime.now().strftime('%Y-%m-%d'),
+                        source='Yahoo Finance',
+                        description=f"Latest {name} market data"
+                    )
+            
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Yahoo Finance {name} データ取得エラー (HTTP/ネットワーク): {e}")
+        except (json.JSONDecodeError, KeyError, IndexError) as e:
+            logger.warning(f"Yahoo Finance {name} データ解析エラー: {e}")
+        except Exception as e:
+            logger.warning(f"Yahoo Finance {name} 予期せぬエラー: {e}")
+        return None
+    
     def collect_crypto_data(self) -> List[EconomicIndicator]:
         """暗号通貨データの収集"""
         logger.info("暗号通貨データの収集を開始")
@@ -227,7 +725,7 @@ class EconomicDataCollector:
                 'include_market_cap': 'true'
             }
             
-            response = self.session.get(url, params=params, timeout=10)
+            response = self._get(url, params=params, timeout=10)
             response.raise_for_status() # HTTPエラーがあれば例外を発生
             data = response.json()
             
@@ -268,51 +766,34 @@ class EconomicDataCollector:
         except Exception as e:
             logger.warning(f"暗号通貨データ取得エラー: {e}")
             
+        self._record_arrivals(indicators)
         logger.info(f"暗号通貨から {len(indicators)} 件のデータを収集")
         return indicators
     
     def collect_economic_calendar_data(self) -> List[Dict[str, Any]]:
-        """経済カレンダーデータの収集"""
+        """
+        経済カレンダーデータの収集
+
+        ECONOMIC_CALENDAR_PATH で指定したローカルの ICS / CSV フィードを区間インデックスに読み込み、
+        今後 CALENDAR_HORIZON_DAYS 日間のイベントを重要度・日付順で返す。フィード未設定時はサンプルイベントを使用。
+        """
         logger.info("経済カレンダーデータの収集を開始")
         events = []
         
         try:
-            # 経済カレンダーの重要イベント（サンプル）
-            current_date = datetime.datetime.now()
-            
-            # 実際の実装では、経済カレンダーAPIから取得
-            sample_events = [
-                {
-                    'event': 'Federal Reserve Interest Rate Decision',
-                    'date': (current_date + datetime.timedelta(days=7)).strftime('%Y-%m-%d'),
-                    'importance': 'High',
-                    'country': 'USA',
-                    'impact': 'Monetary Policy'
-                },
-                {
-                    'event': 'Non-Farm Payrolls',
-                    'date': (current_date + datetime.timedelta(days=3)).strftime('%Y-%m-%d'),
-                    'importance': 'High',
-                    'country': 'USA',
-                    'impact': 'Employment'
-                },
-                {
-                    'event': 'Consumer Price Index',
-                    'date': (current_date + datetime.timedelta(days=10)).strftime('%Y-%m-%d'),
-                    'importance': 'High',
-                    'country': 'USA',
-                    'impact': 'Inflation'
-                },
-                {
-                    'event': 'GDP Quarterly Report',
-                    'date': (current_date + datetime.timedelta(days=14)).strftime('%Y-%m-%d'),
-                    'importance': 'High',
-                    'country': 'USA',
-                    'impact': 'Economic Growth'
-                }
-            ]
+            calendar_path = os.getenv('ECONOMIC_CALENDAR_PATH')
+            if calendar_path and os.path.exists(calendar_path):
+                self.calendar_index = load_calendar(calendar_path)
+                self.calendar_source = 'feed'
+                logger.info(f"経済カレンダーフィードを読み込み: {calendar_path} ({len(self.calendar_index)} 件)")
+            else:
+                logger.warning("経済カレンダーフィードが設定されていないため、サンプルイベントを使用")
+                self.calendar_index = EventIntervalIndex(self._get_sample_calendar_events())
+                self.calendar_source = 'sample'
             
-            events.extend(sample_events)
+            upcoming = self.calendar_index.upcoming(days=self.CALENDAR_HORIZON_DAYS)
+            upcoming.sort(key=lambda event: (IMPORTANCE_LEVELS.index(event.importance), event.start))
+            events = [event.to_dict() for event in upcoming]
             
         except Exception as e:
             logger.warning(f"経済カレンダーデータ取得エラー: {e}")
@@ -320,6 +801,40 @@ class EconomicDataCollector:
         logger.info(f"経済カレンダーから {len(events)} 件のイベントを収集")
         return events
     
+    def _get_sample_calendar_events(self) -> List[CalendarEvent]:
+        """経済カレンダーのサンプルイベント（フィード未設定時）"""
+        current_date = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        samples = [
+            ('Federal Reserve Interest Rate Decision', 7, 'Monetary Policy', ['FEDFUNDS', 'Federal Funds Rate']),
+            ('Non-Farm Payrolls', 3, 'Employment', ['UNRATE', 'Unemployment Rate']),
+            ('Consumer Price Index', 10, 'Inflation', ['CPIAUCSL', 'CPI']),
+            ('GDP Quarterly Report', 14, 'Economic Growth', ['GDP'])
+        ]
+        return [
+            CalendarEvent(
+                event=event,
+                start=current_date + datetime.timedelta(days=days),
+                end=current_date + datetime.timedelta(days=days),
+                importance='High',
+                country='USA',
+                impact=impact,
+                series=series
+            )
+            for event, days, impact, series in samples
+        ]
+    
+    def next_releases(self, names: List[str]) -> Dict[str, str]:
+        """各指標に関係する次回イベントの日付（FREDシリーズIDと指標名の両方で検索）"""
+        if self.calendar_index is None:
+            return {}
+        releases = {}
+        for name in names:
+            series_id = self.FRED_SERIES.get(name, name)
+            event = self.calendar_index.next_release(series_id) or self.calendar_index.next_release(name)
+            if event is not None:
+                releases[name] = event.start.strftime('%Y-%m-%d')
+        return releases
+    
     def _get_unit_for_indicator(self, indicator_name: str) -> str:
         """指標名に基づく単位の取得"""
         unit_mapping = {
@@ -356,10 +871,48 @@ class EconomicDataCollector:
             return 'Points'
 
 class EconomicsHypothesisGenerator:
-    def __init__(self, gemini_api_key: str):
+    def __init__(self, gemini_api_key: str, max_workers: int = 8, batch_requests: bool = True,
+                 collection_deadline: Optional[float] = 30.0, world_bank_panel: bool = False,
+                 streaming: bool = False, on_hypothesis: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 fanout_categories: Optional[Sequence[str]] = None, duplicate_mode: str = 'flag',
+                 publish_dir: Optional[str] = None, structured_output: bool = False,
+                 hedge_requests: bool = False, hedge_percentile: float = 95.0, cache_responses: bool = True):
         self.gemini_api_key = gemini_api_key
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent"
-        self.data_collector = EconomicDataCollector()
+        # 応答が直近のレイテンシ分布の hedge_percentile を過ぎたら同じリクエストをもう1本送る（履歴は常に記録）
+        self.hedger = HedgedCaller(LatencyHistory(os.path.join(CACHE_DIR, 'gemini_latency.json')),
+                                   percentile=hedge_percentile, enabled=hedge_requests)
+        self.publish_dir = publish_dir  # 静的サイト向けの分割出力先（index.json と内容ハッシュ付きシャード）
+        self.duplicate_mode = duplicate_mode  # 過去の仮説と近似重複する仮説に印を付ける（'flag'）か除外する（'reject'）
+        self.fanout_categories = list(fanout_categories) if fanout_categories else None  # カテゴリごとに並列生成
+        self.streaming = streaming  # streamGenerateContent で受信し、仮説を完成した順に取り出す
+        self.on_hypothesis = on_hypothesis  # ストリーミング時に仮説1件ごとに呼ばれるコールバック
+        self.world_bank_panel = world_bank_panel  # 多国間パネルを収集し、米国の国際的な位置付けを分析に加える
+        self.collection_deadline = collection_deadline  # データ収集全体の期限（秒、Noneで無制限）
+        # 共有クライアント（keep-alive のコネクションプール、統一したタイムアウト・再試行）
+        # GEMINI_RPM / GEMINI_TPM を設定すると Flask API と共有のレート制限に従う（定期実行なので残量が戻るまで待つ）
+        self.gemini = get_client(gemini_api_key, model='gemini-pro', limiter=limiter_from_env())
+        self.gemini.add_hook(self._record_gemini_request)
+        self.base_url = self.gemini.url()
+        # 同じ (モデル, 生成設定, プロンプト) の応答を再利用する（ファンアウト・修正依頼を含む。force 実行では使わない）
+        self.response_cache = ResponseCache(os.path.join(CACHE_DIR, 'llm_cache.db')) if cache_responses else None
+        self.use_response_cache = True
+        self.data_collector = EconomicDataCollector(max_workers=max_workers, batch_requests=batch_requests)
+        self.generation_config = {
+            "temperature": 0.7,
+            "topK": 40,
+            "topP": 0.95,
+            "maxOutputTokens": 3072
+        }
+        if structured_output:
+            # 仮説スキーマに沿った JSON のみを出力させる
+            self.generation_config = structured_generation_config(self.generation_config)
+        self.fingerprint_path = os.path.join(CACHE_DIR, 'last_run_fingerprint.json')
+        self.duplicate_index_path = os.path.join(CACHE_DIR, 'near_duplicate_index.json')
+        self.archive = HypothesisArchive(ARCHIVE_DIR)
+        self.last_response_was_fallback = False
+        self.report = RunReport()
+        # 実行ごとの計測レポートの追記先（RUN_REPORT_PATH で変更可能）
+        self.report_path = os.getenv('RUN_REPORT_PATH', os.path.join(CACHE_DIR, 'run_reports.jsonl'))
         
     def collect_comprehensive_economic_data(self) -> Dict[str, Any]:
         """包括的な経済データの収集"""
@@ -368,64 +921,147 @@ class EconomicsHypothesisGenerator:
         all_indicators = []
         economic_events = []
         
-        # 各ソースからデータ収集
-        try:
-            fred_data = self.data_collector.collect_fred_data()
-            all_indicators.extend(fred_data)
-        except Exception as e:
-            logger.error(f"FRED データ収集エラー: {e}")
+        # 各ソースからデータ収集（並列モードではソース同士も同時に実行）
+        sources = [
+            ('FRED', self.data_collector.collect_fred_data, "FRED データ収集エラー"),
+            ('World Bank', self.data_collector.collect_world_bank_data, "世界銀行データ収集エラー"),
+            ('Yahoo Finance', self.data_collector.collect_yahoo_finance_data, "金融データ収集エラー"),
+            ('CoinGecko', self.data_collector.collect_crypto_data, "暗号通貨データ収集エラー"),
+            ('Economic Calendar', self.data_collector.collect_economic_calendar_data, "経済カレンダーデータ収集エラー"),
+        ]
         
-        try:
-            wb_data = self.data_collector.collect_world_bank_data()
-            all_indicators.extend(wb_data)
-        except Exception as e:
-            logger.error(f"世界銀行データ収集エラー: {e}")
+        def run_source(label: str, collect: Callable[[], List[Any]], error_message: str) -> List[Any]:
+            try:
+                with self.report.stage(f'collect.{label}'):
+                    return collect()
+            except Exception as e:
+                logger.error(f"{error_message}: {e}")
+                return []
         
-        try:
-            finance_data = self.data_collector.collect_yahoo_finance_data()
-            all_indicators.extend(finance_data)
-        except Exception as e:
-            logger.error(f"金融データ収集エラー: {e}")
+        def save_late_result(future: Future) -> None:
+            # 期限後に完了したソースの結果は次回実行のスナップショットとして保存
+            if not future.cancelled() and future.exception() is None:
+                self.data_collector.save_snapshot(future.result())
         
-        try:
-            crypto_data = self.data_collector.collect_crypto_data()
-            all_indicators.extend(crypto_data)
-        except Exception as e:
-            logger.error(f"暗号通貨データ収集エラー: {e}")
+        self.data_collector.begin_collection()
+        started = time.monotonic()
+        results: List[Optional[List[Any]]] = [None] * len(sources)
+        if self.data_collector.concurrent:
+            # ソース単位のスレッドは系列単位のワーカープールとは別に用意する（プール内での待ち合わせによるデッドロック回避）
+            source_executor = ThreadPoolExecutor(max_workers=len(sources))
+            futures = [source_executor.submit(run_source, label, collect, message) for label, collect, message in sources]
+            done, _ = wait(futures, timeout=self.collection_deadline)
+            # 期限切れのソースは待たずにバックグラウンドで完了させる
+            source_executor.shutdown(wait=False)
+            for i, future in enumerate(futures):
+                if future in done:
+                    results[i] = future.result()
+                else:
+                    future.add_done_callback(save_late_result)
+        else:
+            # 逐次モードでは残り時間を各リクエストのタイムアウトに反映し、1つの遅いソースで期限を超えないようにする
+            if self.collection_deadline is not None:
+                self.data_collector.deadline = started + self.collection_deadline
+            try:
+                for i, (label, collect, message) in enumerate(sources):
+                    if self.collection_deadline is not None and time.monotonic() - started > self.collection_deadline:
+                        break
+                    results[i] = run_source(label, collect, message)
+            finally:
+                self.data_collector.deadline = None
+        logger.info(f"データソース収集所要時間: {time.monotonic() - started:.2f} 秒 (max_workers={self.data_collector.max_workers})")
+        if isinstance(self.data_collector.session, CachedSession):
+            cache_stats = self.data_collector.session.stats()
+            logger.info(
+                f"HTTPキャッシュ: ヒット {cache_stats['hits']} 件, 再検証(304) {cache_stats['revalidated']} 件, "
+                f"ミス {cache_stats['misses']} 件"
+            )
         
-        try:
-            economic_events = self.data_collector.collect_economic_calendar_data()
-        except Exception as e:
-            logger.error(f"経済カレンダーデータ収集エラー: {e}")
+        self.data_collector.breakers.save()
+        
+        timed_out = [label for (label, _, _), result in zip(sources, results) if result is None]
+        self.report.add(timed_out_sources=timed_out)
+        if timed_out:
+            logger.warning(f"収集期限 ({self.collection_deadline} 秒) 超過: {', '.join(timed_out)} は到着済みデータのみ使用")
+        
+        for (label, _, _), result in zip(sources[:-1], results[:-1]):
+            all_indicators.extend(result if result is not None else self.data_collector.arrived_indicators(label))
+        economic_events = results[-1] or []
+        
+        # 指標履歴を列指向ストアに蓄積し、最終正常値スナップショットを更新（フォールバックのサンプル値は対象外）
+        if all_indicators:
+            appended = self.data_collector.record_history(all_indicators)
+            logger.info(f"履歴ストアに {appended} 件の観測値を追記")
+            self.data_collector.save_snapshot(all_indicators)
+        
+        # 取得できなかった系列は前回スナップショットの値で補完（staleとして明示）
+        stale_indicators = self.data_collector.stale_fill(all_indicators)
+        if stale_indicators:
+            logger.warning(f"{len(stale_indicators)} 系列を前回取得値で補完")
+            all_indicators.extend(stale_indicators)
         
         # フォールバック: 最小限のサンプルデータ
         if not all_indicators:
             logger.warning("外部データ取得に失敗、サンプルデータを使用")
             all_indicators = self._get_fallback_indicators()
         
-        # データの整理と統計計算
+        # 多国間パネル（オプション）: 各指標で米国が全対象国の何パーセンタイルに位置するか
+        cross_country = []
+        if self.world_bank_panel:
+            panel = self.data_collector.collect_world_bank_panel()
+            if panel is not None:
+                try:
+                    panel.save(os.path.join(CACHE_DIR, 'world_bank_panel.npz'))
+                except OSError as e:
+                    logger.warning(f"世界銀行パネル保存エラー: {e}")
+                cross_country = self._summarize_world_bank_panel(panel)
+        
+        # 蓄積済み履歴から派生特徴量（前年比・前月比・ボラティリティ・ドローダウン・Zスコア）を一括計算
+        features = None
+        try:
+            features = compute_features(self.data_collector.history_store)
+        except (OSError, ValueError) as e:
+            logger.warning(f"派生特徴量の計算エラー: {e}")
+        
+        # データの整理と統計計算（指標は配列ベースのフレームに一度だけ変換）
+        frame = IndicatorFrame.from_indicators(all_indicators)
         economic_data = {
-            "indicators": [
-                {
-                    "name": ind.name,
-                    "value": ind.value,
-                    "unit": ind.unit,
-                    "date": ind.date,
-                    "source": ind.source,
-                    "description": ind.description
-                } for ind in all_indicators
-            ],
+            "indicators": frame.to_records(),
             "economic_events": economic_events,
-            "data_sources": list(set([ind.source for ind in all_indicators])),
-            "total_indicators": len(all_indicators),
+            "calendar_source": self.data_collector.calendar_source,
+            "data_sources": frame.unique_sources(),
+            "total_indicators": len(frame),
             "collection_date": datetime.datetime.now().isoformat(),
-            "market_sentiment": self._analyze_market_sentiment(all_indicators),
-            "key_trends": self._identify_key_trends(all_indicators)
+            "market_sentiment": self._analyze_market_sentiment(frame),
+            "key_trends": self._identify_key_trends(frame, features),
+            "derived_features": features.records() if features is not None else [],
+            "cross_country": cross_country,
+            "next_releases": self.data_collector.next_releases(frame.names.tolist())
         }
         
         logger.info(f"包括的経済データ収集完了: {len(all_indicators)} 指標, {len(economic_events)} イベント")
         return economic_data
     
+    def _summarize_world_bank_panel(self, panel: WorldBankPanel, country: str = 'USA') -> List[Dict[str, Any]]:
+        """パネルから指定国の各指標の最新値と国際的なパーセンタイルを要約"""
+        if country not in panel.countries:
+            return []
+        summary = []
+        for name in panel.indicator_names:
+            latest = panel.latest(name)
+            value = latest[panel.countries.index(country)]
+            percentile = panel.percentile(country, name)
+            if percentile is None:
+                continue
+            summary.append({
+                "indicator": name,
+                "country": country,
+                "value": round(float(value), 4),
+                "percentile": round(percentile, 1),
+                "countries_with_data": int((~np.isnan(latest)).sum())
+            })
+        return summary
+    
     def _get_fallback_indicators(self) -> List[EconomicIndicator]:
         """フォールバック用のサンプル指標"""
         return [
@@ -441,17 +1077,18 @@ class EconomicsHypothesisGenerator:
             EconomicIndicator("Consumer Sentiment", 68.5, "Index", "2024-11", "Sample", "Consumer confidence measure")
         ]
     
-    def _analyze_market_sentiment(self, indicators: List[EconomicIndicator]) -> str:
+    def _analyze_market_sentiment(self, frame: IndicatorFrame) -> str:
         """市場センチメントの分析"""
         try:
             # 株価指数の変動を基にセンチメント判定
-            stock_indicators = [ind for ind in indicators if any(term in ind.name for term in ['S&P', 'NASDAQ', 'Dow'])]
-            crypto_indicators = [ind for ind in indicators if 'Change' in ind.name and any(crypto in ind.name for crypto in ['Bitcoin', 'Ethereum'])]
+            stock_mask = frame.mask('stock')
+            crypto_change_mask = frame.mask('crypto_change')
             
-            if stock_indicators or crypto_indicators:
+            if stock_mask.any() or crypto_change_mask.any():
                 # 簡易的なセンチメント分析
-                positive_signals = len([ind for ind in crypto_indicators if ind.value > 0])
-                negative_signals = len([ind for ind in crypto_indicators if ind.value < 0])
+                crypto_changes = frame.values[crypto_change_mask]
+                positive_signals = int((crypto_changes > 0).sum())
+                negative_signals = int((crypto_changes < 0).sum())
                 
                 if positive_signals > negative_signals:
                     return "Bullish"
@@ -464,30 +1101,47 @@ class EconomicsHypothesisGenerator:
         except Exception:
             return "Uncertain"
     
-    def _identify_key_trends(self, indicators: List[EconomicIndicator]) -> List[str]:
-        """主要トレンドの特定"""
+    def _identify_key_trends(self, frame: IndicatorFrame, features: Optional[SeriesFeatures] = None) -> List[str]:
+        """主要トレンドの特定（履歴がある指標は派生特徴量、ない指標は最新値で判定）"""
         trends = []
         
         try:
-            # インフレ関連トレンド
-            inflation_indicators = [ind for ind in indicators if 'Inflation' in ind.name or 'CPI' in ind.name]
-            if inflation_indicators and any(ind.value > 3.0 for ind in inflation_indicators):
+            values = frame.values
+            keys = [ColumnarSeriesStore.series_key(source, name) for source, name in zip(frame.sources, frame.names)]
+            nan_column = np.full(len(frame), np.nan)
+            yoy = features.column('yoy', keys) if features is not None else nan_column
+            drawdown = features.column('drawdown', keys) if features is not None else nan_column
+            zscore = features.column('zscore', keys) if features is not None else nan_column
+            
+            # インフレ関連トレンド（CPIのような指数は前年比で判定）
+            inflation_measure = np.where((frame.units != '%') & ~np.isnan(yoy), yoy, values)
+            if (frame.mask('inflation') & (inflation_measure > 3.0)).any():
                 trends.append("高インフレ圧力")
             
             # 金利関連トレンド
-            rate_indicators = [ind for ind in indicators if 'Rate' in ind.name and 'Exchange' not in ind.name]
-            if rate_indicators and any(ind.value > 4.0 for ind in rate_indicators):
+            rate_mask = frame.mask('rate') & ~frame.mask('unemployment')
+            if (frame.mask('rate') & (values > 4.0)).any():
                 trends.append("高金利環境")
+            if (rate_mask & (yoy > 0.5)).any():
+                trends.append("金利上昇局面")
+            elif (rate_mask & (yoy < -0.5)).any():
+                trends.append("金融緩和への転換")
+            
+            # 市場関連トレンド
+            if (frame.mask('stock') & (drawdown < -10.0)).any():
+                trends.append("株式市場の調整局面")
+            if (frame.mask('volatility_index') & (zscore > 1.5)).any():
+                trends.append("市場ボラティリティの上昇")
             
             # 暗号通貨関連トレンド
-            crypto_indicators = [ind for ind in indicators if any(crypto in ind.name for crypto in ['Bitcoin', 'Ethereum'])]
-            if crypto_indicators:
+            if frame.mask('crypto').any():
                 trends.append("デジタル資産の普及")
             
             # 雇用関連トレンド
-            employment_indicators = [ind for ind in indicators if 'Unemployment' in ind.name]
-            if employment_indicators and any(ind.value < 4.0 for ind in employment_indicators):
+            if (frame.mask('unemployment') & (values < 4.0)).any():
                 trends.append("完全雇用に近い労働市場")
+            if (frame.mask('unemployment') & (yoy > 0.5)).any():
+                trends.append("労働市場の減速")
             
             # デフォルトトレンド
             if not trends:
@@ -499,27 +1153,65 @@ class EconomicsHypothesisGenerator:
         
         return trends[:5]  # 最大5つのトレンド
     
-    def generate_hypothesis_prompt(self, economic_data: Dict[str, Any]) -> str:
-        """強化された仮説生成プロンプトの作成"""
+    def generate_hypothesis_prompt(self, economic_data: Dict[str, Any], category: Optional[str] = None,
+                                   count: int = 3) -> str:
+        """強化された仮説生成プロンプトの作成（category を指定するとその分野の仮説だけを count 件依頼）"""
         indicators_summary = []
         for ind in economic_data['indicators'][:15]:  # 主要15指標
-            indicators_summary.append(f"- {ind['name']}: {ind['value']} {ind['unit']} ({ind['source']})")
+            stale_note = ', 前回取得値' if ind.get('stale') else ''
+            indicators_summary.append(f"- {ind['name']}: {ind['value']} {ind['unit']} ({ind['source']}{stale_note})")
+        
+        # 過去の水準から最も乖離している指標の派生特徴量
+        def format_feature(value: Optional[float], suffix: str = '', signed: bool = True) -> str:
+            if value is None:
+                return 'N/A'
+            return f"{value:+.2f}{suffix}" if signed else f"{value:.2f}{suffix}"
+        
+        next_releases = economic_data.get('next_releases', {})
+        derived_features = [
+            row for row in economic_data.get('derived_features', []) if row.get('zscore') is not None
+        ]
+        derived_features.sort(key=lambda row: abs(row['zscore']), reverse=True)
+        features_summary = []
+        for row in derived_features[:8]:  # 主要8指標
+            change_suffix = 'pt' if row['unit'] in ('%', '% of GDP') else '%'
+            features_summary.append(
+                f"- {row['name']} ({row['source']}): 前年比 {format_feature(row['yoy'], change_suffix)}, "
+                f"前月比 {format_feature(row['mom'], change_suffix)}, "
+                f"12ヶ月ボラティリティ {format_feature(row['volatility'], signed=False)}, "
+                f"ドローダウン {format_feature(row['drawdown'], '%')}, Zスコア {format_feature(row['zscore'])}"
+                + (f", 次回発表 {next_releases[row['name']]}" if row['name'] in next_releases else '')
+            )
+        
+        cross_country_summary = [
+            f"- {row['indicator']}: {row['value']} (全{row['countries_with_data']}か国中 {row['percentile']} パーセンタイル)"
+            for row in economic_data.get('cross_country', [])
+        ]
+        cross_country_section = ''
+        if cross_country_summary:
+            cross_country_section = f"\n【米国の国際的な位置付け（世界銀行パネル）】\n{chr(10).join(cross_country_summary)}\n"
         
         events_summary = []
         for event in economic_data['economic_events'][:5]:  # 主要5イベント
             events_summary.append(f"- {event['event']} ({event['date']}, {event['importance']} importance)")
         
+        target = f"「{category}」分野の" if category else ''
+        category_spec = category or '研究分野（例：金融政策、労働経済学、国際経済学、デジタル経済学）'
+        
         prompt = f"""
-あなたは経済学の専門家です。以下の包括的な経済データを分析し、革新的で実証可能な研究仮説を3つ生成してください。
+あなたは経済学の専門家です。以下の包括的な経済データを分析し、{target}革新的で実証可能な研究仮説を{count}つ生成してください。
 
 【包括的経済データ】
-データ収集日時: {economic_data['collection_date']}
+データ収集日: {economic_data['collection_date'][:10]}
 データソース: {', '.join(economic_data['data_sources'])}
 総指標数: {economic_data['total_indicators']}
 
 【主要経済指標】
 {chr(10).join(indicators_summary)}
 
+【主要指標の変化（蓄積履歴に基づく派生特徴量）】
+{chr(10).join(features_summary) if features_summary else '- 履歴データ蓄積中'}
+{cross_country_section}
 【今後の重要経済イベント】
 {chr(10).join(events_summary)}
 
@@ -545,7 +1237,7 @@ class EconomicsHypothesisGenerator:
     {{
       "title": "仮説のタイトル",
       "description": "仮説の詳細説明（250文字程度）",
-      "category": "研究分野（例：金融政策、労働経済学、国際経済学、デジタル経済学）",
+      "category": "{category_spec}",
       "confidence": 85,
       "research_methods": ["推奨研究手法1", "推奨研究手法2", "推奨研究手法3"],
       "key_factors": ["重要要因1", "重要要因2", "重要要因3"],
@@ -560,42 +1252,134 @@ class EconomicsHypothesisGenerator:
 """
         return prompt
     
+    def _record_gemini_request(self, event: Dict[str, Any]) -> None:
+        """共有クライアントの計測フック: HTTP リクエストごとの件数・バイト数・再試行を実行レポートに集計"""
+        if event.get('cached'):
+            self.report.count('gemini.cache_hits')
+            return
+        self.report.count('gemini.requests')
+        if event.get('attempt'):
+            self.report.count('gemini.retries')
+        if event.get('error'):
+            self.report.count('gemini.errors')
+        if event.get('rate_limit_wait'):
+            self.report.count('gemini.rate_limit_wait_seconds', round(event['rate_limit_wait'], 3))
+        if event.get('response_bytes'):
+            self.report.count('gemini.bytes_downloaded', event['response_bytes'])
+    
+    def _request_gemini(self, prompt: str) -> Dict[str, Any]:
+        """Gemini APIへのリクエスト（再試行後も失敗した場合は RequestException を送出）"""
+        self.report.count('gemini.prompt_chars', len(prompt))
+        with self.report.stage('llm'):
+            return self.gemini.generate(prompt, self.generation_config, hedger=self.hedger,
+                                        cache=self.response_cache if self.use_response_cache else None, wait=True)
+    
     def call_gemini_api(self, prompt: str) -> Dict[str, Any]:
         """Gemini APIを呼び出して仮説を生成"""
         logger.info("Gemini APIを呼び出し中")
         
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }],
-            "generationConfig": {
-                "temperature": 0.7,
-                "topK": 40,
-                "topP": 0.95,
-                "maxOutputTokens": 3072
-            }
-        }
-        
+        self.last_response_was_fallback = False
+        if self.streaming:
+            with self.report.stage('llm'):
+                return self._call_gemini_api_streaming(prompt)
         try:
-            url = f"{self.base_url}?key={self.gemini_api_key}"
-            response = requests.post(url, headers=headers, json=payload, timeout=45)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = self._request_gemini(prompt)
             logger.info("Gemini API呼び出し成功")
             return result
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Gemini API呼び出しエラー: {e}")
             # フォールバック: 強化されたサンプルデータを返す
+            self.last_response_was_fallback = True
             return self.get_enhanced_fallback_response()
     
+    def _call_gemini_api_streaming(self, prompt: str) -> Dict[str, Any]:
+        """
+        streamGenerateContent（SSE）で応答を受信し、仮説が完成するたびに on_hypothesis を呼ぶ
+
+        戻り値は generateContent と同じ形式なので、parse_gemini_response でそのまま解析できる。
+        受信途中で接続が切れた場合は、それまでに完成した仮説だけで応答を組み立てる。
+        """
+        parser = IncrementalHypothesisParser()
+        received: List[Dict[str, Any]] = []
+        started = time.monotonic()
+        self.report.count('gemini.prompt_chars', len(prompt))
+        try:
+            with self.gemini.stream(prompt, self.generation_config, wait=True) as response:
+                for chunk in iter_sse_text(response):
+                    for hypothesis in parser.feed(chunk):
+                        received.append(hypothesis)
+                        logger.info(f"仮説を受信 ({len(received)} 件目, {time.monotonic() - started:.1f}秒): {hypothesis.get('title', '')}")
+                        if self.on_hypothesis:
+                            self.on_hypothesis(hypothesis)
+            logger.info(f"Gemini APIストリーミング完了: {len(received)} 件 ({time.monotonic() - started:.1f}秒)")
+            text = parser.text
+            self.report.count('gemini.bytes_downloaded', len(text.encode('utf-8')))
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Gemini APIストリーミングエラー: {e}")
+            if not received:
+                self.last_response_was_fallback = True
+                return self.get_enhanced_fallback_response()
+            logger.warning(f"受信済みの {len(received)} 件の仮説で続行")
+            text = json.dumps({"hypotheses": received}, ensure_ascii=False)
+        return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+    
+    def generate_hypotheses_fanout(self, economic_data: Dict[str, Any], categories: Sequence[str],
+                                   per_category: int = 1) -> List[Dict[str, Any]]:
+        """
+        カテゴリごとの短いプロンプトを並列に送信し、結果を統合する
+
+        応答の長さが待ち時間を決めるため、全体の待ち時間は短い応答1回分程度になる。
+        失敗・解析不能なカテゴリは除外して続行し、全カテゴリが失敗した場合のみフォールバック応答を使う。
+        """
+        logger.info(f"ファンアウト生成を開始: {len(categories)} カテゴリ")
+        self.last_response_was_fallback = False
+        started = time.monotonic()
+        
+        def generate_category(category: str) -> List[Dict[str, Any]]:
+            with self.report.stage('prompt'):
+                prompt = self.generate_hypothesis_prompt(economic_data, category=category, count=per_category)
+            invalid: List[Tuple[Any, List[str]]] = []
+            hypotheses = self.parse_gemini_response(self._request_gemini(prompt), invalid)
+            if invalid:
+                hypotheses += self.repair_hypotheses(invalid)
+            for hypothesis in hypotheses:
+                hypothesis['category'] = category
+            return hypotheses
+        
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        with ThreadPoolExecutor(max_workers=len(categories)) as executor:
+            futures = {category: executor.submit(generate_category, category) for category in categories}
+            for category, future in futures.items():
+                try:
+                    results[category] = future.result()
+                except requests.exceptions.RequestException as e:
+                    logger.error(f"Gemini API呼び出しエラー（{category}）: {e}")
+                except Exception as e:
+                    # 解析・キャッシュ等のエラーもそのカテゴリだけを除外して続行する
+                    logger.error(f"仮説生成エラー（{category}）: {e}")
+        
+        failed = [category for category in categories if not results.get(category)]
+        if failed:
+            logger.warning(f"{len(failed)} カテゴリの生成に失敗: {', '.join(failed)}")
+        
+        # カテゴリの指定順に統合し、同じタイトルの重複を除く（IDは内容ハッシュなのでカテゴリをまたいでも衝突しない）
+        merged: List[Dict[str, Any]] = []
+        seen_titles = set()
+        for category in categories:
+            for hypothesis in results.get(category, []):
+                if hypothesis.get('title') and hypothesis['title'] not in seen_titles:
+                    seen_titles.add(hypothesis['title'])
+                    merged.append(hypothesis)
+        
+        if not merged:
+            logger.error("全カテゴリの生成に失敗したため、フォールバック応答を使用")
+            self.last_response_was_fallback = True
+            merged = self.parse_gemini_response(self.get_enhanced_fallback_response())
+        
+        logger.info(f"ファンアウト生成完了: {len(merged)} 件 ({time.monotonic() - started:.1f}秒)")
+        return merged
+    
     def get_enhanced_fallback_response(self) -> Dict[str, Any]:
         """強化されたフォールバック応答"""
         logger.info("強化されたフォールバック応答を生成中")
@@ -652,31 +1436,30 @@ class EconomicsHypothesisGenerator:
             }]
         }
     
-    def parse_gemini_response(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Gemini APIの応答を解析して仮説データを抽出"""
+    def parse_gemini_response(self, response: Dict[str, Any],
+                              invalid: Optional[List[Tuple[Any, List[str]]]] = None) -> List[Dict[str, Any]]:
+        """
+        Gemini APIの応答を解析して仮説データを抽出
+
+        スキーマに適合しない仮説は除外し、invalid を渡した場合は (要素, エラー) をそこに追加する。
+        """
         logger.info("Gemini API応答を解析中")
         
         try:
             content = response['candidates'][0]['content']['parts'][0]['text']
-            
-            # JSONの抽出（マークダウンコードブロックがある場合の処理）
-            if '```json' in content:
-                start = content.find('```json') + 7
-                end = content.find('```', start)
-                content = content[start:end].strip()
-            elif '```' in content:
-                start = content.find('```') + 3
-                end = content.find('```', start)
-                content = content[start:end].strip()
-            
-            data = json.loads(content)
-            hypotheses = data.get('hypotheses', [])
+            self.report.count('gemini.response_chars', len(content))
+            with self.report.stage('parse'):
+                hypotheses, rejected = parse_hypotheses(content)
+            if rejected:
+                logger.warning(f"スキーマに適合しない仮説: {len(rejected)} 件 ({'; '.join(rejected[0][1][:3])})")
+                if invalid is not None:
+                    invalid.extend(rejected)
             
             # 各仮説に生成日時を追加
             current_time = datetime.datetime.now().isoformat()
             for hypothesis in hypotheses:
                 hypothesis['generated_at'] = current_time
-                hypothesis['id'] = hash(hypothesis['title']) % 10000  # 簡易ID生成
+                hypothesis['id'] = hypothesis_key(hypothesis)  # 内容ハッシュによる実行間で不変のID
                 
                 # 新しいフィールドのデフォルト値設定
                 if 'data_sources_used' not in hypothesis:
@@ -689,16 +1472,64 @@ class EconomicsHypothesisGenerator:
             logger.info(f"仮説解析完了: {len(hypotheses)} 件")
             return hypotheses
             
-        except (KeyError, json.JSONDecodeError, IndexError) as e:
+        except (KeyError, IndexError, ValueError) as e:
             logger.error(f"応答解析エラー: {e}")
             return []
     
+    def repair_hypotheses(self, invalid: List[Tuple[Any, List[str]]]) -> List[Dict[str, Any]]:
+        """スキーマに適合しなかった仮説だけを修正依頼のプロンプトで再生成（プロンプト全体は再送しない）"""
+        logger.info(f"不適合の仮説 {len(invalid)} 件の修正を依頼中")
+        try:
+            response = self._request_gemini(build_repair_prompt(invalid))
+        except requests.exceptions.RequestException as e:
+            logger.error(f"仮説修正リクエストエラー: {e}")
+            return []
+        return self.parse_gemini_response(response)
+    
+    def check_duplicates(self, hypotheses: List[Dict[str, Any]], output_file: str) -> List[Dict[str, Any]]:
+        """
+        過去に生成した仮説との近似重複を MinHash/LSH インデックスで検出
+
+        インデックスは実行間で保持し、前回の出力ファイルの仮説も照合対象に加える。
+        """
+        index = NearDuplicateIndex.load(self.duplicate_index_path)
+        try:
+            with open(output_file, 'r', encoding='utf-8') as f:
+                for hypothesis in json.load(f).get('hypotheses', []):
+                    index.add_hypothesis(hypothesis)
+        except (OSError, json.JSONDecodeError):
+            pass
+        
+        checked = filter_duplicates(hypotheses, index, mode=self.duplicate_mode)
+        duplicates = len(hypotheses) - len(checked) if self.duplicate_mode == 'reject' else \
+            sum(1 for hypothesis in checked if 'duplicate_of' in hypothesis)
+        logger.info(f"近似重複チェック完了: {duplicates} 件の重複 (アーカイブ {len(index)} 件)")
+        
+        try:
+            index.save(self.duplicate_index_path)
+        except OSError as e:
+            logger.warning(f"重複検出インデックス保存エラー: {e}")
+        return checked
+    
     def save_results(self, hypotheses: List[Dict[str, Any]], economic_data: Dict[str, Any], output_file: str = "hypotheses.json"):
         """生成された仮説と経済データをJSONファイルに保存"""
         logger.info(f"結果を {output_file} に保存中")
+        generated_at = datetime.datetime.now().isoformat()
+        
+        # 生成された仮説はアーカイブに追記（フォールバック応答は対象外）
+        run_id = None
+        if hypotheses and not self.last_response_was_fallback:
+            try:
+                run_id = self.archive.append_run(hypotheses, generated_at=generated_at, metadata={
+                    "market_sentiment": economic_data.get('market_sentiment', 'Unknown'),
+                    "data_sources": economic_data.get('data_sources', [])
+                })
+            except OSError as e:
+                logger.error(f"仮説アーカイブ保存エラー: {e}")
         
         output_data = {
-            "generated_at": datetime.datetime.now().isoformat(),
+            "generated_at": generated_at,
+            "run_id": run_id,
             "total_hypotheses": len(hypotheses),
             "economic_data_summary": {
                 "total_indicators": economic_data.get('total_indicators', 0),
@@ -718,28 +1549,166 @@ class EconomicsHypothesisGenerator:
             
         except IOError as e:
             logger.error(f"ファイル保存エラー: {e}")
+        
+        if self.publish_dir and run_id:
+            self.publish_shards(run_id, output_data)
+    
+    def publish_shards(self, run_id: str, output_data: Dict[str, Any]) -> None:
+        """初回表示用の小さな index.json と、仮説ごと・実行ごとのシャードを書き出す（経済データは実行シャードへ）"""
+        try:
+            StaticPublisher(self.publish_dir).publish(
+                run_id,
+                output_data['generated_at'],
+                output_data['hypotheses'],
+                run_details={
+                    "economic_data_summary": output_data['economic_data_summary'],
+                    "raw_economic_data": output_data['raw_economic_data']
+                }
+            )
+        except OSError as e:
+            logger.error(f"分割データ出力エラー: {e}")
+    
+    def compute_data_fingerprint(self, economic_data: Dict[str, Any]) -> str:
+        """
+        正規化した経済データとプロンプトテンプレート・モデル設定のフィンガープリント
+
+        収集日時や補完元の取得日時など実行ごとに変わるだけの項目は除外し、数値は有効数字3桁に丸めて
+        実質的な変化がない限り同じ値になるようにする。日付は観測日を返すソースのものだけを含め、
+        収集日で打刻するソース（RUN_STAMPED_SOURCES）の日付と、実行日からの相対日付で作るサンプルの
+        カレンダーイベントは含めない。
+        """
+        def quantize(value: Any) -> Any:
+            return f"{value:.3g}" if isinstance(value, float) else value
+        
+        def observation_date(ind: Dict[str, Any]) -> str:
+            return '' if ind['source'] in EconomicDataCollector.RUN_STAMPED_SOURCES else str(ind['date'])
+        
+        events = economic_data.get('economic_events', []) if economic_data.get('calendar_source') == 'feed' else []
+        normalized = {
+            "indicators": sorted(
+                (ind['source'], ind['name'], quantize(float(ind['value'])), ind['unit'], observation_date(ind))
+                for ind in economic_data.get('indicators', [])
+            ),
+            "economic_events": sorted(
+                (event.get('event', ''), event.get('date', ''), event.get('importance', ''))
+                for event in events
+            ),
+            "market_sentiment": economic_data.get('market_sentiment'),
+            "key_trends": sorted(economic_data.get('key_trends', [])),
+            "derived_features": sorted(
+                # 観測数は収集日で打刻された系列では実行ごとに増えるため含めない
+                tuple((key, quantize(value)) for key, value in sorted(row.items()) if key != 'observations')
+                for row in economic_data.get('derived_features', [])
+            ),
+            "cross_country": sorted(
+                (row['indicator'], quantize(row['value']), quantize(row['percentile']))
+                for row in economic_data.get('cross_country', [])
+            ),
+            # テンプレートの変更も再生成の対象にするため、プロンプト生成処理のソースを含める
+            "prompt_template": inspect.getsource(type(self).generate_hypothesis_prompt),
+            "model": self.base_url,
+            "generation_config": self.generation_config,
+            "fanout_categories": self.fanout_categories
+        }
+        encoded = json.dumps(normalized, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+    
+    def _load_last_fingerprint(self) -> Dict[str, Any]:
+        try:
+            with open(self.fingerprint_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+    
+    def _save_fingerprint(self, fingerprint: str, output_file: str) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.fingerprint_path), exist_ok=True)
+            with open(self.fingerprint_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "fingerprint": fingerprint,
+                    "output_file": os.path.abspath(output_file),
+                    "generated_at": datetime.datetime.now().isoformat()
+                }, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning(f"フィンガープリント保存エラー: {e}")
     
-    def generate_hypotheses(self, output_file: str = "hypotheses.json") -> List[Dict[str, Any]]:
+    def _reuse_previous_results(self, fingerprint: str, output_file: str) -> Optional[List[Dict[str, Any]]]:
+        """前回と入力が同じ場合、前回の出力のメタデータ（最終確認日時）のみ更新して仮説を返す"""
+        last = self._load_last_fingerprint()
+        if last.get('fingerprint') != fingerprint or last.get('output_file') != os.path.abspath(output_file):
+            return None
+        try:
+            with open(output_file, 'r', encoding='utf-8') as f:
+                output_data = json.load(f)
+            hypotheses = output_data.get('hypotheses', [])
+            if not hypotheses:
+                return None
+            output_data['last_checked_at'] = datetime.datetime.now().isoformat()
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(output_data, f, ensure_ascii=False, indent=2)
+            return hypotheses
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"前回結果の再利用に失敗: {e}")
+            return None
+    
+    def generate_hypotheses(self, output_file: str = "hypotheses.json", force: bool = False) -> List[Dict[str, Any]]:
         """メイン処理: 強化された経済仮説生成の全体フロー"""
         logger.info("強化された経済学仮説生成プロセスを開始")
+        # 実行ごとの計測レポート（終了時に履歴ファイルへ追記）
+        self.report = RunReport()
+        self.data_collector.report = self.report
+        self.use_response_cache = not force
+        hedge_before = self.hedger.stats()
         
         try:
             # 1. 包括的経済データ収集
-            economic_data = self.collect_comprehensive_economic_data()
+            with self.report.stage('collect'):
+                economic_data = self.collect_comprehensive_economic_data()
             
-            # 2. 強化されたプロンプト生成
-            prompt = self.generate_hypothesis_prompt(economic_data)
+            # 入力データに実質的な変化がなければLLM呼び出しを省略
+            fingerprint = self.compute_data_fingerprint(economic_data)
+            if not force:
+                previous = self._reuse_previous_results(fingerprint, output_file)
+                if previous is not None:
+                    logger.info(f"入力データに変化がないため仮説生成をスキップ (fingerprint={fingerprint[:12]})")
+                    self.report.add(outcome='reused', hypotheses=len(previous))
+                    return previous
             
-            # 3. Gemini API呼び出し
-            response = self.call_gemini_api(prompt)
+            if self.fanout_categories:
+                # 2-4. カテゴリごとに並列生成して統合
+                hypotheses = self.generate_hypotheses_fanout(economic_data, self.fanout_categories)
+            else:
+                # 2. 強化されたプロンプト生成
+                with self.report.stage('prompt'):
+                    prompt = self.generate_hypothesis_prompt(economic_data)
+                
+                # 3. Gemini API呼び出し
+                response = self.call_gemini_api(prompt)
+                
+                # 4. 応答解析（スキーマに適合しない仮説だけを再生成）
+                invalid: List[Tuple[Any, List[str]]] = []
+                hypotheses = self.parse_gemini_response(response, invalid)
+                if invalid and not self.last_response_was_fallback:
+                    hypotheses += self.repair_hypotheses(invalid)
             
-            # 4. 応答解析
-            hypotheses = self.parse_gemini_response(response)
+            # 過去の仮説との近似重複を検出（フォールバック応答は対象外）
+            if hypotheses and not self.last_response_was_fallback:
+                with self.report.stage('duplicates'):
+                    hypotheses = self.check_duplicates(hypotheses, output_file)
             
             # 5. 結果保存
+            self.report.add(outcome='fallback' if self.last_response_was_fallback else 'generated',
+                            hypotheses=len(hypotheses))
             if hypotheses:
-                self.save_results(hypotheses, economic_data, output_file)
+                with self.report.stage('save'):
+                    self.save_results(hypotheses, economic_data, output_file)
                 logger.info(f"強化された仮説生成完了: {len(hypotheses)} 件の仮説を生成")
+                hedge_stats = self.hedger.stats()
+                if hedge_stats['fired']:
+                    logger.info(f"ヘッジリクエスト: {hedge_stats['fired']}/{hedge_stats['calls']} 回送信, ヘッジ側の採用 {hedge_stats['won']} 回")
+                # フォールバック応答は次回の再生成を妨げないよう記録しない
+                if not self.last_response_was_fallback:
+                    self._save_fingerprint(fingerprint, output_file)
             else:
                 logger.warning("仮説の生成に失敗しました。フォールバックデータも利用できませんでした。")
                 # 仮説が生成されなかった場合でも、空のhypotheses.jsonを作成してエラーを回避
@@ -749,9 +1718,26 @@ class EconomicsHypothesisGenerator:
             
         except Exception as e:
             logger.error(f"仮説生成プロセスでエラーが発生: {e}")
+            self.report.add(outcome='error', error=str(e))
             # エラー発生時も空のhypotheses.jsonを作成してエラーを回避
             self.save_results([], {}, output_file)
             return []
+        
+        finally:
+            self._finish_report(hedge_before)
+    
+    def _finish_report(self, hedge_before: Dict[str, Any]) -> None:
+        """今回の実行分のヘッジ・キャッシュ統計を加えてレポートを履歴ファイルに追記"""
+        self.hedger.history.save()
+        hedge_after = self.hedger.stats()
+        for name in ('fired', 'won'):
+            if hedge_after[name] > hedge_before[name]:
+                self.report.count(f'gemini.hedges_{name}', hedge_after[name] - hedge_before[name])
+        if isinstance(self.data_collector.session, CachedSession):
+            self.report.add(http_cache=self.data_collector.session.stats())
+        report = self.report.append_to(self.report_path)
+        stages = ', '.join(f"{name} {seconds:.2f}秒" for name, seconds in report['stages'].items())
+        logger.info(f"実行レポート: 合計 {report['total_seconds']:.2f}秒 ({stages}), ピークメモリ {report['peak_memory_mb']} MB → {self.report_path}")
 
 def main():
     """
@@ -768,11 +1754,27 @@ def main():
         print("❌ GEMINI_API_KEYが設定されていないため、仮説生成をスキップしました。空のhypotheses.jsonを作成しました。")
         return
     
-    # 強化された仮説生成器を初期化
-    generator = EconomicsHypothesisGenerator(gemini_api_key)
+    # 強化された仮説生成器を初期化（COLLECTOR_MAX_WORKERS=1 で逐次収集）
+    max_workers = int(os.getenv('COLLECTOR_MAX_WORKERS', '8'))
+    collection_deadline = float(os.getenv('COLLECTION_DEADLINE', '30')) or None  # 0 で期限なし
+    world_bank_panel = os.getenv('WORLD_BANK_PANEL', '0') == '1'
+    streaming = os.getenv('GEMINI_STREAMING', '0') == '1'  # 仮説を完成した順に受信
+    # HYPOTHESIS_FANOUT=1 でカテゴリごとに1件ずつ並列生成
+    fanout_categories = HYPOTHESIS_CATEGORIES if os.getenv('HYPOTHESIS_FANOUT', '0') == '1' else None
+    generator = EconomicsHypothesisGenerator(gemini_api_key, max_workers=max_workers,
+                                             collection_deadline=collection_deadline,
+                                             world_bank_panel=world_bank_panel,
+                                             streaming=streaming,
+                                             fanout_categories=fanout_categories,
+                                             duplicate_mode=os.getenv('DUPLICATE_MODE', 'flag'),
+                                             publish_dir=os.getenv('HYPOTHESIS_PUBLISH_DIR'),
+                                             structured_output=os.getenv('GEMINI_STRUCTURED_OUTPUT', '0') == '1',
+                                             hedge_requests=os.getenv('GEMINI_HEDGE', '0') == '1',
+                                             hedge_percentile=float(os.getenv('GEMINI_HEDGE_PERCENTILE', '95')),
+                                             cache_responses=os.getenv('LLM_CACHE', '1') == '1')
     
-    # 仮説生成実行
-    hypotheses = generator.generate_hypotheses()
+    # 仮説生成実行（FORCE_REGENERATE=1 で入力に変化がなくても再生成）
+    hypotheses = generator.generate_hypotheses(force=os.getenv('FORCE_REGENERATE', '0') == '1')
     
     if hypotheses:
         print(f"✅ {len(hypotheses)} 件の経済学仮説を生成しました")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+HTTPレスポンスキャッシュ
+requests.Session を拡張し、GETレスポンスをディスクに保存して再利用する。
+ソース（ホスト）ごとのTTL内はローカルから応答し、期限切れ後は ETag / Last-Modified による条件付きリクエストで再検証する。
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import logging
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse, urlencode, parse_qsl, urlunparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+# キャッシュに保存するURLから除外するクエリパラメータ（APIキー等）
+SENSITIVE_PARAMS = {'api_key', 'key', 'apikey', 'token'}
+
+# 再構築したレスポンスに残すヘッダー
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control', 'Date')
+
+class CachedSession(requests.Session):
+    """ディスク永続化キャッシュ付きの requests.Session"""
+
+    def __init__(self, cache_dir: str, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 0):
+        super().__init__()
+        self.cache_dir = cache_dir
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        if method.upper() != 'GET':
+            return super().request(method, url, params=params, headers=headers, **kwargs)
+
+        full_url = self._full_url(url, params)
+        key = hashlib.sha256(full_url.encode('utf-8')).hexdigest()
+        entry = self._load(key)
+
+        if entry and self._is_entry_fresh(entry, url):
+            self._count('hits')
+            return self._build_response(entry)
+
+        request_headers = dict(headers or {})
+        if entry:
+            if entry.get('etag'):
+                request_headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request_headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().request(method, url, params=params, headers=request_headers, **kwargs)
+
+        if response.status_code == 304 and entry:
+            # 変更なし: 保存済みの本文を返し、TTLを延長
+            self._count('revalidated')
+            entry['stored_at'] = time.time()
+            self._write_meta(key, entry)
+            return self._build_response(entry)
+
+        self._count('misses')
+        if response.status_code == 200:
+            self._store(key, full_url, response)
+        return response
+
+    def is_fresh(self, url: str, params: Optional[Dict[str, Any]] = None) -> bool:
+        """TTL内のキャッシュが存在する（ネットワークアクセス不要）かどうか"""
+        key = hashlib.sha256(self._full_url(url, params).encode('utf-8')).hexdigest()
+        entry = self._load(key)
+        return bool(entry) and self._is_entry_fresh(entry, url)
+
+    def stats(self) -> Dict[str, int]:
+        """キャッシュ利用統計"""
+        with self._stats_lock:
+            return {'hits': self.hits, 'revalidated': self.revalidated, 'misses': self.misses}
+
+    def _ttl_for(self, url: str) -> float:
+        return self.ttls.get(urlparse(url).netloc, self.default_ttl)
+
+    def _is_entry_fresh(self, entry: Dict[str, Any], url: str) -> bool:
+        return time.time() - entry.get('stored_at', 0) < self._ttl_for(url)
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _full_url(url: str, params: Optional[Dict[str, Any]]) -> str:
+        """パラメータを含む正規化済みURL（パラメータ順を固定）"""
+        parsed = urlparse(url)
+        query = parse_qsl(parsed.query) + [(k, str(v)) for k, v in (params or {}).items()]
+        return urlunparse(parsed._replace(query=urlencode(sorted(query))))
+
+    @staticmethod
+    def _redact(url: str) -> str:
+        parsed = urlparse(url)
+        query = [(k, v) for k, v in parse_qsl(parsed.query) if k.lower() not in SENSITIVE_PARAMS]
+        return urlunparse(parsed._replace(query=urlencode(query)))
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return f"{base}.json", f"{base}.body"
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(body_path, 'rb') as f:
+                entry['content'] = f.read()
+            return entry
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _store(self, key: str, url: str, response: requests.Response) -> None:
+        meta_path, body_path = self._paths(key)
+        entry = {
+            'url': self._redact(url),
+            'status_code': response.status_code,
+            'encoding': response.encoding,
+            'headers': {name: response.headers[name] for name in STORED_HEADERS if name in response.headers},
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'stored_at': time.time()
+        }
+        try:
+            os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+            self._atomic_write(body_path, response.content)
+            self._write_meta(key, entry)
+        except OSError as e:
+            logger.warning(f"HTTPキャッシュ書き込みエラー: {e}")
+
+    def _write_meta(self, key: str, entry: Dict[str, Any]) -> None:
+        meta_path, _ = self._paths(key)
+        meta = {k: v for k, v in entry.items() if k != 'content'}
+        try:
+            self._atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"HTTPキャッシュ書き込みエラー: {e}")
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes) -> None:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _build_response(entry: Dict[str, Any]) -> requests.Response:
+        """キャッシュエントリから requests.Response を再構築"""
+        response = requests.Response()
+        response.status_code = entry.get('status_code', 200)
+        response._content = entry['content']
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        response.encoding = entry.get('encoding')
+        response.url = entry.get('url', '')
+        response.from_cache = True
+        return response
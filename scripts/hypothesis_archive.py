@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+仮説アーカイブ
+生成実行ごとの仮説を追記専用のセグメントファイル（JSON Lines）に保存し、ID → (セグメント, オフセット, 長さ)
+のオフセットインデックスで ID 検索と期間検索を行う。ID は正規化したタイトルと説明の内容ハッシュで、
+同じ仮説は実行をまたいで同じ ID になる。標準ライブラリのみで実装し、ルートの generate_hypotheses.py からも利用する。
+書き込みは単一プロセスからの実行を前提とする。
+"""
+
+import os
+import json
+import time
+import hashlib
+import datetime
+import logging
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Union
+
+from near_duplicate import hypothesis_key
+
+logger = logging.getLogger(__name__)
+
+Timestamp = Union[datetime.datetime, float]
+
+class IndexEntry(NamedTuple):
+    hypothesis_id: str
+    archived_at: float
+    segment: int
+    offset: int
+    length: int
+    run_id: str
+
+def _to_epoch(value: Timestamp) -> float:
+    return value.timestamp() if isinstance(value, datetime.datetime) else float(value)
+
+class HypothesisArchive:
+    """
+    追記専用の仮説アーカイブ
+
+    archive_dir/
+        segments/segment-000001.jsonl  仮説レコード（1行1件、サイズ上限を超えたら次のセグメントへ）
+        index.tsv                      ID, 保存時刻, セグメント番号, オフセット, 長さ, 実行ID
+        runs.jsonl                     実行ごとの記録（生成日時、仮説IDの一覧、メタデータ）
+
+    セグメントへの書き込み後にインデックスへ追記するため、途中で中断してもインデックスは常に
+    完全に書き込まれたレコードだけを指す。
+    """
+
+    def __init__(self, archive_dir: str, max_segment_bytes: int = 4 * 1024 * 1024):
+        self.archive_dir = archive_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.segments_dir = os.path.join(archive_dir, 'segments')
+        self.index_path = os.path.join(archive_dir, 'index.tsv')
+        self.runs_path = os.path.join(archive_dir, 'runs.jsonl')
+        self._entries: Dict[str, IndexEntry] = {}
+        self._by_time: List[IndexEntry] = []
+        self._times: List[float] = []
+        self._load_index()
+        self._segment = max((entry.segment for entry in self._entries.values()), default=1)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, hypothesis_id: str) -> bool:
+        return hypothesis_id in self._entries
+
+    def append_run(self, hypotheses: List[Dict[str, Any]], generated_at: Optional[str] = None,
+                   metadata: Optional[Dict[str, Any]] = None) -> str:
+        """
+        1回の生成実行分の仮説を追記し、実行IDを返す
+
+        各仮説の 'id' を内容ハッシュに置き換える。アーカイブ済みの仮説は再保存せず、実行記録から参照する。
+        """
+        archived_at = time.time()
+        for hypothesis in hypotheses:
+            hypothesis['id'] = hypothesis_key(hypothesis)
+        ids = [hypothesis['id'] for hypothesis in hypotheses]
+        run_id = '{}-{}'.format(
+            datetime.datetime.fromtimestamp(archived_at).strftime('%Y%m%dT%H%M%S'),
+            hashlib.sha256(''.join(ids).encode('utf-8')).hexdigest()[:8]
+        )
+
+        os.makedirs(self.segments_dir, exist_ok=True)
+        new_entries = []
+        written = set()
+        for hypothesis in hypotheses:
+            if hypothesis['id'] in self._entries or hypothesis['id'] in written:
+                continue
+            written.add(hypothesis['id'])
+            record = json.dumps({
+                'id': hypothesis['id'],
+                'run_id': run_id,
+                'archived_at': archived_at,
+                'hypothesis': hypothesis
+            }, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+            segment = self._writable_segment(len(record))
+            with open(self._segment_path(segment), 'ab') as f:
+                offset = f.tell()
+                f.write(record)
+            new_entries.append(IndexEntry(hypothesis['id'], archived_at, segment, offset, len(record), run_id))
+
+        if new_entries:
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                for entry in new_entries:
+                    f.write('\t'.join(str(value) for value in entry) + '\n')
+            for entry in new_entries:
+                self._add_entry(entry)
+
+        with open(self.runs_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'run_id': run_id,
+                'archived_at': archived_at,
+                'generated_at': generated_at,
+                'hypothesis_ids': ids,
+                'new_hypotheses': len(new_entries),
+                'metadata': metadata or {}
+            }, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+        logger.info(f"仮説アーカイブに追記: 実行 {run_id}, 新規 {len(new_entries)} 件 / {len(ids)} 件 (累計 {len(self)} 件)")
+        return run_id
+
+    def get(self, hypothesis_id: str) -> Optional[Dict[str, Any]]:
+        """IDで仮説を取得（オフセットから1レコードだけ読む）"""
+        entry = self._entries.get(hypothesis_id)
+        return None if entry is None else self._read(entry)['hypothesis']
+
+    def between(self, start: Optional[Timestamp] = None, end: Optional[Timestamp] = None) -> List[Dict[str, Any]]:
+        """保存時刻が [start, end] の仮説（保存順）"""
+        lo = 0 if start is None else bisect_left(self._times, _to_epoch(start))
+        hi = len(self._times) if end is None else bisect_right(self._times, _to_epoch(end))
+        return [self._read(entry)['hypothesis'] for entry in self._by_time[lo:hi]]
+
+    def runs(self) -> List[Dict[str, Any]]:
+        """実行記録の一覧（古い順）"""
+        try:
+            with open(self.runs_path, 'r', encoding='utf-8') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except OSError:
+            return []
+
+    def run_hypotheses(self, run_id: str) -> List[Dict[str, Any]]:
+        """実行IDに含まれる仮説"""
+        for run in self.runs():
+            if run['run_id'] == run_id:
+                return [hypothesis for hypothesis in map(self.get, run['hypothesis_ids']) if hypothesis]
+        return []
+
+    def iter_hypotheses(self) -> Iterator[Dict[str, Any]]:
+        """全仮説を保存順に走査（セグメントを順に読む）"""
+        for entry in self._by_time:
+            yield self._read(entry)['hypothesis']
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.segments_dir, f'segment-{segment:06d}.jsonl')
+
+    def _writable_segment(self, record_size: int) -> int:
+        """レコードを追記するセグメント番号（上限を超える場合は次のセグメントへ切り替える）"""
+        path = self._segment_path(self._segment)
+        if os.path.exists(path) and os.path.getsize(path) + record_size > self.max_segment_bytes:
+            self._segment += 1
+        return self._segment
+
+    def _read(self, entry: IndexEntry) -> Dict[str, Any]:
+        with open(self._segment_path(entry.segment), 'rb') as f:
+            f.seek(entry.offset)
+            return json.loads(f.read(entry.length))
+
+    def _add_entry(self, entry: IndexEntry) -> None:
+        self._entries[entry.hypothesis_id] = entry
+        # 通常は末尾への追加になるが、時計の巻き戻りに備えて挿入位置を二分探索する
+        position = bisect_right(self._times, entry.archived_at)
+        self._times.insert(position, entry.archived_at)
+        self._by_time.insert(position, entry)
+
+    def _load_index(self) -> None:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        for line_number, line in enumerate(lines, start=1):
+            try:
+                hypothesis_id, archived_at, segment, offset, length, run_id = line.split('\t')
+                entry = IndexEntry(hypothesis_id, float(archived_at), int(segment), int(offset), int(length), run_id)
+            except ValueError:
+                logger.warning(f"仮説アーカイブのインデックス {line_number} 行目を読み飛ばし")
+                continue
+            if entry.hypothesis_id not in self._entries:
+                self._add_entry(entry)
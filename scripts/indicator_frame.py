@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+配列ベースの指標フレーム
+EconomicIndicator のリストを列ごとの並列配列に変換し、カテゴリマスクの事前計算と名前によるO(1)参照を提供する。
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# 指標名に対するカテゴリ判定ルール（フレーム構築時に一度だけ評価する）
+CATEGORY_RULES: Dict[str, Callable[[str], bool]] = {
+    'stock': lambda name: any(term in name for term in ('S&P', 'NASDAQ', 'Dow')),
+    'crypto': lambda name: any(crypto in name for crypto in ('Bitcoin', 'Ethereum')),
+    'crypto_change': lambda name: 'Change' in name and any(crypto in name for crypto in ('Bitcoin', 'Ethereum')),
+    'inflation': lambda name: 'Inflation' in name or 'CPI' in name,
+    'rate': lambda name: 'Rate' in name and 'Exchange' not in name,
+    'unemployment': lambda name: 'Unemployment' in name,
+    'volatility_index': lambda name: 'VIX' in name,
+}
+
+FIELDS = ('name', 'value', 'unit', 'date', 'source', 'description')
+
+class IndicatorFrame:
+    """指標を列ごとの並列配列として保持するフレーム"""
+
+    def __init__(self, names: List[str], values: Iterable[float], units: List[str], dates: List[str],
+                 sources: List[str], descriptions: List[str], stale: Optional[List[bool]] = None):
+        self.names = np.array(names, dtype=object)
+        self.values = np.asarray(list(values), dtype=np.float64)
+        self.units = np.array(units, dtype=object)
+        self.dates = np.array(dates, dtype=object)
+        self.sources = np.array(sources, dtype=object)
+        self.descriptions = np.array(descriptions, dtype=object)
+        self.stale = np.zeros(len(names), dtype=bool) if stale is None else np.asarray(stale, dtype=bool)
+        self._positions = {name: i for i, name in enumerate(names)}
+        self.masks: Dict[str, np.ndarray] = {
+            category: np.fromiter((rule(name) for name in names), dtype=bool, count=len(names))
+            for category, rule in CATEGORY_RULES.items()
+        }
+
+    @classmethod
+    def from_indicators(cls, indicators: Iterable[Any]) -> 'IndicatorFrame':
+        """EconomicIndicator（または同じ属性を持つオブジェクト）の列から構築"""
+        columns: Dict[str, List[Any]] = {field: [] for field in FIELDS}
+        stale: List[bool] = []
+        for ind in indicators:
+            for field in FIELDS:
+                columns[field].append(getattr(ind, field))
+            stale.append(getattr(ind, 'stale', False))
+        return cls(columns['name'], columns['value'], columns['unit'], columns['date'],
+                   columns['source'], columns['description'], stale)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._positions
+
+    def mask(self, category: str) -> np.ndarray:
+        """カテゴリに属する行のブールマスク"""
+        return self.masks[category]
+
+    def get(self, name: str) -> Optional[float]:
+        """指標名から値を取得（O(1)）"""
+        position = self._positions.get(name)
+        return None if position is None else float(self.values[position])
+
+    def unique_sources(self) -> List[str]:
+        """出現順を保ったデータソース一覧"""
+        return list(dict.fromkeys(self.sources.tolist()))
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """辞書のリストへ1パスで変換"""
+        return [
+            {'name': name, 'value': value, 'unit': unit, 'date': date, 'source': source,
+             'description': description, 'stale': stale}
+            for name, value, unit, date, source, description, stale in zip(
+                self.names.tolist(), self.values.tolist(), self.units.tolist(),
+                self.dates.tolist(), self.sources.tolist(), self.descriptions.tolist(), self.stale.tolist()
+            )
+        ]
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+仮説の近似重複検出
+タイトルと説明を文字 bigram（シングル）に分解して MinHash シグネチャを求め、LSH（バンド分割）の
+バケットで候補を絞り込む。分かち書きが不要なので日本語の文章にもそのまま使え、アーカイブ全体との比較が
+候補数に比例する時間で済む。標準ライブラリのみで実装し、ルートの generate_hypotheses.py からも利用する。
+"""
+
+import os
+import re
+import json
+import random
+import hashlib
+import logging
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# MinHash の置換に使う素数（2^61 - 1）
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+def normalize_text(text: str) -> str:
+    """全角・半角を揃え、空白と記号を除いて小文字化"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    return re.sub(r'[\s\W_]+', '', text)
+
+def shingles(text: str, k: int = 2) -> Set[str]:
+    """文字 k-gram の集合（k 文字未満の文章はそれ自体を1要素とする）"""
+    text = normalize_text(text)
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+def hypothesis_text(hypothesis: Dict[str, Any]) -> str:
+    return f"{hypothesis.get('title', '')} {hypothesis.get('description', '')}"
+
+def hypothesis_key(hypothesis: Dict[str, Any]) -> str:
+    """正規化したタイトルと説明から求める内容ハッシュ（実行間で変わらない識別子）"""
+    return hashlib.sha256(normalize_text(hypothesis_text(hypothesis)).encode('utf-8')).hexdigest()[:16]
+
+class NearDuplicateIndex:
+    """
+    MinHash + LSH による近似重複インデックス
+
+    num_perm 個のハッシュを bands 個のバンドに分け、いずれかのバンドが一致したものを候補とし、
+    シグネチャから推定した Jaccard 類似度が threshold 以上のものを重複とみなす。
+    既定値（128 = 32 バンド × 4 行）では類似度およそ 0.42 以上が高い確率で候補に入る。
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, threshold: float = 0.5,
+                 shingle_size: int = 2, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)
+        ]
+        self.signatures: Dict[str, List[int]] = {}
+        self.titles: Dict[str, str] = {}
+        self._buckets: List[Dict[Tuple[int, ...], List[str]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.signatures
+
+    def signature(self, text: str) -> List[int]:
+        """文章の MinHash シグネチャ"""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+            for shingle in shingles(text, self.shingle_size)
+        ]
+        if not hashes:
+            return [_MAX_HASH] * self.num_perm
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._permutations
+        ]
+
+    def add(self, key: str, text: str, title: str = '', signature: Optional[List[int]] = None) -> None:
+        """文章をインデックスに登録（同じキーは上書きしない）"""
+        if key in self.signatures:
+            return
+        signature = signature or self.signature(text)
+        self.signatures[key] = signature
+        self.titles[key] = title
+        for band, bucket_key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(bucket_key, []).append(key)
+
+    def add_hypothesis(self, hypothesis: Dict[str, Any]) -> None:
+        """仮説を照合せずに登録（既存のアーカイブからの再構築用）"""
+        key = hypothesis_key(hypothesis)
+        if key not in self.signatures:
+            self.add(key, hypothesis_text(hypothesis), title=hypothesis.get('title', ''))
+
+    def query(self, text: str, signature: Optional[List[int]] = None) -> List[Tuple[str, float]]:
+        """類似度が閾値以上の登録済みキーと推定類似度（類似度の高い順）"""
+        signature = signature or self.signature(text)
+        candidates: Set[str] = set()
+        for band, bucket_key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(bucket_key, ()))
+        matches = []
+        for key in candidates:
+            similarity = self.similarity(signature, self.signatures[key])
+            if similarity >= self.threshold:
+                matches.append((key, similarity))
+        return sorted(matches, key=lambda match: match[1], reverse=True)
+
+    def similarity(self, first: List[int], second: List[int]) -> float:
+        """2つのシグネチャから推定した Jaccard 類似度"""
+        return sum(1 for x, y in zip(first, second) if x == y) / self.num_perm
+
+    def _band_keys(self, signature: List[int]) -> Iterable[Tuple[int, ...]]:
+        for band in range(self.bands):
+            yield tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'num_perm': self.num_perm,
+                'bands': self.bands,
+                'threshold': self.threshold,
+                'shingle_size': self.shingle_size,
+                'seed': self.seed,
+                'entries': {key: {'title': self.titles.get(key, ''), 'signature': signature}
+                            for key, signature in self.signatures.items()}
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, threshold: Optional[float] = None) -> 'NearDuplicateIndex':
+        """保存済みインデックスを読み込む（ファイルがない・壊れている場合は空のインデックス）"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return cls() if threshold is None else cls(threshold=threshold)
+        index = cls(num_perm=data['num_perm'], bands=data['bands'],
+                    threshold=threshold if threshold is not None else data['threshold'],
+                    shingle_size=data['shingle_size'], seed=data['seed'])
+        for key, entry in data['entries'].items():
+            index.add(key, '', title=entry.get('title', ''), signature=entry['signature'])
+        return index
+
+def filter_duplicates(hypotheses: List[Dict[str, Any]], index: NearDuplicateIndex,
+                      mode: str = 'flag') -> List[Dict[str, Any]]:
+    """
+    新しい仮説をインデックス（過去の仮説と同じバッチ内の先行する仮説）と照合
+
+    mode='flag' は重複に duplicate_of / duplicate_similarity を付けて残し、mode='reject' は除外する。
+    重複でない仮説はインデックスに登録する。
+    """
+    kept = []
+    for hypothesis in hypotheses:
+        text = hypothesis_text(hypothesis)
+        signature = index.signature(text)
+        matches = index.query(text, signature=signature)
+        if matches:
+            key, similarity = matches[0]
+            logger.info(f"近似重複の仮説を検出 (類似度 {similarity:.2f}): {hypothesis.get('title', '')} ≒ {index.titles.get(key, key)}")
+            if mode == 'reject':
+                continue
+            hypothesis['duplicate_of'] = key
+            hypothesis['duplicate_similarity'] = round(similarity, 3)
+        else:
+            index.add(hypothesis_key(hypothesis), text, title=hypothesis.get('title', ''), signature=signature)
+        kept.append(hypothesis)
+    return kept
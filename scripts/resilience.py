@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+データ収集の耐障害レイヤー
+ホスト単位のサーキットブレーカー（状態は実行間で永続化）と、再試行可能なエラーに対する
+ジッター付き指数バックオフを提供する。
+"""
+
+import os
+import json
+import time
+import random
+import threading
+import logging
+from typing import Dict, Any, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# 再試行対象のHTTPステータス
+RETRIABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """サーキットブレーカーが開いているためリクエストを送信しなかった"""
+
+class CircuitBreakerRegistry:
+    """
+    ホスト単位のサーキットブレーカー
+
+    連続失敗が failure_threshold に達するとブレーカーを開き、cooldown 秒間そのホストへのリクエストを即座に拒否する。
+    クールダウン経過後は1リクエストだけ試行（half-open）し、成功すれば閉じ、失敗すれば再び開く。
+    """
+
+    def __init__(self, state_path: str, failure_threshold: int = 3, cooldown: float = 600.0):
+        self.state_path = state_path
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._probing: Dict[str, bool] = {}
+        self._state: Dict[str, Dict[str, Any]] = self._load()
+
+    def allow(self, host: str) -> bool:
+        """リクエスト送信可否を判定（half-open中の試行枠もここで確保）"""
+        with self._lock:
+            state = self._state.get(host)
+            if not state or state.get('opened_at') is None:
+                return True
+            if time.time() - state['opened_at'] < self.cooldown:
+                return False
+            if self._probing.get(host):
+                return False
+            self._probing[host] = True
+            return True
+
+    def is_open(self, host: str) -> bool:
+        with self._lock:
+            state = self._state.get(host)
+            return bool(state) and state.get('opened_at') is not None
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            self._probing.pop(host, None)
+            state = self._state.get(host)
+            if state and (state.get('failures') or state.get('opened_at') is not None):
+                if state.get('opened_at') is not None:
+                    logger.info(f"サーキットブレーカー復帰: {host}")
+                self._state[host] = {'failures': 0, 'opened_at': None}
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            probing = self._probing.pop(host, False)
+            state = self._state.setdefault(host, {'failures': 0, 'opened_at': None})
+            state['failures'] += 1
+            if probing or (state['opened_at'] is None and state['failures'] >= self.failure_threshold):
+                state['opened_at'] = time.time()
+                logger.warning(f"サーキットブレーカー作動: {host} ({state['failures']} 回連続失敗、{self.cooldown:.0f} 秒間停止)")
+
+    def release(self, host: str) -> None:
+        """half-open中の試行枠を解放（成功・失敗を記録せずに終わった試行でホストを塞いだままにしない）"""
+        with self._lock:
+            self._probing.pop(host, None)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {host: dict(state) for host, state in self._state.items()}
+
+    def save(self) -> None:
+        """ブレーカー状態を保存（次回実行に引き継ぐ）"""
+        state = self.snapshot()
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"サーキットブレーカー状態の保存エラー: {e}")
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+class RetryPolicy:
+    """ジッター付き指数バックオフ（Full Jitter）による再試行方針"""
+
+    def __init__(self, max_retries: int = 2, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """attempt 回目（0始まり）の失敗後に待機する秒数。Retry-After があれば優先"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def is_retriable(error: Optional[Exception] = None, response: Optional[requests.Response] = None) -> bool:
+        if error is not None:
+            return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+        return response is not None and response.status_code in RETRIABLE_STATUS_CODES
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+生成実行ごとの計測レポート
+段階ごとの所要時間（データソースごとの収集、プロンプト生成、LLM呼び出し、解析、保存）と、リクエスト数・
+ダウンロード量・再試行回数・プロンプト/応答サイズ・ピークメモリを集計し、履歴ファイル（JSON Lines）に
+1実行1行で追記する。実行間の比較で性能の劣化を追跡するためのもので、標準ライブラリのみで動作する。
+"""
+
+import os
+import sys
+import json
+import time
+import datetime
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows では resource モジュールがないためピークメモリは記録しない
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+def peak_memory_mb() -> Optional[float]:
+    """プロセスのピーク常駐メモリ（MB、取得できなければ None）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS はバイト単位
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+class RunReport:
+    """
+    1回の生成実行の計測値
+
+    stage() で囲んだ区間の所要時間を段階名ごとに合計する。並列に実行される段階（ファンアウト生成の
+    カテゴリごとの呼び出しなど）は各スレッドの所要時間の合計になるため、実行全体の経過時間は total_seconds を見る。
+    count() / add() はスレッドセーフなカウンタで、名前は 'http.requests' のようにドット区切りにする。
+    """
+
+    def __init__(self):
+        self.started_at = datetime.datetime.now().isoformat()
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self.fields: Dict[str, Any] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def count(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add(self, **fields: Any) -> None:
+        """カウンタ以外の項目（結果件数、フォールバックの有無など）を記録"""
+        with self._lock:
+            self.fields.update(fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'started_at': self.started_at,
+                'total_seconds': round(time.monotonic() - self._started, 3),
+                'stages': {name: round(seconds, 3) for name, seconds in self.stages.items()},
+                'counters': dict(sorted(self.counters.items())),
+                'peak_memory_mb': peak_memory_mb(),
+                **self.fields
+            }
+
+    def append_to(self, path: str) -> Dict[str, Any]:
+        """レポートを履歴ファイルに1行追記し、書き込んだ内容を返す"""
+        report = self.to_dict()
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(report, ensure_ascii=False, separators=(',', ':')) + '\n')
+        except OSError as e:
+            logger.warning(f"実行レポート保存エラー: {e}")
+        return report
+
+def load_history(path: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """履歴ファイルのレポート（古い順、limit を指定すると直近の件数のみ）"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [line for line in f if line.strip()]
+    except OSError:
+        return []
+    reports = []
+    for line in lines[-limit:] if limit else lines:
+        try:
+            reports.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return reports
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+静的サイト向けの分割出力
+初回表示に必要な項目だけを持つ小さな index.json と、仮説ごと・実行ごとのシャードファイルを書き出す。
+シャードはファイル名に内容ハッシュを含めるため長期キャッシュでき、内容が変わらないものは再書き込みしない。
+STATIC_PRECOMPRESS=1 の場合は事前圧縮した .gz（と brotli が利用可能なら .br）を併置する。GitHub Pages と Vite の
+ビルドは併置ファイルを配信しないため既定では無効で、nginx の gzip_static / brotli_static のように事前圧縮ファイルを
+そのまま返すホストに置く場合のみ使う。
+標準ライブラリのみで動作し（brotli は任意）、ルートの generate_hypotheses.py からも利用する。
+"""
+
+import os
+import json
+import gzip
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+try:
+    import brotli
+except ImportError:  # .br の生成は brotli がインストールされている場合のみ
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# index.json に載せる仮説の項目（一覧表示・統計計算に必要なもの）
+SUMMARY_FIELDS = ('id', 'title', 'category', 'confidence', 'novelty_score', 'feasibility_score')
+
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+
+def _encode(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+def _content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:10]
+
+class StaticPublisher:
+    """
+    output_dir/
+        index.json                    最新実行の仮説の要約と直近の実行一覧（ファイル名固定、短期キャッシュ）
+        h/<仮説ID>.<ハッシュ>.json    仮説の全項目
+        runs/<実行ID>.<ハッシュ>.json 実行のメタデータ・経済データ要約と、含まれる仮説の要約
+    """
+
+    def __init__(self, output_dir: str, max_runs: int = 30, compress: Optional[bool] = None):
+        self.output_dir = output_dir
+        self.max_runs = max_runs
+        # None の場合は STATIC_PRECOMPRESS=1 のときだけ .gz / .br を併置する
+        self.compress = os.getenv('STATIC_PRECOMPRESS', '0') == '1' if compress is None else compress
+        self.index_path = os.path.join(output_dir, 'index.json')
+        self.stats = {'written': 0, 'unchanged': 0, 'removed': 0}
+
+    def publish(self, run_id: str, generated_at: str, hypotheses: List[Dict[str, Any]],
+                run_details: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """1回の実行分を書き出して index.json を更新し、新しいインデックスを返す"""
+        self.stats = {'written': 0, 'unchanged': 0, 'removed': 0}
+
+        summaries = []
+        for hypothesis in hypotheses:
+            shard = self._write_shard('h', str(hypothesis['id']), hypothesis)
+            summary = {field: hypothesis.get(field) for field in SUMMARY_FIELDS}
+            summary['shard'] = shard
+            summaries.append(summary)
+
+        run_shard = self._write_shard('runs', run_id, {
+            'run_id': run_id,
+            'generated_at': generated_at,
+            'hypotheses': summaries,
+            **(run_details or {})
+        })
+
+        previous_runs = [run for run in self._load_index().get('runs', []) if run.get('run_id') != run_id]
+        runs = [{
+            'run_id': run_id,
+            'generated_at': generated_at,
+            'total_hypotheses': len(summaries),
+            'shard': run_shard
+        }] + previous_runs[:self.max_runs - 1]
+
+        index = {
+            'generated_at': generated_at,
+            'run_id': run_id,
+            'total_hypotheses': len(summaries),
+            'hypotheses': summaries,
+            'runs': runs
+        }
+        body = _encode(index)
+        if self._read(self.index_path) != body:
+            self._write(self.index_path, body)
+        else:
+            self.stats['unchanged'] += 1
+
+        self._prune(runs)
+        logger.info(
+            f"静的データ出力完了: {self.output_dir} (書き込み {self.stats['written']}, "
+            f"変更なし {self.stats['unchanged']}, 削除 {self.stats['removed']}, index.json {len(body)} bytes)"
+        )
+        return index
+
+    def _write_shard(self, directory: str, name: str, data: Any) -> str:
+        """内容ハッシュ付きのシャードを書き出し、output_dir からの相対パスを返す（同じ内容なら書き込まない）"""
+        body = _encode(data)
+        relative_path = f"{directory}/{name}.{_content_hash(body)}.json"
+        path = os.path.join(self.output_dir, relative_path)
+        if os.path.exists(path):
+            self.stats['unchanged'] += 1
+        else:
+            self._write(path, body)
+        return relative_path
+
+    def _write(self, path: str, body: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        variants = {path: body}
+        if self.compress:
+            # mtime を固定して同じ内容から同じ .gz を生成する
+            variants[path + '.gz'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                variants[path + '.br'] = brotli.compress(body, quality=11)
+        for variant_path, variant_body in variants.items():
+            tmp_path = f"{variant_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(variant_body)
+            os.replace(tmp_path, variant_path)
+        self.stats['written'] += 1
+
+    @staticmethod
+    def _read(path: str) -> Optional[bytes]:
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _load_index(self) -> Dict[str, Any]:
+        body = self._read(self.index_path)
+        try:
+            return json.loads(body) if body else {}
+        except json.JSONDecodeError:
+            return {}
+
+    def _prune(self, runs: List[Dict[str, Any]]) -> None:
+        """インデックスから参照されなくなったシャード（直近の実行に含まれない仮説など）を削除"""
+        referenced: Set[str] = set()
+        for run in runs:
+            referenced.add(run['shard'])
+            body = self._read(os.path.join(self.output_dir, run['shard']))
+            try:
+                run_data = json.loads(body) if body else {}
+            except json.JSONDecodeError:
+                run_data = {}
+            referenced.update(hypothesis['shard'] for hypothesis in run_data.get('hypotheses', []))
+
+        if not self.compress:
+            for suffix in COMPRESSED_SUFFIXES:
+                if os.path.exists(self.index_path + suffix):
+                    os.remove(self.index_path + suffix)
+
+        for directory in ('h', 'runs'):
+            directory_path = os.path.join(self.output_dir, directory)
+            if not os.path.isdir(directory_path):
+                continue
+            for filename in os.listdir(directory_path):
+                base = filename
+                for suffix in COMPRESSED_SUFFIXES:
+                    if base.endswith(suffix):
+                        base = base[:-len(suffix)]
+                if not base.endswith('.json'):
+                    continue
+                # 参照されなくなったシャードと、事前圧縮を無効にした後に残った併置ファイルを削除
+                if f"{directory}/{base}" not in referenced or (base != filename and not self.compress):
+                    os.remove(os.path.join(directory_path, filename))
+                    if base == filename:
+                        self.stats['removed'] += 1
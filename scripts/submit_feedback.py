@@ -17,7 +17,7 @@ def submit_feedback_from_json(json_file_path: str) -> bool:
         with open(json_file_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         
-        hypothesis_id = data['hypothesis_id']
+        hypothesis_id = str(data['hypothesis_id'])
         hypothesis_title = data['hypothesis_title']
         feedback_data = data['feedback']
         
@@ -55,7 +55,7 @@ def submit_feedback_interactive():
     
     try:
         # 仮説情報の入力
-        hypothesis_id = int(input("仮説ID: "))
+        hypothesis_id = input("仮説ID: ").strip()
         hypothesis_title = input("仮説タイトル: ")
         
         print("\n評価項目 (1-5の数値で入力):")
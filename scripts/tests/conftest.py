@@ -0,0 +1,22 @@
+"""
+scripts/ のテスト共通設定
+
+スクリプトと同じくモジュールをフラットに import できるよう scripts/ を sys.path に追加し、
+キャッシュとアーカイブの保存先をテスト用の一時ディレクトリに向ける（generate_hypotheses の import 前に設定する）。
+"""
+
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+
+_TMP_DIR = tempfile.mkdtemp(prefix='hypothesis-tests-')
+atexit.register(shutil.rmtree, _TMP_DIR, True)
+os.environ.setdefault('HYPOTHESIS_CACHE_DIR', os.path.join(_TMP_DIR, 'cache'))
+os.environ.setdefault('HYPOTHESIS_ARCHIVE_DIR', os.path.join(_TMP_DIR, 'archive'))
+for _name in ('GEMINI_RPM', 'GEMINI_TPM'):
+    os.environ.pop(_name, None)
@@ -0,0 +1,68 @@
+import datetime
+
+from economic_calendar import CalendarEvent, EventIntervalIndex, load_csv
+
+
+def day(n, hour=0):
+    return datetime.datetime(2026, 10, n, hour)
+
+
+def event(name, start, end=None, importance='High', series=()):
+    return CalendarEvent(event=name, start=start, end=end or start, importance=importance, series=list(series))
+
+
+def names(events):
+    return [item.event for item in events]
+
+
+def test_between_includes_events_overlapping_the_range():
+    index = EventIntervalIndex([
+        event('FOMC', day(1), day(20)),  # 長いイベントは開始が範囲より前でも重なる
+        event('CPI', day(10), series=['CPIAUCSL']),
+        event('GDP', day(25), importance='Medium', series=['GDP']),
+        event('Jobs', day(5))
+    ])
+
+    assert names(index.between(day(9), day(12))) == ['FOMC', 'CPI']
+    assert names(index.between(day(21), day(31))) == ['GDP']
+    assert names(index.between(day(21), day(24))) == []
+
+
+def test_between_filters_by_importance():
+    index = EventIntervalIndex([
+        event('CPI', day(10)),
+        event('GDP', day(11), importance='Medium')
+    ])
+
+    assert names(index.between(day(1), day(31), importance='Medium')) == ['GDP']
+    assert names(index.upcoming(days=7, now=day(8))) == ['CPI', 'GDP']
+
+
+def test_series_queries_and_next_release():
+    index = EventIntervalIndex([
+        event('CPI September', day(10), series=['CPIAUCSL']),
+        event('CPI October', day(28), series=['cpiaucsl']),
+        event('GDP', day(25), series=['GDP'])
+    ])
+
+    assert names(index.for_series('CPIAUCSL')) == ['CPI September', 'CPI October']
+    assert names(index.for_series('cpiaucsl', start=day(15))) == ['CPI October']
+    assert index.next_release('CPIAUCSL', now=day(11)).event == 'CPI October'
+    assert index.next_release('CPIAUCSL', now=day(29)) is None
+    assert index.for_series('UNRATE') == []
+
+
+def test_load_csv_skips_bad_rows(tmp_path):
+    path = tmp_path / 'calendar.csv'
+    path.write_text(
+        'event,date,importance,series\n'
+        'CPI,2026-10-10,high,CPIAUCSL;CPI\n'
+        'Broken,not-a-date,high,\n',
+        encoding='utf-8'
+    )
+
+    events = load_csv(str(path))
+
+    assert names(events) == ['CPI']
+    assert events[0].importance == 'High'
+    assert events[0].series == ['CPIAUCSL', 'CPI']
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from generate_hypotheses import EconomicsHypothesisGenerator
+
+
+def gemini_response(hypotheses):
+    """generateContent 形式の応答"""
+    text = json.dumps({'hypotheses': hypotheses}, ensure_ascii=False)
+    return {'candidates': [{'content': {'parts': [{'text': text}]}}]}
+
+
+def make_hypothesis(title):
+    return {
+        'title': title,
+        'description': f'{title}の説明',
+        'category': '金融政策',
+        'confidence': 80,
+        'research_methods': ['パネル回帰'],
+        'key_factors': ['金利'],
+        'novelty_score': 70,
+        'feasibility_score': 60
+    }
+
+
+@pytest.fixture
+def generator():
+    gen = EconomicsHypothesisGenerator('test-key', cache_responses=False)
+    gen.generate_hypothesis_prompt = lambda economic_data, category=None, count=3: f'prompt:{category}'
+    return gen
+
+
+def test_fanout_drops_category_with_non_http_error(generator):
+    def request(prompt):
+        category = prompt.split(':', 1)[1]
+        if category == '労働経済学':
+            raise ValueError('unexpected response shape')
+        return gemini_response([make_hypothesis(f'{category}の仮説')])
+
+    generator._request_gemini = request
+    merged = generator.generate_hypotheses_fanout({}, ['金融政策', '労働経済学', '国際経済学'])
+
+    assert [hypothesis['title'] for hypothesis in merged] == ['金融政策の仮説', '国際経済学の仮説']
+    assert [hypothesis['category'] for hypothesis in merged] == ['金融政策', '国際経済学']
+    assert not generator.last_response_was_fallback
+
+
+class FakeResponse:
+    status_code = 200
+    ok = True
+    headers = {}
+    text = ''
+
+    def __init__(self, payload):
+        self.content = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def economic_data(collection_date):
+    return {
+        'collection_date': collection_date,
+        'data_sources': ['FRED'],
+        'total_indicators': 1,
+        'indicators': [{'name': 'GDP', 'value': 100.0, 'unit': 'Billions', 'source': 'FRED'}],
+        'economic_events': [],
+        'market_sentiment': 'Neutral',
+        'key_trends': []
+    }
+
+
+def test_identical_rerun_is_served_from_response_cache():
+    posts = []
+
+    def post(url, **kwargs):
+        posts.append(url)
+        return FakeResponse(gemini_response([make_hypothesis('金融政策の仮説')]))
+
+    # 同じ日の2回の実行（収集時刻だけが異なる）。2回目は別インスタンスなので SQLite 層から返る
+    generators = []
+    for collection_date in ('2026-10-17T06:00:01.123456', '2026-10-17T09:30:45.654321'):
+        generator = EconomicsHypothesisGenerator('cache-test-key')
+        generator.gemini.session.post = post
+        prompt = generator.generate_hypothesis_prompt(economic_data(collection_date), category='金融政策', count=1)
+        result = generator._request_gemini(prompt)
+        generators.append(generator)
+
+    assert len(posts) == 1
+    assert generator.parse_gemini_response(result)[0]['title'] == '金融政策の仮説'
+    assert generators[1].response_cache.stats()['disk_hits'] == 1
+
+
+def fingerprint_data(collection_date, coingecko_date, fred_date):
+    return {
+        'collection_date': collection_date,
+        'calendar_source': 'sample',
+        'indicators': [
+            {'source': 'CoinGecko', 'name': 'Bitcoin Price', 'value': 65000.0, 'unit': 'USD', 'date': coingecko_date},
+            {'source': 'FRED', 'name': 'GDP', 'value': 100.0, 'unit': 'Billions', 'date': fred_date}
+        ],
+        'economic_events': [{'event': 'CPI', 'date': coingecko_date, 'importance': 'High'}]
+    }
+
+
+def test_fingerprint_ignores_run_stamped_dates(generator):
+    first = fingerprint_data('2026-10-14T06:00:00', '2026-10-14', '2026-07-01')
+    second = fingerprint_data('2026-10-17T06:00:00', '2026-10-17', '2026-07-01')
+    assert generator.compute_data_fingerprint(first) == generator.compute_data_fingerprint(second)
+
+
+def test_fingerprint_keeps_observation_published_on_collection_day(generator):
+    first = fingerprint_data('2026-10-17T06:00:00', '2026-10-17', '2026-07-01')
+    second = fingerprint_data('2026-10-17T06:00:00', '2026-10-17', '2026-10-17')
+    assert generator.compute_data_fingerprint(first) != generator.compute_data_fingerprint(second)
@@ -0,0 +1,55 @@
+import hypothesis_archive
+from hypothesis_archive import HypothesisArchive
+from near_duplicate import hypothesis_key
+
+
+def hypothesis(title):
+    return {'title': title, 'description': f'{title}の説明', 'category': '金融政策'}
+
+
+def append_at(archive, monkeypatch, timestamp, hypotheses):
+    monkeypatch.setattr(hypothesis_archive.time, 'time', lambda: timestamp)
+    return archive.append_run(hypotheses, generated_at='2026-10-17T00:00:00')
+
+
+def test_append_and_get(tmp_path, monkeypatch):
+    archive = HypothesisArchive(str(tmp_path))
+    first, second = hypothesis('仮説A'), hypothesis('仮説B')
+
+    run_id = append_at(archive, monkeypatch, 1_000.0, [first, second])
+
+    assert first['id'] == hypothesis_key(first)
+    assert archive.get(first['id'])['title'] == '仮説A'
+    assert archive.get('0' * 16) is None
+    assert [item['title'] for item in archive.run_hypotheses(run_id)] == ['仮説A', '仮説B']
+    # インデックスを読み直しても同じレコードを指す
+    assert HypothesisArchive(str(tmp_path)).get(second['id'])['title'] == '仮説B'
+
+
+def test_existing_hypothesis_is_not_stored_twice(tmp_path, monkeypatch):
+    archive = HypothesisArchive(str(tmp_path))
+    append_at(archive, monkeypatch, 1_000.0, [hypothesis('仮説A')])
+    run_id = append_at(archive, monkeypatch, 2_000.0, [hypothesis('仮説A'), hypothesis('仮説B')])
+
+    assert len(archive) == 2
+    assert archive.runs()[-1]['new_hypotheses'] == 1
+    assert len(archive.run_hypotheses(run_id)) == 2
+
+
+def test_between_returns_hypotheses_in_time_range(tmp_path, monkeypatch):
+    archive = HypothesisArchive(str(tmp_path))
+    append_at(archive, monkeypatch, 1_000.0, [hypothesis('仮説A')])
+    append_at(archive, monkeypatch, 2_000.0, [hypothesis('仮説B')])
+    append_at(archive, monkeypatch, 3_000.0, [hypothesis('仮説C')])
+
+    assert [item['title'] for item in archive.between(1_500.0, 3_000.0)] == ['仮説B', '仮説C']
+    assert [item['title'] for item in archive.between(end=1_000.0)] == ['仮説A']
+    assert archive.between(3_500.0) == []
+
+
+def test_segments_roll_over_at_size_limit(tmp_path, monkeypatch):
+    archive = HypothesisArchive(str(tmp_path), max_segment_bytes=200)
+    append_at(archive, monkeypatch, 1_000.0, [hypothesis(f'仮説{i}') for i in range(3)])
+
+    assert len(list((tmp_path / 'segments').iterdir())) == 3
+    assert [item['title'] for item in archive.iter_hypotheses()] == ['仮説0', '仮説1', '仮説2']
@@ -0,0 +1,39 @@
+from near_duplicate import NearDuplicateIndex, filter_duplicates, hypothesis_key
+
+
+def hypothesis(title, description=''):
+    return {'title': title, 'description': description}
+
+
+def test_near_identical_japanese_title_is_flagged():
+    index = NearDuplicateIndex()
+    index.add('original', '金融政策の不確実性が中小企業の設備投資に与える影響', title='original')
+
+    matches = index.query('金融政策の不確実性が中小企業の設備投資に及ぼす影響')
+
+    assert [key for key, _ in matches] == ['original']
+    assert matches[0][1] >= index.threshold
+
+
+def test_distinct_japanese_title_is_not_flagged():
+    index = NearDuplicateIndex()
+    index.add('original', '金融政策の不確実性が中小企業の設備投資に与える影響', title='original')
+
+    assert index.query('リモートワークの普及が地方の住宅価格に与える効果') == []
+
+
+def test_hypothesis_key_ignores_width_and_whitespace():
+    assert hypothesis_key(hypothesis('ＧＤＰ と 金利', '説明')) == hypothesis_key(hypothesis('GDPと金利', '説明'))
+    assert hypothesis_key(hypothesis('GDPと金利', '説明')) != hypothesis_key(hypothesis('GDPと物価', '説明'))
+
+
+def test_index_round_trips_through_save_and_load(tmp_path):
+    index = NearDuplicateIndex()
+    index.add_hypothesis(hypothesis('金融政策の不確実性が中小企業の設備投資に与える影響'))
+    path = str(tmp_path / 'index.json')
+    index.save(path)
+
+    loaded = NearDuplicateIndex.load(path)
+
+    assert len(loaded) == 1
+    assert loaded.query('金融政策の不確実性が中小企業の設備投資に及ぼす影響')
@@ -0,0 +1,34 @@
+import json
+
+from static_publisher import StaticPublisher
+
+
+def hypotheses(description='説明'):
+    return [{'id': 'abc123', 'title': '仮説A', 'description': description, 'category': '金融政策'}]
+
+
+def test_shard_name_depends_on_content_and_unchanged_shards_are_not_rewritten(tmp_path):
+    publisher = StaticPublisher(str(tmp_path))
+    first = publisher.publish('run1', '2026-10-17T00:00:00', hypotheses())
+    second = publisher.publish('run2', '2026-10-18T00:00:00', hypotheses())
+
+    assert first['hypotheses'][0]['shard'] == second['hypotheses'][0]['shard']
+    assert publisher.stats['unchanged'] == 1
+
+    third = publisher.publish('run3', '2026-10-19T00:00:00', hypotheses('別の説明'))
+    assert third['hypotheses'][0]['shard'] != second['hypotheses'][0]['shard']
+
+    index = json.loads((tmp_path / 'index.json').read_text(encoding='utf-8'))
+    assert [run['run_id'] for run in index['runs']] == ['run3', 'run2', 'run1']
+    shard = json.loads((tmp_path / index['hypotheses'][0]['shard']).read_text(encoding='utf-8'))
+    assert shard['description'] == '別の説明'
+    assert not list(tmp_path.rglob('*.gz'))
+
+
+def test_prune_removes_shards_no_longer_referenced(tmp_path):
+    publisher = StaticPublisher(str(tmp_path), max_runs=1)
+    old = publisher.publish('run1', '2026-10-17T00:00:00', hypotheses())['hypotheses'][0]['shard']
+    publisher.publish('run2', '2026-10-18T00:00:00', hypotheses('別の説明'))
+
+    assert not (tmp_path / old).exists()
+    assert len(list((tmp_path / 'runs').iterdir())) == 1
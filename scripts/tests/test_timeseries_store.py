@@ -0,0 +1,35 @@
+import numpy as np
+
+from timeseries_store import ColumnarSeriesStore, to_day
+
+
+def test_append_and_read_round_trip(tmp_path):
+    store = ColumnarSeriesStore(str(tmp_path))
+    added = store.append('FRED', 'GDP', [('2024-Q2', 2.0), ('2024-Q1', 1.0)], unit='Billions')
+
+    dates, values = store.read(ColumnarSeriesStore.series_key('FRED', 'GDP'))
+
+    assert added == 2
+    assert dates.tolist() == [to_day('2024-Q1').item(), to_day('2024-Q2').item()]
+    assert values.tolist() == [1.0, 2.0]
+    assert store.info('FRED:GDP')['unit'] == 'Billions'
+
+
+def test_append_only_adds_newer_observations_and_updates_last(tmp_path):
+    store = ColumnarSeriesStore(str(tmp_path))
+    store.append('CoinGecko', 'Bitcoin Price', [('2026-10-16', 100.0), ('2026-10-17', 110.0)])
+
+    added = store.append('CoinGecko', 'Bitcoin Price', [('2026-10-15', 90.0), ('2026-10-17', 115.0), ('2026-10-18', 120.0)])
+
+    # 再読み込みしたストアでも同じ内容になる
+    dates, values = ColumnarSeriesStore(str(tmp_path)).read('CoinGecko:Bitcoin Price')
+    assert added == 1
+    assert dates.astype(str).tolist() == ['2026-10-16', '2026-10-17', '2026-10-18']
+    assert values.tolist() == [100.0, 115.0, 120.0]
+
+
+def test_read_unknown_series_is_empty(tmp_path):
+    dates, values = ColumnarSeriesStore(str(tmp_path)).read('FRED:UNKNOWN')
+
+    assert len(dates) == 0 and len(values) == 0
+    assert dates.dtype == np.dtype('datetime64[D]')
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+列指向時系列ストア
+FRED・世界銀行・Yahoo Finance・CoinGecko の指標履歴を、シリーズごとに値 (float64) と日付 (datetime64[D]) の
+2つのバイナリ配列として保存する。読み込みはメモリマップで行い、JSONの解析や全データのメモリ展開を不要にする。
+"""
+
+import os
+import json
+import hashlib
+import threading
+import logging
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def to_day(date: str) -> np.datetime64:
+    """'2024' / '2024-Q3' / '2024-11' / '2024-11-05' 形式の日付を期首日に正規化"""
+    date = str(date).strip()
+    if len(date) == 4:
+        return np.datetime64(f"{date}-01-01", 'D')
+    if '-Q' in date:
+        year, quarter = date.split('-Q')
+        return np.datetime64(f"{year}-{(int(quarter) - 1) * 3 + 1:02d}-01", 'D')
+    if len(date) == 7:
+        return np.datetime64(f"{date}-01", 'D')
+    return np.datetime64(date[:10], 'D')
+
+class ColumnarSeriesStore:
+    """シリーズごとの値配列・日付配列をメモリマップファイルで保持するストア"""
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self._lock = threading.Lock()
+        os.makedirs(store_dir, exist_ok=True)
+        self._index: Dict[str, Dict[str, Any]] = self._load_index()
+
+    @staticmethod
+    def series_key(source: str, name: str) -> str:
+        return f"{source}:{name}"
+
+    def keys(self) -> List[str]:
+        """保存済みシリーズのキー一覧"""
+        with self._lock:
+            return list(self._index)
+
+    def info(self, key: str) -> Optional[Dict[str, Any]]:
+        """シリーズのメタデータ（source, name, unit, length, last_date）"""
+        with self._lock:
+            entry = self._index.get(key)
+            return dict(entry) if entry else None
+
+    def append(self, source: str, name: str, observations: Iterable[Tuple[str, float]], unit: str = '') -> int:
+        """
+        観測値を追記する
+
+        最終日付より新しい観測値のみ追記し、最終日付と同じ日付の観測値は最新値で上書きする。
+
+        Returns:
+            追記された観測値の件数
+        """
+        observations = list(observations)
+        if not observations:
+            return 0
+        dates = np.array([to_day(date) for date, _ in observations], dtype='datetime64[D]')
+        values = np.array([value for _, value in observations], dtype=np.float64)
+        # 日付順に並べ、同一日付は後の観測値を採用
+        order = np.argsort(dates, kind='stable')
+        dates, values = dates[order], values[order]
+        keep = np.append(dates[1:] != dates[:-1], True)
+        dates, values = dates[keep], values[keep]
+
+        key = self.series_key(source, name)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                entry = {
+                    'stem': hashlib.sha1(key.encode('utf-8')).hexdigest()[:16],
+                    'source': source,
+                    'name': name,
+                    'unit': unit,
+                    'length': 0,
+                    'last_date': None
+                }
+                self._index[key] = entry
+            values_path, dates_path = self._paths(entry)
+            self._truncate_to_length(entry)
+
+            if entry['last_date'] is not None:
+                last = np.datetime64(entry['last_date'], 'D')
+                same = dates == last
+                if same.any() and entry['length'] > 0:
+                    stored = np.memmap(values_path, dtype=np.float64, mode='r+', shape=(entry['length'],))
+                    stored[-1] = values[same][-1]
+                    stored.flush()
+                    del stored
+                newer = dates > last
+                dates, values = dates[newer], values[newer]
+
+            if len(dates):
+                with open(values_path, 'ab') as f:
+                    f.write(values.tobytes())
+                with open(dates_path, 'ab') as f:
+                    f.write(dates.astype(np.int64).tobytes())
+                entry['length'] += len(dates)
+                entry['last_date'] = str(dates[-1])
+            if unit:
+                entry['unit'] = unit
+            self._save_index()
+            return len(dates)
+
+    def read(self, key: str) -> Tuple[np.ndarray, np.ndarray]:
+        """シリーズの (日付配列, 値配列) を読み取り専用のメモリマップとして返す"""
+        with self._lock:
+            entry = self._index.get(key)
+            entry = dict(entry) if entry else None
+        if not entry or entry['length'] == 0:
+            return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64)
+        values_path, dates_path = self._paths(entry)
+        values = np.memmap(values_path, dtype=np.float64, mode='r', shape=(entry['length'],))
+        dates = np.memmap(dates_path, dtype=np.int64, mode='r', shape=(entry['length'],)).view('datetime64[D]')
+        return dates, values
+
+    def _paths(self, entry: Dict[str, Any]) -> Tuple[str, str]:
+        base = os.path.join(self.store_dir, entry['stem'])
+        return f"{base}.values.f8", f"{base}.dates.i8"
+
+    def _truncate_to_length(self, entry: Dict[str, Any]) -> None:
+        """インデックス更新前に中断した書き込みの残骸を切り詰める"""
+        size = entry['length'] * 8
+        for path in self._paths(entry):
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.store_dir, self.INDEX_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self) -> None:
+        path = os.path.join(self.store_dir, self.INDEX_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
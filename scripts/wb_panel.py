@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+世界銀行パネルデータ
+国 × 年 × 指標 の3次元 float64 配列として多国間パネルを保持し、圧縮npz形式で保存・読み込みする。
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+class WorldBankPanel:
+    """国 × 年 × 指標 のパネル配列（欠損はNaN）"""
+
+    def __init__(self, countries: List[str], country_names: List[str], years: List[int],
+                 indicator_codes: List[str], indicator_names: List[str], values: Optional[np.ndarray] = None):
+        self.countries = list(countries)
+        self.country_names = list(country_names)
+        self.years = np.asarray(years, dtype=np.int32)
+        self.indicator_codes = list(indicator_codes)
+        self.indicator_names = list(indicator_names)
+        shape = (len(self.countries), len(self.years), len(self.indicator_codes))
+        self.values = np.full(shape, np.nan) if values is None else values
+        self._country_positions = {code: i for i, code in enumerate(self.countries)}
+        self._indicator_positions = {code: i for i, code in enumerate(self.indicator_codes)}
+        self._indicator_positions.update({name: i for i, name in enumerate(self.indicator_names)})
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def fill(self, records: Iterable[Dict[str, Any]]) -> int:
+        """世界銀行APIのレコードを配列へ一括配置し、配置件数を返す（対象外の国・年・指標は無視）"""
+        first_year = int(self.years[0]) if len(self.years) else 0
+        country_index, year_index, indicator_index, values = [], [], [], []
+        for record in records:
+            if record.get('value') is None:
+                continue
+            country = self._country_positions.get(record.get('countryiso3code'))
+            indicator = self._indicator_positions.get(record['indicator']['id'])
+            try:
+                year = int(record['date']) - first_year
+            except (TypeError, ValueError):
+                continue
+            if country is None or indicator is None or not 0 <= year < len(self.years):
+                continue
+            country_index.append(country)
+            year_index.append(year)
+            indicator_index.append(indicator)
+            values.append(float(record['value']))
+        if values:
+            self.values[country_index, year_index, indicator_index] = values
+        return len(values)
+
+    def series(self, country: str, indicator: str) -> np.ndarray:
+        """国・指標（コードまたは名前）の年次系列"""
+        return self.values[self._country_positions[country], :, self._indicator_positions[indicator]]
+
+    def latest(self, indicator: str) -> np.ndarray:
+        """各国の指標の最新有効値（国の並び順、値がなければNaN）"""
+        matrix = self.values[:, :, self._indicator_positions[indicator]]
+        valid = ~np.isnan(matrix)
+        last_index = np.where(valid.any(axis=1), matrix.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1), 0)
+        latest = matrix[np.arange(matrix.shape[0]), last_index]
+        latest[~valid.any(axis=1)] = np.nan
+        return latest
+
+    def percentile(self, country: str, indicator: str) -> Optional[float]:
+        """指定国の最新値が各国分布の何パーセンタイルに位置するか"""
+        latest = self.latest(indicator)
+        value = latest[self._country_positions[country]]
+        others = latest[~np.isnan(latest)]
+        if np.isnan(value) or len(others) == 0:
+            return None
+        return float((others < value).sum() + 0.5 * (others == value).sum()) / len(others) * 100.0
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            values=self.values,
+            years=self.years,
+            countries=np.array(self.countries),
+            country_names=np.array(self.country_names),
+            indicator_codes=np.array(self.indicator_codes),
+            indicator_names=np.array(self.indicator_names)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'WorldBankPanel':
+        with np.load(path) as data:
+            return cls(
+                countries=data['countries'].tolist(),
+                country_names=data['country_names'].tolist(),
+                years=data['years'].tolist(),
+                indicator_codes=data['indicator_codes'].tolist(),
+                indicator_names=data['indicator_names'].tolist(),
+                values=data['values']
+            )
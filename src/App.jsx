@@ -198,8 +198,19 @@ function App() {
       }
       
       // GitHub Pages環境では、静的JSONファイルから読み込み
-      const response = await fetch(`/economics-hypothesis-generator/data/hypotheses.json?t=${Date.now()}`)
-      const data = await response.json()
+      // 小さな index.json で一覧を先に表示し、各仮説の全項目は内容ハッシュ付きのシャードから補完する
+      const dataBase = '/economics-hypothesis-generator/data'
+      let data
+      const indexResponse = await fetch(`${dataBase}/index.json?t=${Date.now()}`)
+      if (indexResponse.ok) {
+        data = await indexResponse.json()
+        Promise.all(data.hypotheses.map(summary =>
+          fetch(`${dataBase}/${summary.shard}`).then(res => res.json()).catch(() => summary)
+        )).then(details => setHypotheses(details))
+      } else {
+        const response = await fetch(`${dataBase}/hypotheses.json?t=${Date.now()}`)
+        data = await response.json()
+      }
       
       if (data.hypotheses) {
         setHypotheses(data.hypotheses)
@@ -379,9 +390,10 @@ function App() {
 
       const discussionData = {}
       issues.forEach(issue => {
-        const hypothesisIdMatch = issue.title.match(/ディスカッション: 仮説ID-(\d+)/);
+        // 仮説IDは内容ハッシュ（16進数）、旧形式は連番
+        const hypothesisIdMatch = issue.title.match(/ディスカッション: 仮説ID-([0-9a-f]+)/);
         if (hypothesisIdMatch) {
-          const hypothesisId = parseInt(hypothesisIdMatch[1]);
+          const hypothesisId = hypothesisIdMatch[1];
           if (!discussionData[hypothesisId]) {
             discussionData[hypothesisId] = [];
           }
@@ -471,7 +483,7 @@ ${feedbackData.reviewer_info || '匿名'}
 
 \`\`\`json
 {
-  "hypothesis_id": ${hypothesisId},
+  "hypothesis_id": ${JSON.stringify(hypothesisId)},
   "feedback": ${JSON.stringify(feedbackData, null, 2)}
 }
 \`\`\``,
@@ -283,7 +283,7 @@ ${newComment}
 
 \`\`\`json
 {
-  "hypothesis_id": ${hypothesisId},
+  "hypothesis_id": ${JSON.stringify(hypothesisId)},
   "discussion": {
     "author_name": "${userInfo.name}",
     "author_email": "${userInfo.email || ''}",
@@ -360,7 +360,7 @@ ${replyContent}
 
 \`\`\`json
 {
-  "hypothesis_id": ${hypothesisId},
+  "hypothesis_id": ${JSON.stringify(hypothesisId)},
   "discussion": {
     "author_name": "${userInfo.name}",
     "author_email": "${userInfo.email || ''}",
@@ -509,7 +509,7 @@ ${aiComment}
 
 \`\`\`json
 {
-  "hypothesis_id": ${hypothesisId},
+  "hypothesis_id": ${JSON.stringify(hypothesisId)},
   "discussion": {
     "author_name": "Gemini AI Assistant",
     "author_email": "",